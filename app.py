@@ -4,7 +4,17 @@ from database.setup import initialize_db
 from routes.user_controller import user_routes
 from routes.image_controller import image_routes
 from routes.admin_controller import admin_routes
+from routes.metrics_controller import metrics_routes
 from flask_jwt_extended import JWTManager
+from commands import register_commands
+from services.auth_cache import auth_cache
+from services.last_login_buffer import last_login_buffer
+from services.password_hasher import password_hasher
+from services.feed_cache import feed_cache, RedisFeedBackend
+from services.json_encoder import select_encoder
+from monitoring.requests import request_metrics
+from monitoring.slow_queries import slow_query_log
+import services.job_handlers  # noqa: F401 - đăng ký các handler công việc nền
 import datetime
 import os
 from dotenv import load_dotenv
@@ -13,21 +23,121 @@ load_dotenv()
 
 app = Flask(__name__)
 app.config['MONGODB_SETTINGS'] = {
-    'host': os.getenv('MONGODB_URI')
+    'host': os.getenv('MONGODB_URI'),
+    # Pool kết nối dùng chung cho MongoEngine và mọi truy cập pymongo trực tiếp
+    'maxPoolSize': int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),
+    'minPoolSize': int(os.getenv('MONGODB_MIN_POOL_SIZE', 0)),
+    'maxIdleTimeMS': int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 0)) or None,
+    # Thời gian chờ (ms) khi pool đã hết kết nối; 0 là chờ vô hạn
+    'waitQueueTimeoutMS': int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 0)) or None,
+    'serverSelectionTimeoutMS': int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 30000)),
+    'connectTimeoutMS': int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 20000)),
+    'socketTimeoutMS': int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 0)) or None,
+    # Nén dữ liệu trên đường truyền, ví dụ "zstd,snappy,zlib" (zstd cần gói zstandard, snappy cần python-snappy)
+    'compressors': os.getenv('MONGODB_COMPRESSORS') or None
 }
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = datetime.timedelta(days=1)
+# Migration: tự chạy khi khởi động (mặc định tắt, dùng `flask db-migrate`) và thời hạn khóa (giây)
+app.config['RUN_MIGRATIONS_ON_STARTUP'] = os.getenv('RUN_MIGRATIONS_ON_STARTUP', 'false').lower() == 'true'
+app.config['MIGRATION_LOCK_TTL'] = int(os.getenv('MIGRATION_LOCK_TTL', 300))
+# Số liệu Prometheus: token bảo vệ /metrics (để trống là không yêu cầu) và header Server-Timing
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN', '')
+app.config['SERVER_TIMING'] = os.getenv('SERVER_TIMING', 'false').lower() == 'true'
+# Ghi lại lệnh MongoDB chậm: ngưỡng (ms), số lệnh giữ lại và khoảng cách giữa hai lần explain cùng dạng (giây)
+app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 100))
+app.config['SLOW_QUERY_LOG_SIZE'] = int(os.getenv('SLOW_QUERY_LOG_SIZE', 200))
+app.config['SLOW_QUERY_EXPLAIN_INTERVAL'] = int(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+# Cache feed công khai: số trang đầu được cache (0 để tắt), các per_page được cache (cách nhau bởi dấu phẩy),
+# số phản hồi tối đa, thời hạn (giây), chu kỳ đọc lại bộ đếm thế hệ (giây)
+# và Redis dùng chung giữa các tiến trình (để trống là chỉ cache trong tiến trình)
+app.config['FEED_CACHE_PAGES'] = int(os.getenv('FEED_CACHE_PAGES', 3))
+app.config['FEED_CACHE_PAGE_SIZES'] = [int(size) for size in os.getenv('FEED_CACHE_PAGE_SIZES', '20').split(',') if size.strip()]
+app.config['FEED_CACHE_SIZE'] = int(os.getenv('FEED_CACHE_SIZE', 256))
+app.config['FEED_CACHE_TTL'] = int(os.getenv('FEED_CACHE_TTL', 60))
+app.config['FEED_CACHE_GENERATION_TTL'] = float(os.getenv('FEED_CACHE_GENERATION_TTL', 1))
+app.config['FEED_CACHE_REDIS_URL'] = os.getenv('FEED_CACHE_REDIS_URL', '')
+# Tìm kiếm: thêm dạng không dấu của từ khóa (khớp trường search_text, ví dụ "da lat" với "Đà Lạt")
+app.config['SEARCH_NORMALIZE'] = os.getenv('SEARCH_NORMALIZE', 'true').lower() == 'true'
+# Bộ mã hóa JSON của phản hồi: 'auto' (orjson nếu đã cài, không thì json chuẩn), 'orjson' hoặc 'stdlib'
+app.config['JSON_ENCODER'] = os.getenv('JSON_ENCODER', 'auto')
+# Số giây tối đa thống kê admin được phép cũ trước khi xếp lịch đối soát lại (chạy bởi worker)
+app.config['STATS_MAX_STALENESS'] = int(os.getenv('STATS_MAX_STALENESS', 300))
+# Cache vai trò người dùng cho kiểm tra quyền (giây, số phần tử)
+app.config['AUTH_CACHE_TTL'] = int(os.getenv('AUTH_CACHE_TTL', 60))
+app.config['AUTH_CACHE_SIZE'] = int(os.getenv('AUTH_CACHE_SIZE', 10000))
+# Giới hạn kích thước mỗi tệp ảnh, số tệp mỗi lần tải lên theo lô và toàn bộ request (byte)
+app.config['MAX_UPLOAD_SIZE'] = int(os.getenv('MAX_UPLOAD_SIZE', 10 * 1024 * 1024))
+app.config['MAX_BATCH_FILES'] = int(os.getenv('MAX_BATCH_FILES', 20))
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv(
+    'MAX_CONTENT_LENGTH', app.config['MAX_UPLOAD_SIZE'] * app.config['MAX_BATCH_FILES'] + 1024 * 1024
+))
+# Thao tác kiểm duyệt hàng loạt: số bản ghi tối đa mỗi yêu cầu và kích thước mỗi lô ghi
+app.config['BULK_MAX_ITEMS'] = int(os.getenv('BULK_MAX_ITEMS', 1000))
+app.config['BULK_BATCH_SIZE'] = int(os.getenv('BULK_BATCH_SIZE', 200))
+# Xuất dữ liệu admin (NDJSON/CSV): số bản ghi mỗi lô đọc từ MongoDB và mỗi khối gửi đi
+app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+# Xuất tăng dần (?since=): số giây lùi lại trước since, lớn hơn thời gian từ lúc tạo bản ghi tới lúc ghi xong
+app.config['EXPORT_SINCE_OVERLAP'] = int(os.getenv('EXPORT_SINCE_OVERLAP', 300))
+# Worker công việc nền: số công việc chạy song song và kiểu pool ('thread' hoặc 'process')
+app.config['JOB_WORKER_CONCURRENCY'] = int(os.getenv('JOB_WORKER_CONCURRENCY', 4))
+app.config['JOB_WORKER_MODE'] = os.getenv('JOB_WORKER_MODE', 'thread')
+# Ghi gộp last_login: chu kỳ ghi (giây, cũng là khoảng mất dữ liệu tối đa) và số người dùng chờ tối đa
+app.config['LAST_LOGIN_FLUSH_INTERVAL'] = float(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', 5))
+app.config['LAST_LOGIN_MAX_PENDING'] = int(os.getenv('LAST_LOGIN_MAX_PENDING', 1000))
+# Băm mật khẩu: số luồng, số việc chờ tối đa trước khi trả 503, và phương thức băm
+# (hash cũ được băm lại theo phương thức này khi người dùng đăng nhập)
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_QUEUE'] = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 16))
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+# Giao việc gửi tệp ảnh cho proxy phía trước: '', 'x-sendfile' hoặc 'x-accel-redirect'
+app.config['IMAGE_OFFLOAD'] = os.getenv('IMAGE_OFFLOAD', '')
+app.config['IMAGE_ACCEL_PREFIX'] = os.getenv('IMAGE_ACCEL_PREFIX', '/protected-images/')
+app.config['USE_X_SENDFILE'] = app.config['IMAGE_OFFLOAD'] == 'x-sendfile'
+
+# Bộ mã hóa JSON dùng cho jsonify (đặt trước initialize_db, flask-mongoengine kế thừa lớp này)
+app.json_encoder = select_encoder(app.config['JSON_ENCODER'])
 
 # Khởi tạo JWT
 jwt = JWTManager(app)
 
 # Khởi tạo cơ sở dữ liệu
 initialize_db(app)
+auth_cache.configure(ttl=app.config['AUTH_CACHE_TTL'], max_size=app.config['AUTH_CACHE_SIZE'])
+last_login_buffer.configure(
+    flush_interval=app.config['LAST_LOGIN_FLUSH_INTERVAL'],
+    max_pending=app.config['LAST_LOGIN_MAX_PENDING']
+)
+feed_cache.configure(
+    max_pages=app.config['FEED_CACHE_PAGES'],
+    page_sizes=app.config['FEED_CACHE_PAGE_SIZES'],
+    max_size=app.config['FEED_CACHE_SIZE'],
+    ttl=app.config['FEED_CACHE_TTL'],
+    generation_ttl=app.config['FEED_CACHE_GENERATION_TTL'],
+    backend=RedisFeedBackend(app.config['FEED_CACHE_REDIS_URL']) if app.config['FEED_CACHE_REDIS_URL'] else None
+)
+slow_query_log.configure(
+    threshold_ms=app.config['SLOW_QUERY_MS'],
+    capacity=app.config['SLOW_QUERY_LOG_SIZE'],
+    explain_interval=app.config['SLOW_QUERY_EXPLAIN_INTERVAL']
+)
+password_hasher.configure(
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_queue=app.config['PASSWORD_HASH_MAX_QUEUE'],
+    method=app.config['PASSWORD_HASH_METHOD']
+)
+
+# Đo thời gian và số lệnh DB của mỗi request
+request_metrics.init_app(app)
 
 # Đăng ký blueprints
 app.register_blueprint(user_routes, url_prefix='/api/users')
 app.register_blueprint(image_routes, url_prefix='/api/images')
 app.register_blueprint(admin_routes, url_prefix='/api/admin')
+app.register_blueprint(metrics_routes)
+
+# Đăng ký các lệnh CLI
+register_commands(app)
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,89 @@
+# benchmarks/bench_json.py
+"""
+Benchmark mã hóa JSON: so sánh tốc độ của bộ mã hóa json chuẩn (Flask) và orjson
+trên các phản hồi danh sách điển hình (feed 20 ảnh, danh sách admin nhiều bản ghi).
+Mỗi bộ mã hóa được gọi như jsonify (sort_keys, ensure_ascii) và kết quả được so sánh với nhau.
+
+    python -m benchmarks.bench_json --rows 20 --rows 1000
+"""
+import argparse
+import datetime
+import json
+import time
+
+from bson import ObjectId
+
+from services.json_encoder import StdlibJSONEncoder, OrjsonEncoder, orjson
+from services.projection import serialize_rows
+from services.serializers import IMAGE_FIELDS
+
+FEED_FIELDS = ('id', 'title', 'description', 'url', 'thumbnail_url', 'srcset', 'created_at', 'is_public', 'captions')
+
+
+def image_rows(count):
+    """Bản ghi thô giống kết quả as_pymongo() của danh sách ảnh"""
+    created_from = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            '_id': ObjectId(),
+            'title': f'Hoàng hôn trên biển {i}',
+            'description': f'Ảnh chụp hoàng hôn ở Đà Nẵng, số {i}' if i % 2 else '',
+            'file_path': f'{i:064x}.jpg',
+            'is_public': i % 5 != 0,
+            'created_at': created_from + datetime.timedelta(minutes=i),
+            'captions': [f'Chú thích {n} cho ảnh {i}' for n in range(i % 3)]
+        }
+        for i in range(count)
+    ]
+
+
+def payload(rows):
+    return {
+        'images': serialize_rows(image_rows(rows), FEED_FIELDS, IMAGE_FIELDS),
+        'per_page': rows,
+        'next_cursor': 'eyJ0IjoxNzA0MDY3MjAwMDAwLCJpZCI6IjY1OTFhYmNkIn0'
+    }
+
+
+def measure(encoder, data, seconds):
+    """Số lần mã hóa mỗi giây và số MB đầu ra mỗi giây"""
+    encode = encoder(sort_keys=True, ensure_ascii=True).encode
+    size = len(encode(data).encode('utf-8'))
+    count = 0
+    started = time.perf_counter()
+    while True:
+        encode(data)
+        count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            break
+    return count / elapsed, count * size / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bộ mã hóa JSON của phản hồi')
+    parser.add_argument('--rows', type=int, action='append', help='Số bản ghi mỗi phản hồi (có thể lặp lại)')
+    parser.add_argument('--seconds', type=float, default=2.0, help='Thời gian đo mỗi trường hợp')
+    args = parser.parse_args()
+
+    encoders = {'stdlib': StdlibJSONEncoder}
+    if orjson is None:
+        print('Chưa cài orjson (pip install orjson), chỉ đo json chuẩn')
+    else:
+        encoders['orjson'] = OrjsonEncoder
+
+    for rows in args.rows or (20, 1000):
+        data = payload(rows)
+        if orjson is not None:
+            expected = json.loads(StdlibJSONEncoder(sort_keys=True).encode(data))
+            if json.loads(OrjsonEncoder(sort_keys=True).encode(data)) != expected:
+                raise SystemExit('orjson cho kết quả khác json chuẩn')
+
+        results = {name: measure(encoder, data, args.seconds) for name, encoder in encoders.items()}
+        baseline = results['stdlib'][0]
+        for name, (ops, megabytes) in results.items():
+            print(f'{rows:>6} bản ghi  {name:<8} {ops:12.1f} lần/giây  {megabytes:8.1f} MB/giây  x{ops / baseline:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_login.py
+"""
+Benchmark đăng nhập: số lần đăng nhập mỗi giây khi lưu last_login bằng user.save()
+(cách cũ) so với ghi gộp qua LastLoginBuffer.
+
+Người dùng được tạo với mật khẩu băm 1 vòng để chi phí ghi cơ sở dữ liệu không bị
+chi phí băm mật khẩu che khuất.
+
+    python -m benchmarks.bench_login --uri mongodb://localhost:27017/airc_bench
+"""
+import argparse
+import datetime
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mongoengine import connect, disconnect
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from models.user import User
+from services.user_service import UserService
+from services.last_login_buffer import last_login_buffer
+
+PASSWORD = 'bench-password'
+
+
+def seed_users(count):
+    collection = User._get_collection()
+    collection.delete_many({})
+    hashed = generate_password_hash(PASSWORD, 'pbkdf2:sha256:1')
+    collection.insert_many([
+        {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': hashed,
+         'role': 'user', 'created_at': datetime.datetime.now()}
+        for i in range(count)
+    ])
+
+
+def authenticate_with_save(username, password):
+    """Đường đăng nhập trước khi có bộ đệm: lưu lại toàn bộ tài liệu User"""
+    user = User.objects(username=username).first()
+    if user and check_password_hash(user.password, password):
+        user.last_login = datetime.datetime.now()
+        user.save()
+        return user
+    return None
+
+
+def run(login, users, logins, threads):
+    names = [f'bench{random.randrange(users)}' for _ in range(logins)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda name: login(name, PASSWORD), names))
+    return logins / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ghi last_login khi đăng nhập')
+    parser.add_argument('--uri', default='mongodb://localhost:27017/airc_bench')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--logins', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    connect(host=args.uri)
+    try:
+        seed_users(args.users)
+        before = run(authenticate_with_save, args.users, args.logins, args.threads)
+        after = run(UserService.authenticate, args.users, args.logins, args.threads)
+        last_login_buffer.stop()
+    finally:
+        disconnect()
+
+    print(f'user.save()        {before:10.1f} lần đăng nhập/giây')
+    print(f'LastLoginBuffer    {after:10.1f} lần đăng nhập/giây  (x{after / before:.2f})')
+
+
+if __name__ == '__main__':
+    main()
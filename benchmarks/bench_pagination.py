@@ -0,0 +1,105 @@
+# benchmarks/bench_pagination.py
+"""
+Benchmark phân trang: so sánh độ trễ trang 1 và trang sâu (mặc định trang 1000)
+giữa phân trang skip/count (page/per_page) và phân trang keyset (cursor).
+
+Chạy trên một cơ sở dữ liệu riêng, ví dụ:
+    python -m benchmarks.bench_pagination --uri mongodb://localhost:27017/airc_bench
+"""
+import argparse
+import datetime
+import statistics
+import time
+
+from bson import ObjectId
+from mongoengine import connect, disconnect
+
+from models.image import Image
+from services.image_service import ImageService
+from services.pagination import encode_cursor
+
+
+def seed_images(count, batch_size=10000):
+    """Tạo `count` hình ảnh công khai với created_at tăng dần"""
+    collection = Image._get_collection()
+    collection.delete_many({})
+    start = datetime.datetime(2020, 1, 1)
+    batch = []
+    for i in range(count):
+        batch.append({
+            '_id': ObjectId(),
+            'title': f'Ảnh {i}',
+            'description': '',
+            'file_path': f'bench_{i}.jpg',
+            'is_public': True,
+            'created_at': start + datetime.timedelta(seconds=i),
+            'captions': []
+        })
+        if len(batch) == batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    collection.create_index([('is_public', 1), ('created_at', -1), ('_id', -1)])
+
+
+def cursor_for_page(page, per_page):
+    """Cursor trỏ tới đầu trang `page` (tương đương vị trí sau (page-1)*per_page phần tử)"""
+    if page == 1:
+        return ''
+    last = (Image.objects(is_public=True)
+            .order_by('-created_at', '-id')
+            .only('created_at')
+            .skip((page - 1) * per_page - 1)
+            .first())
+    return encode_cursor(last.created_at, last.id)
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        page = fn()
+        list(page.items)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark phân trang offset và cursor')
+    parser.add_argument('--uri', default='mongodb://localhost:27017/airc_bench')
+    parser.add_argument('--images', type=int, default=50000)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--deep-page', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--skip-seed', action='store_true')
+    args = parser.parse_args()
+
+    if args.images < args.deep_page * args.per_page:
+        parser.error('--images phải >= --deep-page * --per-page')
+
+    connect(host=args.uri)
+    try:
+        if not args.skip_seed:
+            seed_images(args.images)
+
+        deep_cursor = cursor_for_page(args.deep_page, args.per_page)
+        results = {
+            'offset page 1': measure(
+                lambda: ImageService.get_public_images(1, args.per_page), args.repeat),
+            f'offset page {args.deep_page}': measure(
+                lambda: ImageService.get_public_images(args.deep_page, args.per_page), args.repeat),
+            'cursor page 1': measure(
+                lambda: ImageService.get_public_images(per_page=args.per_page, cursor=''), args.repeat),
+            f'cursor page {args.deep_page}': measure(
+                lambda: ImageService.get_public_images(per_page=args.per_page, cursor=deep_cursor), args.repeat),
+        }
+    finally:
+        disconnect()
+
+    for name, median_ms in results.items():
+        print(f'{name:<24} p50 = {median_ms:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_thumbnails.py
+"""
+Benchmark tạo ảnh phái sinh: số ảnh gốc xử lý mỗi giây (mỗi ảnh tạo đủ các chiều rộng),
+với 1 tiến trình và với N tiến trình, quy đổi ra thông lượng trên mỗi lõi.
+
+    python -m benchmarks.bench_thumbnails --images 40 --workers 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image as PILImage
+
+from services.thumbnail_service import THUMBNAIL_WIDTHS, render_all
+
+
+def make_sources(folder, count, width, height):
+    """Tạo các ảnh JPEG tổng hợp kích thước width x height"""
+    paths = []
+    base = PILImage.effect_mandelbrot((width, height), (-2.0, -1.2, 1.0, 1.2), 60).convert('RGB')
+    for i in range(count):
+        path = os.path.join(folder, f'{i:064x}.jpg')
+        base.rotate(i % 360).save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+def clear_derivatives(folder):
+    for name in os.listdir(folder):
+        if '@w' in name:
+            os.remove(os.path.join(folder, name))
+
+
+def run(paths, workers):
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(render_all, paths, [THUMBNAIL_WIDTHS] * len(paths)))
+    return len(paths) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark thông lượng tạo ảnh thu nhỏ')
+    parser.add_argument('--images', type=int, default=40)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench_thumbnails_')
+    try:
+        paths = make_sources(folder, args.images, args.width, args.height)
+        for workers in sorted({1, args.workers}):
+            clear_derivatives(folder)
+            rate = run(paths, workers)
+            print(f'workers={workers:<3} {rate:8.2f} ảnh/giây  {rate / workers:8.2f} ảnh/giây/lõi')
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# benchmarks/common.py
+"""Tiện ích dùng chung cho các benchmark: kết nối cơ sở dữ liệu và tính phân vị"""
+from mongoengine import connect, disconnect
+import mongoengine.connection
+import math
+
+
+def use_in_memory_database():
+    """
+    Thay MongoClient của MongoEngine bằng mongomock cho các kết nối tạo sau đó.
+    Chỉ để chạy thử nhanh không cần mongod: số đo không đại diện cho production
+    và một số truy vấn (ví dụ $unionWith khi đối soát thống kê) không được hỗ trợ.
+    """
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit('--mock cần gói mongomock (pip install mongomock)')
+    mongoengine.connection.MongoClient = mongomock.MongoClient
+
+
+def connect_database(uri, mock=False):
+    if mock:
+        use_in_memory_database()
+    connect(host=uri)
+
+
+def disconnect_database():
+    disconnect()
+
+
+def percentile(sorted_values, fraction):
+    """Phân vị theo phương pháp nearest-rank trên danh sách đã sắp xếp"""
+    if not sorted_values:
+        return 0.0
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
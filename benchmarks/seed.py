@@ -0,0 +1,175 @@
+# benchmarks/seed.py
+"""
+Tạo dữ liệu tổng hợp cho benchmark: người dùng, hình ảnh (kèm chú thích) và báo cáo,
+theo quy mô cấu hình được (--scale là số hình ảnh, từ 10 nghìn tới 10 triệu).
+
+Số ảnh mỗi người dùng lệch mạnh (vài người tải lên rất nhiều), khoảng 80% ảnh công khai,
+khoảng 1% ảnh bị báo cáo. Mọi người dùng có mật khẩu PASSWORD; ngoài ra có một admin ADMIN_USERNAME.
+
+    python -m benchmarks.seed --uri mongodb://localhost:27017/airc_bench --scale 100000
+    python -m benchmarks.seed --mock --scale 10000
+"""
+import argparse
+import datetime
+import hashlib
+import random
+import time
+
+from bson import ObjectId
+from werkzeug.security import generate_password_hash
+
+from benchmarks.common import connect_database, disconnect_database
+from database.migrator import Migrator
+from database.setup import get_database
+from models.user import User
+from models.image import Image
+from models.report import Report
+from models.stats import Stats
+from services.password_hasher import password_hasher
+from services.stats_service import StatsService
+
+PASSWORD = 'bench-password'
+ADMIN_USERNAME = 'bench_admin'
+
+WORDS = (
+    'biển', 'núi', 'hoàng hôn', 'phố cổ', 'cà phê', 'mèo', 'chó', 'hoa sen', 'ruộng bậc thang',
+    'áo dài', 'đèn lồng', 'chợ nổi', 'mưa', 'đường phố', 'bánh mì', 'sông', 'cầu', 'đêm'
+)
+REPORT_REASONS = ('Spam', 'Nội dung không phù hợp', 'Vi phạm bản quyền', 'Hình ảnh trùng lặp')
+# Tỷ lệ trạng thái báo cáo: phần lớn đang chờ xử lý
+REPORT_STATUSES = ('pending',) * 6 + ('reviewed', 'rejected', 'approved', 'approved')
+
+USER_KIND, IMAGE_KIND, REPORT_KIND = 1, 2, 3
+
+
+def object_id(kind, index):
+    """ObjectId xác định theo loại và số thứ tự, để tham chiếu chéo mà không phải giữ mọi id trong bộ nhớ"""
+    return ObjectId(f'{kind:08x}{index:016x}')
+
+
+def scale_counts(scale):
+    """Số người dùng, hình ảnh và báo cáo tương ứng với quy mô (số hình ảnh)"""
+    return max(scale // 20, 10), scale, max(scale // 100, 10)
+
+
+def _insert(collection, documents, batch_size):
+    """Ghi các tài liệu theo lô bằng insert_many, trả về số tài liệu đã ghi"""
+    batch, total = [], 0
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            collection.insert_many(batch, ordered=False)
+            total += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        total += len(batch)
+    return total
+
+
+def _users(count, password_hash, created_from):
+    yield {
+        '_id': object_id(USER_KIND, count), 'username': ADMIN_USERNAME, 'email': f'{ADMIN_USERNAME}@example.com',
+        'password': password_hash, 'role': 'admin', 'created_at': created_from
+    }
+    for i in range(count):
+        yield {
+            '_id': object_id(USER_KIND, i), 'username': f'user{i}', 'email': f'user{i}@example.com',
+            'password': password_hash, 'role': 'user',
+            'created_at': created_from + datetime.timedelta(minutes=i)
+        }
+
+
+def _images(count, users, created_from, rng, counters):
+    span = (datetime.datetime.now() - created_from).total_seconds()
+    for i in range(count):
+        is_public = rng.random() < 0.8
+        counters['public_images'] += is_public
+        title = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        yield {
+            '_id': object_id(IMAGE_KIND, i),
+            'title': title.capitalize(),
+            'description': f'Ảnh {title} số {i}' if rng.random() < 0.5 else '',
+            'file_path': hashlib.sha256(str(i).encode()).hexdigest() + '.jpg',
+            'original_filename': f'IMG_{i:07d}.jpg',
+            'width': 1920, 'height': 1080,
+            # Lũy thừa của số ngẫu nhiên dồn ảnh về các người dùng đầu tiên (user0 tải lên nhiều nhất)
+            'uploaded_by': object_id(USER_KIND, int(users * rng.random() ** 3)),
+            'is_public': is_public,
+            'created_at': created_from + datetime.timedelta(seconds=span * i / count),
+            'captions': [f'Chú thích {n} cho {title}' for n in range(rng.choice((0, 0, 1, 1, 2, 3)))]
+        }
+
+
+def _reports(count, users, images, created_from, rng, counters):
+    for i in range(count):
+        status = rng.choice(REPORT_STATUSES)
+        counters['pending_reports'] += status == 'pending'
+        yield {
+            '_id': object_id(REPORT_KIND, i),
+            'image': object_id(IMAGE_KIND, rng.randrange(images)),
+            'reported_by': object_id(USER_KIND, rng.randrange(users)),
+            'reason': rng.choice(REPORT_REASONS),
+            'status': status,
+            'created_at': created_from + datetime.timedelta(seconds=i)
+        }
+
+
+def seed(users, images, reports, batch_size=10000, random_seed=42, log=print):
+    """Xóa và tạo lại dữ liệu benchmark; trả về số lượng từng loại"""
+    rng = random.Random(random_seed)
+    created_from = datetime.datetime.now() - datetime.timedelta(days=365)
+    counters = {'users': users + 1, 'images': images, 'public_images': 0, 'pending_reports': 0}
+
+    for model in (User, Image, Report, Stats):
+        model._get_collection().delete_many({})
+    # Chỉ mục của Image và Report do migration tạo
+    User.ensure_indexes()
+    Migrator(get_database()).run()
+
+    # Băm mật khẩu một lần theo cấu hình hiện tại (dùng chung cho mọi người dùng tổng hợp)
+    password_hash = generate_password_hash(PASSWORD, password_hasher.method)
+
+    started = time.perf_counter()
+    _insert(User._get_collection(), _users(users, password_hash, created_from), batch_size)
+    log(f'Đã tạo {users + 1} người dùng')
+    _insert(Image._get_collection(), _images(images, users, created_from, rng, counters), batch_size)
+    log(f'Đã tạo {images} hình ảnh')
+    _insert(Report._get_collection(), _reports(reports, users, images, created_from, rng, counters), batch_size)
+    log(f'Đã tạo {reports} báo cáo ({time.perf_counter() - started:.1f} giây)')
+
+    now = datetime.datetime.now()
+    Stats._get_collection().replace_one(
+        {'_id': StatsService.KEY},
+        {**counters, 'reconciled_at': now, 'updated_at': now},
+        upsert=True
+    )
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tạo dữ liệu tổng hợp cho benchmark')
+    parser.add_argument('--uri', default='mongodb://localhost:27017/airc_bench')
+    parser.add_argument('--mock', action='store_true', help='Dùng cơ sở dữ liệu trong bộ nhớ (mongomock)')
+    parser.add_argument('--scale', type=int, default=10000, help='Số hình ảnh')
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--reports', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--random-seed', type=int, default=42)
+    args = parser.parse_args()
+
+    users, images, reports = scale_counts(args.scale)
+    connect_database(args.uri, args.mock)
+    try:
+        counters = seed(
+            args.users or users, images, args.reports or reports,
+            batch_size=args.batch_size, random_seed=args.random_seed
+        )
+    finally:
+        disconnect_database()
+
+    print(' '.join(f'{name}={value}' for name, value in counters.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+# benchmarks/suite.py
+"""
+Bộ benchmark các đường nóng của API, chạy qua Flask test client (gồm cả controller và service):
+feed công khai, ảnh của tôi, đăng nhập, tải ảnh lên, danh sách báo cáo và thống kê admin.
+Mỗi kịch bản ghi p50/p99 (ms) và số thao tác mỗi giây ra tệp JSON.
+
+Tạo baseline rồi so sánh (thoát với mã 1 nếu có kịch bản chậm đi quá --threshold):
+    python -m benchmarks.suite --uri mongodb://localhost:27017/airc_bench --scale 100000 --output baseline.json
+    python -m benchmarks.suite --uri mongodb://localhost:27017/airc_bench --skip-seed --compare baseline.json
+
+--mock chạy trên mongomock (không cần mongod) để thử nhanh bộ benchmark.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.common import use_in_memory_database, percentile
+
+SCENARIOS = ('public_feed', 'public_feed_deep', 'my_images', 'login', 'upload', 'reports', 'stats')
+
+
+def load_app(uri, mock):
+    """Nạp ứng dụng Flask với cơ sở dữ liệu benchmark (phải gọi trước khi import app)"""
+    os.environ['MONGODB_URI'] = uri
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-not-for-production')
+    os.environ['RUN_MIGRATIONS_ON_STARTUP'] = 'false'
+    # Tắt cache feed để public_feed đo truy vấn thật, không chỉ các lần trúng cache
+    os.environ['FEED_CACHE_PAGES'] = '0'
+    if mock:
+        use_in_memory_database()
+    from app import app
+    return app
+
+
+def png_bytes(index):
+    """Một ảnh PNG nhỏ có nội dung khác nhau theo index (tránh bị gộp do trùng nội dung)"""
+    from PIL import Image as PILImage
+    image = PILImage.new('RGB', (32, 32), (index % 256, (index // 256) % 256, (index // 65536) % 256))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def build_scenarios(app, counts):
+    """Mỗi kịch bản là hàm nhận số thứ tự lần chạy và trả về (mã trạng thái mong đợi, response)"""
+    from flask_jwt_extended import create_access_token
+    from benchmarks.seed import object_id, USER_KIND, PASSWORD
+    from services.pagination import encode_cursor
+    from models.image import Image
+
+    users = counts['users'] - 1
+    with app.app_context():
+        # user0 là người tải lên nhiều ảnh nhất trong dữ liệu tổng hợp
+        user_token = create_access_token(identity=str(object_id(USER_KIND, 0)), additional_claims={'role': 'user'})
+        admin_token = create_access_token(
+            identity=str(object_id(USER_KIND, users)), additional_claims={'role': 'admin'}
+        )
+        middle = (Image.objects(is_public=True).order_by('-created_at', '-id')
+                  .only('created_at').skip(counts['public_images'] // 2).first())
+        deep_cursor = encode_cursor(middle.created_at, middle.id) if middle else ''
+
+    client = app.test_client()
+    user_headers = {'Authorization': f'Bearer {user_token}'}
+    admin_headers = {'Authorization': f'Bearer {admin_token}'}
+
+    def upload(i):
+        data = {'file': (io.BytesIO(png_bytes(i)), f'bench_{i}.png'), 'title': f'Benchmark {i}'}
+        return 201, client.post('/api/images/', data=data, headers=user_headers, content_type='multipart/form-data')
+
+    return {
+        'public_feed': lambda i: (200, client.get('/api/images/?cursor=&per_page=20')),
+        'public_feed_deep': lambda i: (200, client.get(f'/api/images/?cursor={deep_cursor}&per_page=20')),
+        'my_images': lambda i: (200, client.get('/api/images/my-images?cursor=&per_page=20', headers=user_headers)),
+        'login': lambda i: (200, client.post('/api/users/login', json={
+            'username': f'user{i % users}', 'password': PASSWORD
+        })),
+        'upload': upload,
+        'reports': lambda i: (200, client.get('/api/admin/reports?status=pending&cursor=', headers=admin_headers)),
+        'stats': lambda i: (200, client.get('/api/admin/stats', headers=admin_headers))
+    }
+
+
+def run_scenario(fn, iterations, warmup):
+    for i in range(warmup):
+        fn(i)
+
+    timings = []
+    for i in range(warmup, warmup + iterations):
+        started = time.perf_counter()
+        expected, response = fn(i)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != expected:
+            raise RuntimeError(f'Mã trạng thái {response.status_code} (mong đợi {expected}): {response.get_data(as_text=True)[:200]}')
+
+    timings.sort()
+    return {
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'ops_per_sec': round(iterations / (sum(timings) / 1000), 1),
+        'iterations': iterations
+    }
+
+
+def compare(results, baseline, threshold):
+    """In bảng so sánh với baseline; trả về danh sách kịch bản bị chậm đi quá ngưỡng"""
+    regressions = []
+    print(f"{'kịch bản':<18}{'p50 cũ':>10}{'p50 mới':>10}{'ops cũ':>10}{'ops mới':>10}  thay đổi")
+    for name, current in results['scenarios'].items():
+        previous = baseline['scenarios'].get(name)
+        if previous is None:
+            print(f'{name:<18} (không có trong baseline)')
+            continue
+        slower = current['p50_ms'] / previous['p50_ms'] - 1 if previous['p50_ms'] else 0.0
+        fewer_ops = 1 - current['ops_per_sec'] / previous['ops_per_sec'] if previous['ops_per_sec'] else 0.0
+        regressed = slower > threshold or fewer_ops > threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<18}{previous['p50_ms']:>10.2f}{current['p50_ms']:>10.2f}"
+            f"{previous['ops_per_sec']:>10.1f}{current['ops_per_sec']:>10.1f}  "
+            f"{slower:+.0%}{'  CHẬM HƠN' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark các đường nóng của API')
+    parser.add_argument('--uri', default='mongodb://localhost:27017/airc_bench')
+    parser.add_argument('--mock', action='store_true', help='Dùng cơ sở dữ liệu trong bộ nhớ (mongomock)')
+    parser.add_argument('--scale', type=int, default=10000, help='Số hình ảnh khi tạo dữ liệu')
+    parser.add_argument('--skip-seed', action='store_true', help='Dùng dữ liệu đã tạo bằng benchmarks.seed')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Chỉ chạy các kịch bản này')
+    parser.add_argument('--output', help='Ghi kết quả ra tệp JSON (baseline)')
+    parser.add_argument('--compare', help='So sánh với tệp JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Mức chậm đi cho phép (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    app = load_app(args.uri, args.mock)
+
+    from benchmarks.seed import seed, scale_counts
+    from models.stats import Stats
+    from services.storage_service import StorageService
+    from services.last_login_buffer import last_login_buffer
+
+    if args.skip_seed:
+        counts = Stats._get_collection().find_one({}) or {}
+        if not counts.get('users'):
+            parser.error('Chưa có dữ liệu, hãy chạy benchmarks.seed trước hoặc bỏ --skip-seed')
+    else:
+        users, images, reports = scale_counts(args.scale)
+        counts = seed(users, images, reports)
+
+    # Ảnh tải lên trong benchmark được ghi vào thư mục tạm
+    upload_folder = tempfile.mkdtemp(prefix='airc_bench_')
+    StorageService.UPLOAD_FOLDER = upload_folder
+    try:
+        scenarios = build_scenarios(app, counts)
+        results = {
+            'meta': {
+                'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'mock': args.mock,
+                'images': counts['images'],
+                'users': counts['users'],
+                'python': platform.python_version()
+            },
+            'scenarios': {}
+        }
+        for name in args.scenario or SCENARIOS:
+            results['scenarios'][name] = run_scenario(scenarios[name], args.iterations, args.warmup)
+            stats = results['scenarios'][name]
+            print(f"{name:<18} p50 = {stats['p50_ms']:8.2f} ms  p99 = {stats['p99_ms']:8.2f} ms  "
+                  f"{stats['ops_per_sec']:10.1f} ops/giây")
+    finally:
+        last_login_buffer.stop()
+        shutil.rmtree(upload_folder, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as source:
+            baseline = json.load(source)
+        if baseline['meta'].get('images') != results['meta']['images']:
+            print('Cảnh báo: baseline được đo trên lượng dữ liệu khác')
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Chậm đi quá {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# commands.py
+import click
+import time
+from services.stats_service import StatsService
+from services.storage_service import StorageService
+from services.job_queue import Worker
+from database.setup import get_database
+from database.migrator import Migrator, MigrationLocked
+
+def register_commands(app):
+    """Đăng ký các lệnh quản trị chạy qua `flask <lệnh>`"""
+    
+    @app.cli.command('reconcile-stats')
+    def reconcile_stats():
+        """Tính lại bộ đếm thống kê từ dữ liệu thực tế"""
+        stats = StatsService.reconcile()
+        click.echo(
+            f"users={stats['users']} images={stats['images']} "
+            f"public_images={stats['public_images']} pending_reports={stats['pending_reports']}"
+        )
+    
+    @app.cli.command('migrate-uploads')
+    @click.option('--batch-size', default=500, help='Số tệp chuyển trong mỗi lô')
+    @click.option('--pause', default=0.1, help='Số giây nghỉ giữa các lô')
+    def migrate_uploads(batch_size, pause):
+        """Chuyển tệp tải lên từ thư mục phẳng sang thư mục shard (có thể chạy lại)"""
+        total = 0
+        while True:
+            moved = StorageService.migrate_to_shards(batch_size)
+            if not moved:
+                break
+            total += moved
+            click.echo(f'Đã chuyển {total} tệp')
+            time.sleep(pause)
+        click.echo(f'Hoàn tất, tổng cộng {total} tệp')
+    
+    @app.cli.command('jobs-worker')
+    @click.option('--concurrency', type=int, default=None, help='Số công việc chạy song song')
+    @click.option('--mode', type=click.Choice(['thread', 'process']), default=None, help='Kiểu pool')
+    def jobs_worker(concurrency, mode):
+        """Chạy worker xử lý công việc nền (xóa tệp, tạo ảnh thu nhỏ, đọc metadata)"""
+        worker = Worker(
+            concurrency=concurrency or app.config['JOB_WORKER_CONCURRENCY'],
+            mode=mode or app.config['JOB_WORKER_MODE'],
+            mongodb_settings=app.config['MONGODB_SETTINGS']
+        )
+        click.echo(f'Worker đang chạy ({worker.mode}, {worker.concurrency} công việc song song)')
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            worker.stop()
+    
+    @app.cli.command('db-migrate')
+    @click.option('--target', type=int, default=None, help='Chỉ áp dụng tới phiên bản này')
+    @click.option('--wait', default=0, help='Số giây chờ nếu tiến trình khác đang giữ khóa')
+    @click.option('--dry-run', is_flag=True, help='Chỉ liệt kê các migration chưa áp dụng')
+    def db_migrate(target, wait, dry_run):
+        """Áp dụng các migration cơ sở dữ liệu còn thiếu (chạy trước khi triển khai)"""
+        migrator = Migrator(get_database(), lock_ttl=app.config['MIGRATION_LOCK_TTL'])
+        click.echo(f'Phiên bản hiện tại: {migrator.current_version()}')
+        
+        if dry_run:
+            for migration in migrator.pending(target):
+                click.echo(f'Chờ áp dụng {migration.version}: {migration.description}')
+            return
+        
+        try:
+            applied = migrator.run(target=target, wait=wait)
+        except MigrationLocked as e:
+            raise click.ClickException(str(e))
+        
+        for migration in applied:
+            click.echo(f'Đã áp dụng {migration.version}: {migration.description}')
+        click.echo(f'Phiên bản hiện tại: {migrator.current_version()}')
@@ -1,20 +1,40 @@
 # controllers/admin_controller.py
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, current_app, Response, stream_with_context
 from services.user_service import UserService
 from services.image_service import ImageService
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.serializers import USER_FIELDS, IMAGE_FIELDS, REPORT_FIELDS, serialize_report
+from services.pagination import InvalidCursor, clamp_per_page, page_meta
+from services.projection import InvalidFields, select_fields, serialize_rows
+from services.stats_service import StatsService
+from services.moderation_service import ModerationService, InvalidBulkRequest
+from services.export_service import ExportService, InvalidExport, EXPORT_FORMATS, parse_since, to_ndjson, to_csv
+from services.auth_cache import auth_cache
+from monitoring.pool import pool_metrics
+from monitoring.slow_queries import slow_query_log
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from models.user import User
 from functools import wraps
 
 admin_controller = Blueprint('admin_controller', __name__)
 
+# Các trường mặc định (và được phép chọn qua ?fields=) của từng danh sách
+ADMIN_USER_FIELDS = ('id', 'username', 'email', 'role', 'created_at', 'last_login')
+ADMIN_IMAGE_FIELDS = (
+    'id', 'title', 'description', 'url', 'thumbnail_url', 'srcset',
+    'created_at', 'uploaded_by', 'is_public', 'captions'
+)
+# Các bộ dữ liệu xuất được (/export/<dataset>) và trường mặc định của từng bộ
+EXPORT_DATASETS = {'users': ADMIN_USER_FIELDS, 'images': ADMIN_IMAGE_FIELDS, 'reports': REPORT_FIELDS}
+
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.objects(id=user_id).first()
+        # Token không mang vai trò admin thì từ chối ngay, không cần truy vấn
+        if get_jwt().get('role', 'admin') != 'admin':
+            return jsonify({'error': 'Yêu cầu quyền admin'}), 403
         
-        if not user or user.role != 'admin':
+        # Xác nhận lại qua cache để admin bị hạ quyền hoặc bị xóa không dùng được token cũ
+        if auth_cache.get_role(get_jwt_identity()) != 'admin':
             return jsonify({'error': 'Yêu cầu quyền admin'}), 403
         
         return fn(*args, **kwargs)
@@ -25,24 +45,18 @@ def admin_required(fn):
 @admin_required
 def get_all_users():
     page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
+    
+    try:
+        fields = select_fields(request.args.get('fields'), ADMIN_USER_FIELDS)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
     
-    users = UserService.get_all_users(page, per_page)
+    users = UserService.get_all_users(page, per_page, fields=fields)
     
     return jsonify({
-        'users': [
-            {
-                'id': str(user.id),
-                'username': user.username,
-                'email': user.email,
-                'role': user.role,
-                'created_at': user.created_at,
-                'last_login': user.last_login
-            } for user in users.items
-        ],
-        'total': users.total,
-        'pages': users.pages,
-        'page': users.page
+        'users': serialize_rows(users.items, fields, USER_FIELDS),
+        **page_meta(users)
     }), 200
 
 @admin_controller.route('/users/<user_id>', methods=['PUT'])
@@ -65,6 +79,7 @@ def update_user(user_id):
             setattr(user, key, value)
     
     user.save()
+    auth_cache.invalidate(user_id)
     return jsonify({'message': 'Cập nhật người dùng thành công'}), 200
 
 @admin_controller.route('/users/<user_id>', methods=['DELETE'])
@@ -77,31 +92,42 @@ def delete_user(user_id):
     
     return jsonify({'message': 'Xóa người dùng thành công'}), 200
 
+@admin_controller.route('/users/bulk-delete', methods=['POST'])
+@jwt_required()
+@admin_required
+def bulk_delete_users():
+    """Xóa nhiều người dùng theo danh sách ids"""
+    data = request.get_json() or {}
+    
+    try:
+        result = ModerationService.delete_users(
+            data.get('ids'),
+            exclude=get_jwt_identity(),
+            dry_run=bool(data.get('dry_run', False)),
+            **_bulk_limits()
+        )
+    except InvalidBulkRequest as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(result), 200
+
 @admin_controller.route('/images', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_all_images():
     page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
+    cursor = request.args.get('cursor')
     
-    images = ImageService.get_all_images(page, per_page)
+    try:
+        fields = select_fields(request.args.get('fields'), ADMIN_IMAGE_FIELDS)
+        images = ImageService.get_all_images(page, per_page, cursor=cursor, fields=fields)
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'images': [
-            {
-                'id': str(img.id),
-                'title': img.title,
-                'description': img.description,
-                'url': f"/api/images/file/{img.file_path}",
-                'created_at': img.created_at,
-                'uploaded_by': str(img.uploaded_by.id) if img.uploaded_by else None,
-                'is_public': img.is_public,
-                'captions': img.captions
-            } for img in images.items
-        ],
-        'total': images.total,
-        'pages': images.pages,
-        'page': images.page
+        'images': serialize_rows(images.items, fields, IMAGE_FIELDS),
+        **page_meta(images)
     }), 200
 
 @admin_controller.route('/images/<image_id>', methods=['DELETE'])
@@ -114,33 +140,47 @@ def admin_delete_image(image_id):
     
     return jsonify({'message': 'Xóa hình ảnh thành công'}), 200
 
+@admin_controller.route('/images/bulk-delete', methods=['POST'])
+@jwt_required()
+@admin_required
+def bulk_delete_images():
+    """Xóa nhiều hình ảnh theo danh sách ids hoặc theo người tải lên (uploaded_by)"""
+    data = request.get_json() or {}
+    
+    try:
+        result = ModerationService.delete_images(
+            ids=data.get('ids'),
+            uploaded_by=data.get('uploaded_by'),
+            dry_run=bool(data.get('dry_run', False)),
+            **_bulk_limits()
+        )
+    except InvalidBulkRequest as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(result), 200
+
 @admin_controller.route('/reports', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_reports():
     page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
     status = request.args.get('status', None)
+    cursor = request.args.get('cursor')
+    
+    try:
+        reports = ImageService.get_reports(page, per_page, status, cursor=cursor)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     
-    reports = ImageService.get_reports(page, per_page, status)
+    images_by_id, users_by_id = ImageService.load_report_references(reports.items)
     
     return jsonify({
         'reports': [
-            {
-                'id': str(report.id),
-                'image_id': str(report.image.id),
-                'image_title': report.image.title,
-                'image_url': f"/api/images/file/{report.image.file_path}",
-                'reported_by': str(report.reported_by.id),
-                'reporter_username': report.reported_by.username,
-                'reason': report.reason,
-                'status': report.status,
-                'created_at': report.created_at
-            } for report in reports.items
+            serialize_report(report, images_by_id.get(report['image']), users_by_id.get(report['reported_by']))
+            for report in reports.items
         ],
-        'total': reports.total,
-        'pages': reports.pages,
-        'page': reports.page
+        **page_meta(reports)
     }), 200
 
 @admin_controller.route('/reports/<report_id>', methods=['PUT'])
@@ -158,19 +198,115 @@ def update_report(report_id):
     
     return jsonify({'message': 'Cập nhật báo cáo thành công'}), 200
 
+@admin_controller.route('/reports/bulk-update', methods=['POST'])
+@jwt_required()
+@admin_required
+def bulk_update_reports():
+    """Cập nhật trạng thái nhiều báo cáo theo ids hoặc bộ lọc (image_id, current_status)"""
+    data = request.get_json() or {}
+    
+    if 'status' not in data:
+        return jsonify({'error': 'Trạng thái là bắt buộc'}), 400
+    
+    try:
+        result = ModerationService.update_reports(
+            data['status'],
+            ids=data.get('ids'),
+            image_id=data.get('image_id'),
+            current_status=data.get('current_status'),
+            dry_run=bool(data.get('dry_run', False)),
+            **_bulk_limits()
+        )
+    except InvalidBulkRequest as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(result), 200
+
+def _bulk_limits():
+    return {
+        'limit': current_app.config['BULK_MAX_ITEMS'],
+        'batch_size': current_app.config['BULK_BATCH_SIZE']
+    }
+
+@admin_controller.route('/export/<dataset>', methods=['GET'])
+@jwt_required()
+@admin_required
+def export_dataset(dataset):
+    """
+    Xuất toàn bộ người dùng, hình ảnh hoặc báo cáo dạng NDJSON hoặc CSV theo luồng (bộ nhớ cố định),
+    theo thứ tự created_at tăng dần. ?since= (xuất tăng dần) lấy bản ghi tạo từ thời điểm đó
+    lùi lại EXPORT_SINCE_OVERLAP giây: một số dòng của lần xuất trước được xuất lại và cần bỏ trùng theo id.
+    """
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': 'Không có bộ dữ liệu này'}), 404
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format phải là một trong: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    try:
+        fields = select_fields(request.args.get('fields'), EXPORT_DATASETS[dataset])
+        since = parse_since(request.args.get('since'), current_app.config['EXPORT_SINCE_OVERLAP'])
+        # Xuất tăng dần luôn có id để client bỏ trùng các dòng chồng lấn
+        if since is not None and 'id' not in fields:
+            fields = ['id'] + fields
+    except (InvalidFields, InvalidExport) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    if dataset == 'users':
+        batches = ExportService.export_users(fields, since, batch_size)
+    elif dataset == 'images':
+        batches = ExportService.export_images(fields, since, batch_size)
+    else:
+        batches = ExportService.export_reports(fields, since, request.args.get('status'), batch_size)
+    
+    if export_format == 'csv':
+        chunks = to_csv(batches, fields)
+    else:
+        # Dùng bộ mã hóa JSON của ứng dụng (orjson nếu có), giữ nguyên ký tự tiếng Việt
+        chunks = to_ndjson(batches, current_app.json_encoder(ensure_ascii=False).encode)
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={dataset}.{extension}'
+    # Không để proxy (nginx) gom toàn bộ phản hồi trước khi gửi
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @admin_controller.route('/stats', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_stats():
     """Lấy thống kê hệ thống cho admin"""
-    user_count = User.objects.count()
-    image_count = Image.objects.count()
-    public_image_count = Image.objects(is_public=True).count()
-    pending_reports_count = Report.objects(status='pending').count()
+    stats = StatsService.get_stats(current_app.config['STATS_MAX_STALENESS'])
     
     return jsonify({
-        'users': user_count,
-        'images': image_count,
-        'public_images': public_image_count,
-        'pending_reports': pending_reports_count
+        'users': stats['users'],
+        'images': stats['images'],
+        'public_images': stats['public_images'],
+        'pending_reports': stats['pending_reports'],
+        'reconciled_at': stats['reconciled_at']
     }), 200
+
+@admin_controller.route('/db/pool', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_pool_stats():
+    """Thống kê pool kết nối MongoDB của tiến trình hiện tại"""
+    return jsonify(pool_metrics.stats()), 200
+
+@admin_controller.route('/db/slow-queries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_slow_queries():
+    """Các lệnh MongoDB chậm gần đây, gộp theo dạng truy vấn, kèm tóm tắt explain"""
+    limit = int(request.args.get('limit', 50))
+    return jsonify(slow_query_log.report(limit)), 200
+
+@admin_controller.route('/db/slow-queries', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def reset_slow_queries():
+    slow_query_log.reset()
+    return jsonify({'message': 'Đã xóa nhật ký truy vấn chậm'}), 200
@@ -1,11 +1,33 @@
 # controllers/image_controller.py
-from flask import request, jsonify, Blueprint, send_from_directory
+from flask import request, jsonify, Blueprint, send_from_directory, current_app, abort
 from services.image_service import ImageService
+from services.serializers import IMAGE_FIELDS, serialize_image
+from services.pagination import InvalidCursor, clamp_per_page, page_meta
+from services.projection import FieldSpec, InvalidFields, select_fields, serialize_rows
+from services.storage_service import StorageService, UnsupportedFileType, FileTooLarge, StorageBusy
+from services.thumbnail_service import ThumbnailService
+from services.feed_cache import feed_cache, make_etag
+from services.search_service import SearchService
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import secure_filename
+import mimetypes
 import os
 
 image_controller = Blueprint('image_controller', __name__)
 
+# Tệp ảnh không bao giờ đổi nội dung nên được cache một năm
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 3600
+
+# Các trường mặc định (và được phép chọn qua ?fields=) của từng danh sách
+PUBLIC_IMAGE_FIELDS = ('id', 'title', 'description', 'url', 'thumbnail_url', 'srcset', 'created_at', 'captions')
+MY_IMAGE_FIELDS = ('id', 'title', 'description', 'url', 'thumbnail_url', 'srcset', 'created_at', 'is_public', 'captions')
+SEARCH_IMAGE_FIELDS = MY_IMAGE_FIELDS + ('score',)
+# Kết quả tìm kiếm có thêm điểm liên quan
+SEARCH_FIELD_SPECS = {**IMAGE_FIELDS, 'score': FieldSpec('_score', lambda score: round(score, 4), default=0)}
+# Độ dài tối đa của chuỗi tìm kiếm
+MAX_SEARCH_LENGTH = 200
+
 @image_controller.route('/', methods=['POST'])
 @jwt_required()
 def upload_image():
@@ -18,50 +40,179 @@ def upload_image():
     if file.filename == '':
         return jsonify({'error': 'Không có tệp được chọn'}), 400
     
-    if file and allowed_file(file.filename):
-        try:
-            image = ImageService.upload_image(
-                file=file,
-                title=request.form.get('title', 'Không có tiêu đề'),
-                description=request.form.get('description', ''),
-                user_id=user_id,
-                is_public=request.form.get('is_public', 'true').lower() == 'true'
-            )
-            return jsonify({
-                'id': str(image.id),
-                'title': image.title,
-                'url': f"/api/images/file/{image.file_path}"
-            }), 201
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
-    
-    return jsonify({'error': 'Loại tệp không được phép'}), 400
+    try:
+        image = ImageService.upload_image(
+            file=file,
+            title=request.form.get('title', 'Không có tiêu đề'),
+            description=request.form.get('description', ''),
+            user_id=user_id,
+            is_public=request.form.get('is_public', 'true').lower() == 'true',
+            max_size=current_app.config['MAX_UPLOAD_SIZE']
+        )
+        return jsonify(serialize_image(image)), 201
+    except UnsupportedFileType:
+        return jsonify({'error': 'Loại tệp không được phép'}), 400
+    except FileTooLarge:
+        return jsonify({'error': 'Tệp quá lớn'}), 413
+    except StorageBusy as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@image_controller.route('/batch', methods=['POST'])
+@jwt_required()
+def upload_images():
+    user_id = get_jwt_identity()
+    
+    files = [file for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'Không có tệp được chọn'}), 400
+    if len(files) > current_app.config['MAX_BATCH_FILES']:
+        return jsonify({'error': f"Tối đa {current_app.config['MAX_BATCH_FILES']} tệp mỗi lần tải lên"}), 400
+    
+    try:
+        results = ImageService.upload_images(
+            files=files,
+            user_id=user_id,
+            titles=request.form.getlist('title'),
+            descriptions=request.form.getlist('description'),
+            is_public=request.form.get('is_public', 'true').lower() == 'true',
+            max_size=current_app.config['MAX_UPLOAD_SIZE']
+        )
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    uploaded = sum(1 for result in results if result['status'] == 201)
+    # 201 khi tất cả thành công, 207 khi thành công một phần, 400 khi tất cả thất bại
+    status = 201 if uploaded == len(results) else 207 if uploaded else 400
+    return jsonify({
+        'results': results,
+        'uploaded': uploaded,
+        'failed': len(results) - uploaded
+    }), status
 
 @image_controller.route('/file/<filename>', methods=['GET'])
 def get_image(filename):
-    return send_from_directory(ImageService.UPLOAD_FOLDER, filename)
+    width = request.args.get('w', type=int)
+    if width:
+        if secure_filename(filename) != filename:
+            abort(404)
+        try:
+            filename = ThumbnailService.get_or_create(filename, width)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except FileNotFoundError:
+            abort(404)
+    
+    return _send_image(filename)
+
+def _send_image(filename):
+    """
+    Gửi tệp ảnh kèm ETag mạnh và Cache-Control immutable, hỗ trợ If-None-Match (304) và Range (206).
+    Tên tệp được đặt theo nội dung (hoặc uuid) nên nội dung không bao giờ thay đổi.
+    Với IMAGE_OFFLOAD, proxy phía trước (nginx/Apache) gửi dữ liệu thay cho Flask.
+    """
+    offload = current_app.config['IMAGE_OFFLOAD']
+    
+    # Tệp có thể nằm trong thư mục shard hoặc thư mục phẳng cũ (đang chờ migration)
+    relative_path = StorageService.resolve(filename)
+    if not relative_path:
+        abort(404)
+    
+    if offload == 'x-accel-redirect':
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = (
+            current_app.config['IMAGE_ACCEL_PREFIX'] + relative_path.replace(os.sep, '/')
+        )
+    else:
+        # Với IMAGE_OFFLOAD = 'x-sendfile', send_file tự đặt header X-Sendfile (USE_X_SENDFILE)
+        try:
+            response = _send_stored_file(relative_path)
+        except NotFound:
+            # Tệp vừa được migration chuyển sang thư mục shard, tìm lại một lần
+            relative_path = StorageService.resolve(filename)
+            if not relative_path:
+                raise
+            response = _send_stored_file(relative_path)
+    
+    response.set_etag(filename)
+    response.headers['Cache-Control'] = f'public, max-age={IMAGE_CACHE_MAX_AGE}, immutable'
+    # Khi offload, proxy tự xử lý Range
+    response.make_conditional(request, accept_ranges=not offload, complete_length=response.content_length)
+    if response.status_code == 304:
+        response.headers.pop('X-Sendfile', None)
+        response.headers.pop('X-Accel-Redirect', None)
+    return response
+
+def _send_stored_file(relative_path):
+    return send_from_directory(
+        StorageService.UPLOAD_FOLDER, relative_path,
+        add_etags=False, conditional=False, cache_timeout=IMAGE_CACHE_MAX_AGE
+    )
 
 @image_controller.route('/', methods=['GET'])
 def get_public_images():
     page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
+    cursor = request.args.get('cursor')
     
-    images = ImageService.get_public_images(page, per_page)
+    try:
+        fields = select_fields(request.args.get('fields'), PUBLIC_IMAGE_FIELDS)
+        
+        def build():
+            images = ImageService.get_public_images(page, per_page, cursor=cursor, fields=fields)
+            return jsonify({
+                'images': serialize_rows(images.items, fields, IMAGE_FIELDS),
+                **page_meta(images)
+            }).get_data()
+        
+        # Các trang đầu giống nhau với mọi người xem nên được dùng chung qua feed_cache
+        if feed_cache.is_cacheable(page, cursor, per_page):
+            key = f"{page}:{per_page}:{cursor}:{','.join(fields)}"
+            body, etag = feed_cache.get_or_build(key, build)
+        else:
+            body = build()
+            etag = make_etag(body)
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Cho phép lưu nhưng luôn hỏi lại máy chủ; nội dung không đổi thì nhận 304
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response.make_conditional(request)
+
+@image_controller.route('/search', methods=['GET'])
+@jwt_required(optional=True)
+def search_images():
+    """Tìm hình ảnh công khai (và ảnh của chính người dùng nếu đã đăng nhập) theo độ liên quan"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Thiếu từ khóa tìm kiếm'}), 400
+    if len(query) > MAX_SEARCH_LENGTH:
+        return jsonify({'error': f'Từ khóa tối đa {MAX_SEARCH_LENGTH} ký tự'}), 400
+    
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
+    
+    try:
+        fields = select_fields(request.args.get('fields'), SEARCH_IMAGE_FIELDS)
+        images = SearchService.search_images(
+            query,
+            user_id=get_jwt_identity(),
+            per_page=per_page,
+            cursor=request.args.get('cursor'),
+            fields=fields,
+            specs=SEARCH_FIELD_SPECS,
+            normalize=current_app.config['SEARCH_NORMALIZE']
+        )
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'images': [
-            {
-                'id': str(img.id),
-                'title': img.title,
-                'description': img.description,
-                'url': f"/api/images/file/{img.file_path}",
-                'created_at': img.created_at,
-                'captions': img.captions
-            } for img in images.items
-        ],
-        'total': images.total,
-        'pages': images.pages,
-        'page': images.page
+        'images': serialize_rows(images.items, fields, SEARCH_FIELD_SPECS),
+        **page_meta(images)
     }), 200
 
 @image_controller.route('/my-images', methods=['GET'])
@@ -69,25 +220,18 @@ def get_public_images():
 def get_user_images():
     user_id = get_jwt_identity()
     page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
+    cursor = request.args.get('cursor')
     
-    images = ImageService.get_user_images(user_id, page, per_page)
+    try:
+        fields = select_fields(request.args.get('fields'), MY_IMAGE_FIELDS)
+        images = ImageService.get_user_images(user_id, page, per_page, cursor=cursor, fields=fields)
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'images': [
-            {
-                'id': str(img.id),
-                'title': img.title,
-                'description': img.description,
-                'url': f"/api/images/file/{img.file_path}",
-                'created_at': img.created_at,
-                'is_public': img.is_public,
-                'captions': img.captions
-            } for img in images.items
-        ],
-        'total': images.total,
-        'pages': images.pages,
-        'page': images.page
+        'images': serialize_rows(images.items, fields, IMAGE_FIELDS),
+        **page_meta(images)
     }), 200
 
 @image_controller.route('/<image_id>', methods=['PUT'])
@@ -142,8 +286,3 @@ def report_image(image_id):
         return jsonify({'error': 'Không thể báo cáo hình ảnh'}), 400
     
     return jsonify({'message': 'Báo cáo hình ảnh thành công'}), 200
-
-def allowed_file(filename):
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
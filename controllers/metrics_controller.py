@@ -0,0 +1,16 @@
+# controllers/metrics_controller.py
+from flask import request, jsonify, Blueprint, current_app
+from monitoring.prometheus import render_metrics, CONTENT_TYPE
+import hmac
+
+metrics_controller = Blueprint('metrics_controller', __name__)
+
+@metrics_controller.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Số liệu của tiến trình theo định dạng Prometheus"""
+    # Nếu cấu hình METRICS_TOKEN thì yêu cầu header Authorization: Bearer <token>
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Không có quyền truy cập số liệu'}), 401
+    
+    return render_metrics(), 200, {'Content-Type': CONTENT_TYPE}
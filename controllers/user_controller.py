@@ -1,6 +1,8 @@
 # controllers/user_controller.py
 from flask import request, jsonify, Blueprint
 from services.user_service import UserService
+from services.password_hasher import HasherOverloaded
+from services.serializers import serialize_user, PROFILE_FIELDS
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from models.user import User
 
@@ -27,6 +29,8 @@ def register():
             email=data['email']
         )
         return jsonify({'message': 'Đăng ký người dùng thành công'}), 201
+    except HasherOverloaded as e:
+        return _overloaded(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -39,20 +43,19 @@ def login():
         return jsonify({'error': 'Thiếu tên người dùng hoặc mật khẩu'}), 400
     
     # Xác thực người dùng
-    user = UserService.authenticate(data['username'], data['password'])
+    try:
+        user = UserService.authenticate(data['username'], data['password'])
+    except HasherOverloaded as e:
+        return _overloaded(e)
     if not user:
         return jsonify({'error': 'Thông tin đăng nhập không hợp lệ'}), 401
     
     # Tạo token truy cập
-    access_token = create_access_token(identity=str(user.id))
+    # Nhúng vai trò vào token để các kiểm tra quyền không phải truy vấn lại người dùng
+    access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
     return jsonify({
         'access_token': access_token,
-        'user': {
-            'id': str(user.id),
-            'username': user.username,
-            'email': user.email,
-            'role': user.role
-        }
+        'user': serialize_user(user)
     }), 200
 
 @user_controller.route('/profile', methods=['GET'])
@@ -64,13 +67,7 @@ def get_profile():
     if not user:
         return jsonify({'error': 'Không tìm thấy người dùng'}), 404
     
-    return jsonify({
-        'username': user.username,
-        'email': user.email,
-        'role': user.role,
-        'created_at': user.created_at,
-        'last_login': user.last_login
-    }), 200
+    return jsonify(serialize_user(user, PROFILE_FIELDS)), 200
 
 @user_controller.route('/profile', methods=['PUT'])
 @jwt_required()
@@ -93,11 +90,14 @@ def change_password():
     if not all(k in data for k in ('current_password', 'new_password')):
         return jsonify({'error': 'Thiếu các trường bắt buộc'}), 400
     
-    success = UserService.change_password(
-        user_id, 
-        data['current_password'], 
-        data['new_password']
-    )
+    try:
+        success = UserService.change_password(
+            user_id, 
+            data['current_password'], 
+            data['new_password']
+        )
+    except HasherOverloaded as e:
+        return _overloaded(e)
     
     if not success:
         return jsonify({'error': 'Mật khẩu hiện tại không chính xác'}), 400
@@ -116,3 +116,9 @@ def forgot_password():
     
     # Không tiết lộ liệu email có tồn tại hay không vì lý do bảo mật
     return jsonify({'message': 'Nếu email tồn tại, một liên kết đặt lại sẽ được gửi'}), 200
+
+def _overloaded(error):
+    # Từ chối nhanh khi hàng đợi băm mật khẩu đầy thay vì giữ worker chờ
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
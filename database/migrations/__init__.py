@@ -0,0 +1,3 @@
+# database/migrations/__init__.py
+# Mỗi migration là một module mNNNN_mo_ta.py có hàm up(context), chạy theo thứ tự NNNN.
+# Không sửa migration đã phát hành; thay đổi tiếp theo cần một module với số phiên bản mới.
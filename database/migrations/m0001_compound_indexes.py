@@ -0,0 +1,16 @@
+# database/migrations/m0001_compound_indexes.py
+"""Chỉ mục kết hợp cho feed công khai, ảnh của tôi và danh sách báo cáo"""
+from pymongo import ASCENDING, DESCENDING
+
+# Thêm _id sau created_at để khớp với thứ tự phân trang keyset (-created_at, -_id)
+FEED_ORDER = [('created_at', DESCENDING), ('_id', DESCENDING)]
+
+
+def up(context):
+    context.create_indexes('images', [
+        ([('is_public', ASCENDING)] + FEED_ORDER, {'name': 'is_public_created_at'}),
+        ([('uploaded_by', ASCENDING)] + FEED_ORDER, {'name': 'uploaded_by_created_at'})
+    ])
+    context.create_indexes('reports', [
+        ([('status', ASCENDING)] + FEED_ORDER, {'name': 'status_created_at'})
+    ])
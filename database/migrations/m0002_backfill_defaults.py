@@ -0,0 +1,8 @@
+# database/migrations/m0002_backfill_defaults.py
+"""Ghi giá trị mặc định cho is_public và status vào các tài liệu cũ thiếu trường"""
+
+
+def up(context):
+    # Truy vấn is_public=True / status='pending' (và các chỉ mục ở m0001) không khớp tài liệu thiếu trường
+    context.backfill('images', {'is_public': {'$exists': False}}, {'$set': {'is_public': True}})
+    context.backfill('reports', {'status': {'$exists': False}}, {'$set': {'status': 'pending'}})
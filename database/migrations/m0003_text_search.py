@@ -0,0 +1,31 @@
+# database/migrations/m0003_text_search.py
+"""Trường search_text không dấu và chỉ mục text cho tìm kiếm hình ảnh"""
+from services.search_service import search_terms, CAPTIONS_START
+
+
+def up(context):
+    # Tài liệu có search_text thiếu, không phải mảng, hoặc không khớp số chú thích
+    # (kể cả tài liệu được sửa trước khi backfill chạy)
+    context.backfill(
+        'images',
+        {'$or': [
+            {'search_text': {'$not': {'$type': 'array'}}},
+            {'$expr': {'$ne': [
+                {'$size': {'$cond': [{'$isArray': '$search_text'}, '$search_text', []]}},
+                {'$add': [CAPTIONS_START, {'$size': {'$ifNull': ['$captions', []]}}]}
+            ]}}
+        ]},
+        lambda image: {'$set': {'search_text': search_terms(
+            image.get('title'), image.get('description'), image.get('captions')
+        )}}
+    )
+    # Mỗi collection chỉ có một chỉ mục text; default_language 'none' vì MongoDB không hỗ trợ
+    # tách từ tiếng Việt, và language_override trỏ tới trường không dùng để tránh đọc nhầm trường language
+    context.create_indexes('images', [
+        ([('title', 'text'), ('description', 'text'), ('captions', 'text'), ('search_text', 'text')], {
+            'name': 'text_search',
+            'weights': {'title': 10, 'captions': 4, 'description': 2, 'search_text': 1},
+            'default_language': 'none',
+            'language_override': 'search_language'
+        })
+    ])
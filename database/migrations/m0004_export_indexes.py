@@ -0,0 +1,11 @@
+# database/migrations/m0004_export_indexes.py
+"""Chỉ mục theo created_at cho xuất dữ liệu admin (kể cả xuất tăng dần với since=)"""
+from pymongo import ASCENDING
+
+# Khớp thứ tự xuất (created_at, _id) để đọc theo chỉ mục, không phải sắp xếp trong bộ nhớ
+EXPORT_ORDER = [('created_at', ASCENDING), ('_id', ASCENDING)]
+
+
+def up(context):
+    for collection in ('users', 'images', 'reports'):
+        context.create_indexes(collection, [(EXPORT_ORDER, {'name': 'created_at_id'})])
@@ -0,0 +1,12 @@
+# database/migrations/m0005_job_retention.py
+"""Tự xóa công việc nền đã kết thúc để collection jobs không tăng mãi"""
+from pymongo import ASCENDING
+
+# Công việc done/failed được giữ 7 ngày để tra cứu lỗi, sau đó MongoDB tự xóa (chỉ mục TTL)
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+def up(context):
+    context.create_indexes('jobs', [
+        ([('finished_at', ASCENDING)], {'name': 'finished_at_ttl', 'expireAfterSeconds': JOB_RETENTION_SECONDS})
+    ])
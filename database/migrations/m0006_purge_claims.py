@@ -0,0 +1,10 @@
+# database/migrations/m0006_purge_claims.py
+"""Chỉ mục cho dấu xóa hàng loạt trên hình ảnh (ModerationService._delete_image_batch)"""
+from pymongo import ASCENDING
+
+
+def up(context):
+    # Chỉ các ảnh đang bị xóa mới có trường purge, nên chỉ mục sparse gần như rỗng
+    context.create_indexes('images', [
+        ([('purge', ASCENDING)], {'name': 'purge', 'sparse': True})
+    ])
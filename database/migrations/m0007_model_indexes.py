@@ -0,0 +1,15 @@
+# database/migrations/m0007_model_indexes.py
+"""Chuyển chỉ mục của Image và Report từ meta của model sang migration, xóa chỉ mục đơn thừa"""
+from pymongo import ASCENDING
+
+
+def up(context):
+    # Tiền tố của uploaded_by_created_at (m0001) và created_at_id (m0004)
+    context.drop_indexes('images', ['uploaded_by_1', 'created_at_1'])
+    # Tiền tố của status_created_at (m0001) và created_at_id (m0004)
+    context.drop_indexes('reports', ['status_1', 'created_at_1'])
+    # Cùng tên với chỉ mục MongoEngine đã tạo trước đây, nên trên cơ sở dữ liệu cũ không phải tạo lại
+    context.create_indexes('reports', [
+        ([('image', ASCENDING)], {'name': 'image_1'}),
+        ([('reported_by', ASCENDING)], {'name': 'reported_by_1'})
+    ])
@@ -0,0 +1,225 @@
+# database/migrator.py
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from datetime import datetime, timedelta
+import importlib
+import logging
+import pkgutil
+import socket
+import os
+import time
+import uuid
+
+import database.migrations
+
+logger = logging.getLogger(__name__)
+
+LOCK_ID = 'migrations'
+
+
+class MigrationLocked(RuntimeError):
+    """Một tiến trình khác đang chạy migration"""
+    pass
+
+
+class Migration(object):
+    """
+    Một module migration trong database/migrations, đặt tên dạng m0001_mo_ta.py.
+    Module cần có hàm up(context); docstring của module là mô tả migration.
+    """
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+
+    @property
+    def description(self):
+        return (self.module.__doc__ or self.name).strip()
+
+    def up(self, context):
+        self.module.up(context)
+
+
+def load_migrations():
+    """Nạp các module migration theo thứ tự phiên bản"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(database.migrations.__path__):
+        prefix, _, name = module_info.name.partition('_')
+        if not (prefix.startswith('m') and prefix[1:].isdigit()):
+            continue
+        module = importlib.import_module(f'database.migrations.{module_info.name}')
+        migrations.append(Migration(int(prefix[1:]), name, module))
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError('Có hai migration trùng phiên bản')
+    return migrations
+
+
+class MigrationContext(object):
+    """Những gì một migration cần: cơ sở dữ liệu, gia hạn khóa và backfill theo lô có thể chạy tiếp"""
+
+    def __init__(self, migrator, migration):
+        self.database = migrator.database
+        self.migrator = migrator
+        self.migration = migration
+
+    def heartbeat(self):
+        """Gia hạn khóa migration; gọi định kỳ trong các bước chạy lâu"""
+        self.migrator.refresh_lock()
+
+    def create_indexes(self, collection, indexes):
+        """Tạo các chỉ mục [(keys, options), ...]; chỉ mục đã có sẵn thì bỏ qua"""
+        for keys, options in indexes:
+            self.database[collection].create_index(keys, **options)
+            self.heartbeat()
+
+    def drop_indexes(self, collection, names):
+        """Xóa các chỉ mục theo tên; chỉ mục không tồn tại thì bỏ qua"""
+        existing = self.database[collection].index_information()
+        for name in names:
+            if name in existing:
+                try:
+                    self.database[collection].drop_index(name)
+                except OperationFailure:
+                    # Tiến trình khác vừa xóa trước (IndexNotFound)
+                    pass
+            self.heartbeat()
+
+    def backfill(self, collection, query, update, batch_size=1000, pause=0):
+        """
+        Áp dụng update cho mọi tài liệu khớp query, theo từng lô _id tăng dần.
+        Vị trí đã xử lý được lưu sau mỗi lô, nên nếu bị dừng giữa chừng lần chạy sau sẽ tiếp tục từ đó.
+        update có thể là một tài liệu cập nhật hoặc hàm nhận tài liệu và trả về tài liệu cập nhật.
+        """
+        checkpoints = self.database.migration_checkpoints
+        checkpoint_id = f'{self.migration.version}:{collection}'
+        checkpoint = checkpoints.find_one({'_id': checkpoint_id}) or {}
+        last_id = checkpoint.get('last_id')
+        total = checkpoint.get('updated', 0)
+
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query['_id'] = {'$gt': last_id}
+
+            projection = None if callable(update) else {'_id': 1}
+            batch = list(
+                self.database[collection].find(batch_query, projection)
+                .sort('_id', ASCENDING).limit(batch_size)
+            )
+            if not batch:
+                break
+
+            if callable(update):
+                for document in batch:
+                    changes = update(document)
+                    if changes:
+                        self.database[collection].update_one({'_id': document['_id']}, changes)
+                        total += 1
+            else:
+                result = self.database[collection].update_many(
+                    {'_id': {'$in': [document['_id'] for document in batch]}}, update
+                )
+                total += result.modified_count
+
+            last_id = batch[-1]['_id']
+            checkpoints.update_one(
+                {'_id': checkpoint_id},
+                {'$set': {'last_id': last_id, 'updated': total, 'updated_at': datetime.now()}},
+                upsert=True
+            )
+            self.heartbeat()
+            logger.info('Migration %s: đã cập nhật %d tài liệu trong %s', self.migration.version, total, collection)
+            if pause:
+                time.sleep(pause)
+
+        return total
+
+
+class Migrator(object):
+    """
+    Áp dụng các migration theo thứ tự phiên bản, dưới một khóa phân tán trong MongoDB,
+    nên nhiều tiến trình khởi động cùng lúc cũng chỉ có một tiến trình chạy migration.
+    """
+
+    def __init__(self, database, lock_ttl=300):
+        self.database = database
+        self.lock_ttl = lock_ttl
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    def current_version(self):
+        latest = self.database.migrations.find_one({}, sort=[('version', -1)])
+        return latest['version'] if latest else 0
+
+    def pending(self, target=None):
+        """Các migration chưa áp dụng (tới phiên bản target nếu có)"""
+        current = self.current_version()
+        return [
+            migration for migration in load_migrations()
+            if migration.version > current and (target is None or migration.version <= target)
+        ]
+
+    def acquire_lock(self):
+        """Lấy khóa nếu chưa ai giữ hoặc khóa cũ đã hết hạn; trả về False nếu tiến trình khác đang giữ"""
+        now = datetime.now()
+        try:
+            self.database.migration_locks.update_one(
+                {'_id': LOCK_ID, '$or': [{'expires_at': {'$lt': now}}, {'owner': self.owner}]},
+                {'$set': {
+                    'owner': self.owner,
+                    'locked_at': now,
+                    'expires_at': now + timedelta(seconds=self.lock_ttl)
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def refresh_lock(self):
+        result = self.database.migration_locks.update_one(
+            {'_id': LOCK_ID, 'owner': self.owner},
+            {'$set': {'expires_at': datetime.now() + timedelta(seconds=self.lock_ttl)}}
+        )
+        if result.matched_count == 0:
+            raise MigrationLocked('Mất khóa migration (đã hết hạn và bị tiến trình khác lấy)')
+
+    def release_lock(self):
+        self.database.migration_locks.delete_one({'_id': LOCK_ID, 'owner': self.owner})
+
+    def run(self, target=None, wait=0):
+        """
+        Áp dụng các migration còn thiếu, trả về danh sách migration đã chạy.
+        wait: số giây chờ nếu tiến trình khác đang giữ khóa; hết thời gian thì ném MigrationLocked.
+        """
+        if not self.pending(target):
+            return []
+
+        deadline = time.monotonic() + wait
+        while not self.acquire_lock():
+            if time.monotonic() >= deadline:
+                raise MigrationLocked('Một tiến trình khác đang chạy migration')
+            time.sleep(1)
+
+        applied = []
+        try:
+            self.database.migrations.create_index('version', unique=True)
+            # Đọc lại sau khi có khóa: tiến trình giữ khóa trước có thể đã áp dụng xong
+            for migration in self.pending(target):
+                logger.info('Áp dụng migration %s: %s', migration.version, migration.description)
+                migration.up(MigrationContext(self, migration))
+                self.refresh_lock()
+                self.database.migrations.insert_one({
+                    'version': migration.version,
+                    'name': migration.name,
+                    'applied_at': datetime.now()
+                })
+                self.database.migration_checkpoints.delete_many({'_id': {'$regex': f'^{migration.version}:'}})
+                applied.append(migration)
+        finally:
+            self.release_lock()
+
+        return applied
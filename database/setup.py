@@ -1,43 +1,41 @@
 # database/setup.py
 from flask_mongoengine import MongoEngine
-from pymongo import MongoClient
-from datetime import datetime
+from mongoengine.connection import get_db
+from pymongo import monitoring
+from database.migrator import Migrator, MigrationLocked
+from monitoring.pool import pool_metrics
+from monitoring.requests import command_metrics
+from monitoring.slow_queries import slow_query_log
+import logging
+
+logger = logging.getLogger(__name__)
 
 db = MongoEngine()
 
+# Listener phải được đăng ký trước khi MongoClient được tạo (kể cả trong tiến trình worker)
+monitoring.register(pool_metrics)
+monitoring.register(command_metrics)
+monitoring.register(slow_query_log)
+
 def initialize_db(app):
     db.init_app(app)
-    # Thiết lập tự động migration
-    setup_migrations(app)
+    # Migration nên chạy trước khi triển khai bằng `flask db-migrate`;
+    # chỉ tự chạy khi khởi động nếu bật RUN_MIGRATIONS_ON_STARTUP
+    if app.config.get('RUN_MIGRATIONS_ON_STARTUP'):
+        setup_migrations(app)
 
-def setup_migrations(app):
+def get_database():
     """
-    Thiết lập tự động migration cho MongoDB.
-    Vì MongoDB không có schema cứng, chúng ta sẽ triển khai một hệ thống kiểm soát phiên bản đơn giản
-    để theo dõi và áp dụng các thay đổi đối với cấu trúc tài liệu.
+    Cơ sở dữ liệu pymongo của kết nối MongoEngine mặc định.
+    Mọi truy cập pymongo trực tiếp (migration, thao tác hàng loạt) dùng chung MongoClient và pool này.
     """
-    mongo_uri = app.config['MONGODB_SETTINGS']['host']
-    client = MongoClient(mongo_uri)
-    
-    # Xác định tên cơ sở dữ liệu từ URI
-    db_name = 'airc'  # Tên mặc định nếu không được chỉ định trong URI
-    if '/' in mongo_uri.split('@')[-1]:
-        parts = mongo_uri.split('/')
-        if len(parts) > 3 and parts[3]:
-            db_name = parts[3]
-    
-    database = client[db_name]
-    
-    # Kiểm tra xem collection migrations có tồn tại không
-    if 'migrations' not in database.list_collection_names():
-        database.create_collection('migrations')
-        database.migrations.insert_one({'version': 0, 'applied_at': datetime.now()})
-    
-    # Áp dụng migrations nếu cần
-    apply_migrations(database)
+    return get_db()
 
-def apply_migrations(database):
-    """Áp dụng bất kỳ migrations nào đang chờ xử lý"""
-    current_version = database.migrations.find_one({}, sort=[('version', -1)])['version']
-    # Logic migration sẽ được đặt ở đây
-    # Ví dụ: Nếu current_version < 1, áp dụng migration 1, v.v.
+def setup_migrations(app):
+    """Áp dụng migration khi khởi động; nếu tiến trình khác đang chạy migration thì bỏ qua"""
+    migrator = Migrator(get_database(), lock_ttl=app.config['MIGRATION_LOCK_TTL'])
+    try:
+        for migration in migrator.run():
+            logger.info('Đã áp dụng migration %s', migration.version)
+    except MigrationLocked:
+        logger.info('Một tiến trình khác đang chạy migration, bỏ qua khi khởi động')
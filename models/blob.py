@@ -0,0 +1,18 @@
+# models/blob.py
+from database.setup import db
+import datetime
+
+class Blob(db.Document):
+    """Tệp ảnh lưu theo nội dung (SHA-256), dùng chung giữa các Image có cùng nội dung"""
+    sha256 = db.StringField(primary_key=True)
+    file_name = db.StringField(required=True)
+    content_type = db.StringField()
+    size = db.IntField()
+    ref_count = db.IntField(default=0)
+    # Thời điểm remove_files bắt đầu xóa tệp (store chờ xóa xong trước khi đặt lại tệp cùng nội dung)
+    removing = db.DateTimeField()
+    created_at = db.DateTimeField(default=datetime.datetime.now)
+    
+    meta = {
+        'collection': 'blobs'
+    }
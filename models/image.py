@@ -6,15 +6,20 @@ class Image(db.Document):
     title = db.StringField(required=True)
     description = db.StringField()
     file_path = db.StringField(required=True)
+    original_filename = db.StringField()
+    width = db.IntField()
+    height = db.IntField()
     uploaded_by = db.ReferenceField('User')
     is_public = db.BooleanField(default=True)
     created_at = db.DateTimeField(default=datetime.datetime.now)
     captions = db.ListField(db.StringField())
+    # Tiêu đề, mô tả, chú thích đã bỏ dấu (xem services/search_service.py), dùng cho tìm kiếm
+    search_text = db.ListField(db.StringField())
+    # Token của lệnh xóa hàng loạt đang xóa ảnh này (xem ModerationService._delete_image_batch)
+    purge = db.ObjectIdField()
     
     meta = {
         'collection': 'images',
-        'indexes': [
-            {'fields': ['uploaded_by']},
-            {'fields': ['created_at']}
-        ]
+        # Chỉ mục được quản lý bằng migration (database/migrations)
+        'auto_create_index': False
     }
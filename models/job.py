@@ -0,0 +1,24 @@
+# models/job.py
+from database.setup import db
+import datetime
+
+class Job(db.Document):
+    """Công việc nền lưu trong MongoDB, được worker nhận và xử lý"""
+    type = db.StringField(required=True)
+    payload = db.DictField()
+    status = db.StringField(default="pending", choices=["pending", "running", "done", "failed"])
+    attempts = db.IntField(default=0)
+    max_attempts = db.IntField(default=5)
+    run_at = db.DateTimeField(default=datetime.datetime.now)
+    locked_until = db.DateTimeField()
+    last_error = db.StringField()
+    created_at = db.DateTimeField(default=datetime.datetime.now)
+    finished_at = db.DateTimeField()
+    
+    meta = {
+        'collection': 'jobs',
+        'indexes': [
+            {'fields': ['status', 'run_at']},
+            {'fields': ['status', 'locked_until']}
+        ]
+    }
@@ -11,9 +11,6 @@ class Report(db.Document):
     
     meta = {
         'collection': 'reports',
-        'indexes': [
-            {'fields': ['image']},
-            {'fields': ['status']},
-            {'fields': ['created_at']}
-        ]
+        # Chỉ mục được quản lý bằng migration (database/migrations)
+        'auto_create_index': False
     }
@@ -0,0 +1,19 @@
+# models/stats.py
+from database.setup import db
+import datetime
+
+class Stats(db.Document):
+    """Bộ đếm thống kê hệ thống được duy trì tăng dần, đọc bằng một truy vấn theo khóa"""
+    key = db.StringField(primary_key=True)
+    users = db.IntField(default=0)
+    images = db.IntField(default=0)
+    public_images = db.IntField(default=0)
+    pending_reports = db.IntField(default=0)
+    reconciled_at = db.DateTimeField()
+    # Lần cuối xếp lịch đối soát (tránh xếp lịch trùng khi nhiều request cùng thấy thống kê cũ)
+    reconcile_requested_at = db.DateTimeField()
+    updated_at = db.DateTimeField(default=datetime.datetime.now)
+    
+    meta = {
+        'collection': 'stats'
+    }
@@ -0,0 +1,123 @@
+# monitoring/pool.py
+from pymongo import monitoring
+import threading
+import time
+
+# Ngưỡng (mili giây) của histogram thời gian chờ lấy kết nối từ pool
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Thống kê pool kết nối MongoDB từ các sự kiện của pymongo:
+    số kết nối đang mở/đang dùng, số luồng đang chờ lấy kết nối và thời gian chờ.
+    Đăng ký bằng pymongo.monitoring.register trước khi tạo MongoClient.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.open = 0
+            self.in_use = 0
+            self.waiting = 0
+            self.max_waiting = 0
+            self.created = 0
+            self.closed = 0
+            self.checkouts = 0
+            self.checkout_failures = {}
+            self.pool_clears = 0
+            self.checkout_time_ms = 0.0
+            self.checkout_max_ms = 0.0
+            self.checkout_buckets = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)
+    
+    def connection_check_out_started(self, event):
+        # Việc lấy kết nối diễn ra đồng bộ trên cùng luồng nên lưu thời điểm bắt đầu theo luồng
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+    
+    def connection_checked_out(self, event):
+        elapsed_ms = self._elapsed_ms()
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.checkouts += 1
+            self.checkout_time_ms += elapsed_ms
+            self.checkout_max_ms = max(self.checkout_max_ms, elapsed_ms)
+            self.checkout_buckets[self._bucket(elapsed_ms)] += 1
+    
+    def connection_check_out_failed(self, event):
+        self._elapsed_ms()
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+    
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+            self.created += 1
+    
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+            self.closed += 1
+    
+    def connection_ready(self, event):
+        pass
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+    
+    def pool_closed(self, event):
+        pass
+    
+    def stats(self):
+        """Ảnh chụp các số liệu hiện tại"""
+        with self._lock:
+            # Histogram tích lũy: số lần lấy kết nối mất không quá mỗi ngưỡng
+            buckets, total = {}, 0
+            for limit, count in zip(CHECKOUT_BUCKETS_MS + ('inf',), self.checkout_buckets):
+                total += count
+                buckets[f'le_{limit}ms' if limit != 'inf' else 'le_inf'] = total
+            return {
+                'open': self.open,
+                'in_use': self.in_use,
+                'waiting': self.waiting,
+                'max_waiting': self.max_waiting,
+                'created': self.created,
+                'closed': self.closed,
+                'checkouts': self.checkouts,
+                'checkout_failures': dict(self.checkout_failures),
+                'pool_clears': self.pool_clears,
+                'checkout_avg_ms': self.checkout_time_ms / self.checkouts if self.checkouts else 0.0,
+                'checkout_max_ms': self.checkout_max_ms,
+                'checkout_histogram': buckets
+            }
+    
+    def _elapsed_ms(self):
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+    
+    @staticmethod
+    def _bucket(elapsed_ms):
+        for index, limit in enumerate(CHECKOUT_BUCKETS_MS):
+            if elapsed_ms <= limit:
+                return index
+        return len(CHECKOUT_BUCKETS_MS)
+
+
+pool_metrics = PoolMetrics()
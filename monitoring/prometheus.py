@@ -0,0 +1,135 @@
+# monitoring/prometheus.py
+from monitoring.requests import request_metrics, command_metrics
+from monitoring.pool import pool_metrics, CHECKOUT_BUCKETS_MS
+from services.auth_cache import auth_cache
+from services.password_hasher import password_hasher
+from services.feed_cache import feed_cache
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def render_metrics():
+    """Xuất toàn bộ số liệu của tiến trình hiện tại theo định dạng văn bản của Prometheus"""
+    lines = []
+    _request_families(lines)
+    _command_families(lines)
+    _pool_families(lines)
+    _service_families(lines)
+    return '\n'.join(lines) + '\n'
+
+
+def _request_families(lines):
+    latency, statuses, in_flight, db_commands, db_time = request_metrics.snapshot()
+
+    _header(lines, 'http_request_duration_seconds', 'histogram', 'Thời gian xử lý request theo endpoint')
+    for (endpoint, method), (buckets, counts, total, count) in sorted(latency.items()):
+        labels = {'endpoint': endpoint, 'method': method}
+        for limit, bucket_count in zip(buckets, counts):
+            _sample(lines, 'http_request_duration_seconds_bucket', {**labels, 'le': _number(limit)}, bucket_count)
+        _sample(lines, 'http_request_duration_seconds_bucket', {**labels, 'le': '+Inf'}, count)
+        _sample(lines, 'http_request_duration_seconds_sum', labels, total)
+        _sample(lines, 'http_request_duration_seconds_count', labels, count)
+
+    _header(lines, 'http_requests_total', 'counter', 'Số request theo endpoint và mã trạng thái')
+    for (endpoint, method, status), count in sorted(statuses.items()):
+        _sample(lines, 'http_requests_total', {'endpoint': endpoint, 'method': method, 'status': status}, count)
+
+    _header(lines, 'http_requests_in_flight', 'gauge', 'Số request đang xử lý theo endpoint')
+    for endpoint, count in sorted(in_flight.items()):
+        _sample(lines, 'http_requests_in_flight', {'endpoint': endpoint}, count)
+
+    _header(lines, 'http_request_db_commands_total', 'counter', 'Số lệnh MongoDB do request gửi, theo endpoint')
+    for (endpoint, method), count in sorted(db_commands.items()):
+        _sample(lines, 'http_request_db_commands_total', {'endpoint': endpoint, 'method': method}, count)
+
+    _header(lines, 'http_request_db_seconds_total', 'counter', 'Thời gian chạy lệnh MongoDB của request, theo endpoint')
+    for (endpoint, method), seconds in sorted(db_time.items()):
+        _sample(lines, 'http_request_db_seconds_total', {'endpoint': endpoint, 'method': method}, seconds)
+
+
+def _command_families(lines):
+    commands, failures, duration = command_metrics.snapshot()
+
+    _header(lines, 'mongodb_commands_total', 'counter', 'Số lệnh MongoDB thành công theo tên lệnh')
+    for name, count in sorted(commands.items()):
+        _sample(lines, 'mongodb_commands_total', {'command': name}, count)
+
+    _header(lines, 'mongodb_command_failures_total', 'counter', 'Số lệnh MongoDB thất bại theo tên lệnh')
+    for name, count in sorted(failures.items()):
+        _sample(lines, 'mongodb_command_failures_total', {'command': name}, count)
+
+    _header(lines, 'mongodb_command_seconds_total', 'counter', 'Tổng thời gian chạy lệnh MongoDB theo tên lệnh')
+    for name, seconds in sorted(duration.items()):
+        _sample(lines, 'mongodb_command_seconds_total', {'command': name}, seconds)
+
+
+def _pool_families(lines):
+    stats = pool_metrics.stats()
+
+    for name, key, help_text in (
+        ('mongodb_pool_connections_open', 'open', 'Số kết nối đang mở trong pool'),
+        ('mongodb_pool_connections_in_use', 'in_use', 'Số kết nối đang được sử dụng'),
+        ('mongodb_pool_waiting', 'waiting', 'Số luồng đang chờ lấy kết nối'),
+        ('mongodb_pool_max_waiting', 'max_waiting', 'Số luồng chờ lấy kết nối lớn nhất từng ghi nhận')
+    ):
+        _header(lines, name, 'gauge', help_text)
+        _sample(lines, name, {}, stats[key])
+
+    _header(lines, 'mongodb_pool_checkout_failures_total', 'counter', 'Số lần lấy kết nối thất bại theo lý do')
+    for reason, count in sorted(stats['checkout_failures'].items()):
+        _sample(lines, 'mongodb_pool_checkout_failures_total', {'reason': reason}, count)
+
+    _header(lines, 'mongodb_pool_checkout_seconds', 'histogram', 'Thời gian chờ lấy kết nối từ pool')
+    histogram = stats['checkout_histogram']
+    for limit in CHECKOUT_BUCKETS_MS:
+        _sample(lines, 'mongodb_pool_checkout_seconds_bucket', {'le': _number(limit / 1000)}, histogram[f'le_{limit}ms'])
+    _sample(lines, 'mongodb_pool_checkout_seconds_bucket', {'le': '+Inf'}, histogram['le_inf'])
+    _sample(lines, 'mongodb_pool_checkout_seconds_sum', {}, stats['checkout_avg_ms'] * stats['checkouts'] / 1000)
+    _sample(lines, 'mongodb_pool_checkout_seconds_count', {}, stats['checkouts'])
+
+
+def _service_families(lines):
+    cache = auth_cache.stats()
+    _header(lines, 'auth_cache_hits_total', 'counter', 'Số lần trúng cache vai trò người dùng')
+    _sample(lines, 'auth_cache_hits_total', {}, cache['hits'])
+    _header(lines, 'auth_cache_misses_total', 'counter', 'Số lần trượt cache vai trò người dùng')
+    _sample(lines, 'auth_cache_misses_total', {}, cache['misses'])
+    _header(lines, 'auth_cache_size', 'gauge', 'Số người dùng trong cache vai trò')
+    _sample(lines, 'auth_cache_size', {}, cache['size'])
+
+    feed = feed_cache.stats()
+    _header(lines, 'feed_cache_hits_total', 'counter', 'Số lần trúng cache feed công khai')
+    _sample(lines, 'feed_cache_hits_total', {}, feed['hits'])
+    _header(lines, 'feed_cache_misses_total', 'counter', 'Số lần trượt cache feed công khai')
+    _sample(lines, 'feed_cache_misses_total', {}, feed['misses'])
+
+    hasher = password_hasher.stats()
+    for name, key, kind, help_text in (
+        ('password_hasher_in_flight', 'in_flight', 'gauge', 'Số thao tác băm mật khẩu đang chạy'),
+        ('password_hasher_queued', 'queued', 'gauge', 'Số thao tác băm mật khẩu đang chờ'),
+        ('password_hasher_rejected_total', 'rejected', 'counter', 'Số thao tác bị từ chối vì hàng đợi đầy'),
+        ('password_hasher_completed_total', 'completed', 'counter', 'Số thao tác băm mật khẩu đã xong')
+    ):
+        _header(lines, name, kind, help_text)
+        _sample(lines, name, {}, hasher[key])
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _sample(lines, name, labels, value):
+    if labels:
+        rendered = ','.join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+        lines.append(f'{name}{{{rendered}}} {_number(value)}')
+    else:
+        lines.append(f'{name} {_number(value)}')
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,160 @@
+# monitoring/requests.py
+from flask import request, g
+from pymongo import monitoring
+import threading
+import time
+
+# Ngưỡng (giây) của histogram thời gian xử lý request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+    """Histogram tích lũy kiểu Prometheus (không tự khóa, dùng dưới khóa của đối tượng chứa nó)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[index] += 1
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Đếm lệnh MongoDB và thời gian chạy lệnh.
+    Sự kiện được gọi trên luồng gửi lệnh, nên lệnh của một request được cộng vào bộ đếm của luồng
+    đang xử lý request đó (lệnh chạy trên luồng nền chỉ được tính vào tổng theo tên lệnh).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.commands = {}
+        self.failures = {}
+        self.duration = {}
+
+    def begin(self):
+        """Bắt đầu đếm lệnh cho request trên luồng hiện tại"""
+        self._local.commands = 0
+        self._local.duration = 0.0
+
+    def end(self):
+        """Kết thúc request, trả về (số lệnh, thời gian DB tính bằng giây)"""
+        commands = getattr(self._local, 'commands', 0)
+        duration = getattr(self._local, 'duration', 0.0)
+        self._local.commands = None
+        return commands or 0, duration or 0.0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, self.commands)
+
+    def failed(self, event):
+        self._record(event, self.failures)
+
+    def _record(self, event, counter):
+        seconds = event.duration_micros / 1e6
+        with self._lock:
+            counter[event.command_name] = counter.get(event.command_name, 0) + 1
+            self.duration[event.command_name] = self.duration.get(event.command_name, 0.0) + seconds
+
+        if getattr(self._local, 'commands', None) is not None:
+            self._local.commands += 1
+            self._local.duration += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.commands), dict(self.failures), dict(self.duration)
+
+
+class RequestMetrics(object):
+    """Thời gian xử lý, mã trạng thái, số request đang chạy và số lệnh DB theo từng endpoint"""
+
+    def __init__(self, command_metrics):
+        self.command_metrics = command_metrics
+        self.server_timing = False
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.statuses = {}
+        self.in_flight = {}
+        self.db_commands = {}
+        self.db_time = {}
+
+    def init_app(self, app):
+        """Gắn middleware đo request vào ứng dụng Flask"""
+        self.server_timing = app.config.get('SERVER_TIMING', False)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_endpoint = _endpoint_label()
+        g.metrics_recorded = False
+        self.command_metrics.begin()
+        with self._lock:
+            self.in_flight[g.metrics_endpoint] = self.in_flight.get(g.metrics_endpoint, 0) + 1
+
+    def _after_request(self, response):
+        if 'metrics_started' not in g:
+            return response
+
+        elapsed, commands, db_seconds = self._finish(response.status_code)
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_seconds * 1000:.1f};desc="{commands} cmd", '
+                f'app;dur={max(elapsed - db_seconds, 0) * 1000:.1f}'
+            )
+        return response
+
+    def _teardown_request(self, error=None):
+        if 'metrics_started' not in g:
+            return
+        # Request kết thúc bằng ngoại lệ không đi qua after_request
+        if not g.metrics_recorded:
+            self._finish(500)
+        with self._lock:
+            self.in_flight[g.metrics_endpoint] -= 1
+
+    def _finish(self, status_code):
+        elapsed = time.perf_counter() - g.metrics_started
+        commands, db_seconds = self.command_metrics.end()
+        key = (g.metrics_endpoint, request.method)
+        g.metrics_recorded = True
+
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            status_key = key + (str(status_code),)
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+            self.db_commands[key] = self.db_commands.get(key, 0) + commands
+            self.db_time[key] = self.db_time.get(key, 0.0) + db_seconds
+
+        return elapsed, commands, db_seconds
+
+    def snapshot(self):
+        with self._lock:
+            latency = {
+                key: (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count)
+                for key, histogram in self.latency.items()
+            }
+            return latency, dict(self.statuses), dict(self.in_flight), dict(self.db_commands), dict(self.db_time)
+
+
+def _endpoint_label():
+    # Dùng tên endpoint (ví dụ image_routes.get_image) thay vì đường dẫn để số nhãn không tăng theo ID
+    return request.endpoint or 'unmatched'
+
+
+command_metrics = CommandMetrics()
+request_metrics = RequestMetrics(command_metrics)
@@ -0,0 +1,243 @@
+# monitoring/slow_queries.py
+from flask import has_request_context, request
+from pymongo import monitoring
+from collections import deque
+from datetime import datetime
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Các lệnh có thể chạy explain
+EXPLAINABLE = ('find', 'aggregate', 'count', 'distinct', 'findAndModify', 'update', 'delete')
+
+# Các trường do driver thêm vào lệnh, không thuộc về truy vấn
+DRIVER_FIELDS = (
+    'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber',
+    'autocommit', 'startTransaction', 'readConcern', 'writeConcern'
+)
+
+# Giữ nguyên giá trị của các khóa này khi chuẩn hóa (hướng sắp xếp, danh sách trường)
+LITERAL_KEYS = ('sort', '$sort', 'projection', 'fields', '$project', 'key', 'hint')
+
+
+def normalize(value, literal=False):
+    """Thay mọi giá trị trong truy vấn bằng '?' để các truy vấn cùng dạng được gộp chung"""
+    if literal:
+        return value
+    if isinstance(value, dict):
+        return {key: normalize(item, key in LITERAL_KEYS) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Danh sách điều kiện ($or, $and, pipeline) giữ cấu trúc; danh sách giá trị ($in) gộp thành '?'
+        if value and all(isinstance(item, dict) for item in value):
+            return [normalize(item) for item in value]
+        return '?'
+    return '?'
+
+
+def query_shape(command_name, command):
+    """Dạng truy vấn đã chuẩn hóa của một lệnh, không chứa giá trị thực (tránh lưu dữ liệu người dùng)"""
+    shape = {}
+    for key, value in command.items():
+        if key == command_name or key in DRIVER_FIELDS or key in ('limit', 'skip', 'batchSize', 'cursor'):
+            continue
+        shape[key] = normalize(value, key in LITERAL_KEYS)
+    return shape
+
+
+def summarize_plan(explain):
+    """Tóm tắt kế hoạch thực thi được chọn: chuỗi stage (kèm tên chỉ mục) và các dấu hiệu đáng chú ý"""
+    planner = explain.get('queryPlanner')
+    if planner is None:
+        # Explain của aggregate đặt queryPlanner trong stage $cursor đầu tiên
+        for stage in explain.get('stages', []):
+            planner = stage.get('$cursor', {}).get('queryPlanner')
+            if planner:
+                break
+    if not planner:
+        return {'plan': None, 'collection_scan': False, 'in_memory_sort': False}
+
+    stages = []
+    plan = planner.get('winningPlan', {})
+    while plan:
+        stage = plan.get('stage', '?')
+        stages.append(f"{stage}({plan['indexName']})" if plan.get('indexName') else stage)
+        inputs = plan.get('inputStages') or [plan.get('inputStage')]
+        plan = inputs[0] if inputs and inputs[0] else None
+
+    return {
+        'plan': ' <- '.join(stages),
+        'collection_scan': 'COLLSCAN' in stages,
+        'in_memory_sort': any(stage in ('SORT', 'SORT_KEY_GENERATOR') for stage in stages)
+    }
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    """
+    Ghi lại các lệnh MongoDB chạy lâu hơn ngưỡng, kèm endpoint Flask đã gửi lệnh.
+    Các lệnh được gộp theo dạng truy vấn đã chuẩn hóa; mỗi dạng được chạy explain (queryPlanner)
+    trên một luồng nền, tối đa một lần mỗi `explain_interval` giây.
+    """
+
+    def __init__(self, threshold_ms=100, capacity=200, max_groups=500, explain_interval=300):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.max_groups = max_groups
+        self.recent = deque(maxlen=capacity)
+        self.groups = {}
+        self._commands = {}
+        self._lock = threading.Lock()
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._thread = None
+
+    def configure(self, threshold_ms=None, capacity=None, explain_interval=None):
+        with self._lock:
+            if threshold_ms is not None:
+                self.threshold_ms = threshold_ms
+            if capacity is not None:
+                self.recent = deque(self.recent, maxlen=capacity)
+            if explain_interval is not None:
+                self.explain_interval = explain_interval
+
+    def started(self, event):
+        if event.command_name not in EXPLAINABLE:
+            return
+        with self._lock:
+            # Lệnh không bao giờ kết thúc (hiếm gặp) không được giữ mãi
+            if len(self._commands) > 10000:
+                self._commands.clear()
+            self._commands[(event.connection_id, event.request_id)] = (event.database_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        if event.command_name not in EXPLAINABLE:
+            return
+        with self._lock:
+            started = self._commands.pop((event.connection_id, event.request_id), None)
+
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms:
+            return
+
+        database_name, command = started
+        collection = command.get(event.command_name)
+        shape = query_shape(event.command_name, command)
+        key = f"{database_name}.{collection} {event.command_name} {json.dumps(shape, default=str)}"
+        route = request.endpoint if has_request_context() else None
+        now = datetime.now()
+
+        with self._lock:
+            self.recent.append({
+                'at': now,
+                'duration_ms': round(duration_ms, 1),
+                'command': event.command_name,
+                'collection': collection,
+                'route': route,
+                'shape': key
+            })
+
+            group = self.groups.get(key)
+            if group is None:
+                if len(self.groups) >= self.max_groups:
+                    oldest = min(self.groups, key=lambda name: self.groups[name]['last_seen'])
+                    del self.groups[oldest]
+                group = self.groups[key] = {
+                    'shape': key,
+                    'command': event.command_name,
+                    'collection': collection,
+                    'query': shape,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'routes': {},
+                    'explain': None,
+                    'explained_at': None,
+                    '_explain_requested': None
+                }
+            group['count'] += 1
+            group['total_ms'] += duration_ms
+            group['max_ms'] = max(group['max_ms'], duration_ms)
+            group['last_seen'] = now
+            if route:
+                group['routes'][route] = group['routes'].get(route, 0) + 1
+
+            requested = group['_explain_requested']
+            wants_explain = requested is None or time.monotonic() - requested >= self.explain_interval
+            if wants_explain:
+                group['_explain_requested'] = time.monotonic()
+
+        if wants_explain:
+            explain_command = {
+                name: value for name, value in command.items() if name not in DRIVER_FIELDS
+            }
+            self._schedule_explain(key, database_name, explain_command)
+
+    def _schedule_explain(self, key, database_name, command):
+        self._ensure_started()
+        try:
+            self._explain_queue.put_nowait((key, database_name, command))
+        except queue.Full:
+            pass
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_explains, name='slow-query-explain', daemon=True)
+                self._thread.start()
+
+    def _run_explains(self):
+        # Explain chạy ngoài luồng request để không làm chậm thêm request vốn đã chậm
+        from mongoengine.connection import get_db
+
+        while True:
+            key, database_name, command = self._explain_queue.get()
+            try:
+                database = get_db().client[database_name]
+                explain = database.command('explain', command, verbosity='queryPlanner')
+                summary = summarize_plan(explain)
+            except Exception as error:
+                logger.warning('Không thể explain truy vấn chậm %s: %s', key, error)
+                summary = {'error': str(error)}
+
+            with self._lock:
+                group = self.groups.get(key)
+                if group is not None:
+                    group['explain'] = summary
+                    group['explained_at'] = datetime.now()
+
+    def report(self, limit=50):
+        """Các dạng truy vấn chậm (xếp theo tổng thời gian) và các lệnh chậm gần nhất"""
+        with self._lock:
+            groups = sorted(self.groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
+            return {
+                'threshold_ms': self.threshold_ms,
+                'groups': [
+                    {
+                        **{name: value for name, value in group.items() if not name.startswith('_')},
+                        'total_ms': round(group['total_ms'], 1),
+                        'max_ms': round(group['max_ms'], 1),
+                        'avg_ms': round(group['total_ms'] / group['count'], 1),
+                        'routes': dict(group['routes'])
+                    }
+                    for group in groups
+                ],
+                'recent': list(reversed(self.recent))[:limit]
+            }
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self.groups.clear()
+
+
+slow_query_log = SlowQueryLog()
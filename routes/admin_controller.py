@@ -2,7 +2,9 @@
 from flask import Blueprint
 from controllers.admin_controller import (
     get_all_users, update_user, delete_user, get_all_images, 
-    admin_delete_image, get_reports, update_report, get_stats
+    admin_delete_image, get_reports, update_report, get_stats,
+    bulk_delete_users, bulk_delete_images, bulk_update_reports, get_pool_stats,
+    get_slow_queries, reset_slow_queries, export_dataset
 )
 
 admin_routes = Blueprint('admin_routes', __name__)
@@ -10,8 +12,15 @@ admin_routes = Blueprint('admin_routes', __name__)
 admin_routes.route('/users', methods=['GET'])(get_all_users)
 admin_routes.route('/users/<user_id>', methods=['PUT'])(update_user)
 admin_routes.route('/users/<user_id>', methods=['DELETE'])(delete_user)
+admin_routes.route('/users/bulk-delete', methods=['POST'])(bulk_delete_users)
 admin_routes.route('/images', methods=['GET'])(get_all_images)
 admin_routes.route('/images/<image_id>', methods=['DELETE'])(admin_delete_image)
+admin_routes.route('/images/bulk-delete', methods=['POST'])(bulk_delete_images)
 admin_routes.route('/reports', methods=['GET'])(get_reports)
 admin_routes.route('/reports/<report_id>', methods=['PUT'])(update_report)
+admin_routes.route('/reports/bulk-update', methods=['POST'])(bulk_update_reports)
+admin_routes.route('/export/<dataset>', methods=['GET'])(export_dataset)
 admin_routes.route('/stats', methods=['GET'])(get_stats)
+admin_routes.route('/db/pool', methods=['GET'])(get_pool_stats)
+admin_routes.route('/db/slow-queries', methods=['GET'])(get_slow_queries)
+admin_routes.route('/db/slow-queries', methods=['DELETE'])(reset_slow_queries)
\ No newline at end of file
@@ -0,0 +1,7 @@
+# routes/metrics_controller.py
+from flask import Blueprint
+from controllers.metrics_controller import get_metrics
+
+metrics_routes = Blueprint('metrics_routes', __name__)
+
+metrics_routes.route('/metrics', methods=['GET'])(get_metrics)
@@ -0,0 +1,64 @@
+# services/auth_cache.py
+from models.user import User
+from collections import OrderedDict
+import threading
+import time
+
+class UserAuthCache:
+    """
+    Bộ nhớ đệm trong tiến trình (TTL + LRU) cho thông tin phân quyền của người dùng.
+    Chỉ lưu vai trò; None nghĩa là người dùng không tồn tại.
+    """
+    
+    def __init__(self, ttl=60, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def configure(self, ttl=None, max_size=None):
+        """Cập nhật cấu hình từ app.config"""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_size is not None:
+                self.max_size = max_size
+            self._entries.clear()
+    
+    def get_role(self, user_id):
+        """Lấy vai trò của người dùng, chỉ truy vấn cơ sở dữ liệu khi không có trong cache hoặc đã hết hạn"""
+        user_id = str(user_id)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        user = User.objects(id=user_id).only('role').as_pymongo().first()
+        role = user.get('role', 'user') if user else None
+        
+        with self._lock:
+            self._entries[user_id] = (role, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        
+        return role
+    
+    def invalidate(self, user_id):
+        """Xóa thông tin đã lưu khi vai trò thay đổi hoặc người dùng bị xóa"""
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+    
+    def stats(self):
+        """Số lần trúng/trượt cache để đo lượng truy vấn tiết kiệm được"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+auth_cache = UserAuthCache()
@@ -0,0 +1,147 @@
+# services/export_service.py
+from models.user import User
+from models.image import Image
+from models.report import Report
+from services.image_service import ImageService
+from services.serializers import EXPORT_USER_FIELDS, EXPORT_IMAGE_FIELDS, REPORT_FIELDS, serialize_report
+from datetime import datetime, timedelta
+import csv
+import io
+import json
+
+# Định dạng xuất -> (mimetype, phần mở rộng tệp)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv')
+}
+
+# Xuất theo thứ tự tăng dần (created_at, _id) bằng chỉ mục created_at_id (migration m0004):
+# created_at của dòng cuối cùng là giá trị since= cho lần xuất tiếp theo
+EXPORT_ORDER = [('created_at', 1), ('_id', 1)]
+
+# Ô CSV bắt đầu bằng các ký tự này bị bảng tính hiểu là công thức (chèn công thức)
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Các trường báo cáo thô cần để tạo một dòng xuất
+REPORT_PROJECTION = {'image': 1, 'reported_by': 1, 'reason': 1, 'status': 1, 'created_at': 1}
+
+
+class InvalidExport(ValueError):
+    """Tham số xuất dữ liệu không hợp lệ"""
+    pass
+
+
+def parse_since(raw, overlap=0):
+    """
+    Phân tích since= dạng ISO 8601 (ví dụ 2024-05-01T00:00:00); None nếu không truyền.
+    Trả về thời điểm bắt đầu xuất: since lùi lại `overlap` giây (xem ExportService._iter_batches).
+    """
+    if not raw:
+        return None
+    try:
+        since = datetime.fromisoformat(raw[:-1] + '+00:00' if raw.endswith('Z') else raw)
+    except ValueError:
+        raise InvalidExport('since phải là thời điểm ISO 8601')
+    # created_at được lưu theo giờ địa phương không kèm múi giờ
+    if since.tzinfo is not None:
+        since = since.astimezone().replace(tzinfo=None)
+    return since - timedelta(seconds=overlap)
+
+
+def _export_value(value):
+    # Ngày giờ xuất dạng ISO 8601 để dùng lại trực tiếp làm since=
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        # Tiêu đề, chú thích do người dùng nhập: thêm ' để bảng tính hiển thị như văn bản
+        return "'" + value
+    return _export_value(value)
+
+
+def to_ndjson(batches, encode):
+    """Mỗi dòng một đối tượng JSON; mỗi lô bản ghi được gửi thành một khối"""
+    for batch in batches:
+        yield ''.join(
+            encode({name: _export_value(value) for name, value in row.items()}) + '\n' for row in batch
+        )
+
+
+def to_csv(batches, fields):
+    """CSV có dòng tiêu đề; danh sách (ví dụ captions) được ghi dạng JSON trong một ô"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        writer.writerows([_csv_value(row.get(name)) for name in fields] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Tiêu đề vẫn được gửi khi không có bản ghi nào
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class ExportService:
+    @staticmethod
+    def export_users(fields, since=None, batch_size=1000):
+        """Các lô người dùng (dict theo `fields`), không bao giờ gồm mật khẩu"""
+        rows = ExportService._iter_batches(User._get_collection(), {}, fields, EXPORT_USER_FIELDS, since, batch_size)
+        for batch in rows:
+            yield [{name: EXPORT_USER_FIELDS[name].value(row) for name in fields} for row in batch]
+
+    @staticmethod
+    def export_images(fields, since=None, batch_size=1000):
+        rows = ExportService._iter_batches(Image._get_collection(), {}, fields, EXPORT_IMAGE_FIELDS, since, batch_size)
+        for batch in rows:
+            yield [{name: EXPORT_IMAGE_FIELDS[name].value(row) for name in fields} for row in batch]
+
+    @staticmethod
+    def export_reports(fields, since=None, status=None, batch_size=1000):
+        """Các lô báo cáo kèm tiêu đề ảnh và tên người báo cáo (nạp theo lô như danh sách báo cáo)"""
+        query = {'status': status} if status else {}
+        rows = ExportService._iter_batches(
+            Report._get_collection(), query, (), REPORT_FIELDS, since, batch_size, projection=REPORT_PROJECTION
+        )
+        for batch in rows:
+            images_by_id, users_by_id = ImageService.load_report_references(batch)
+            yield [
+                {name: value for name, value in serialize_report(
+                    report, images_by_id.get(report.get('image')), users_by_id.get(report.get('reported_by')),
+                    format_date=None
+                ).items() if name in fields}
+                for report in batch
+            ]
+
+    @staticmethod
+    def _iter_batches(collection, query, fields, specs, since, batch_size, projection=None):
+        """
+        Duyệt một cursor phía máy chủ (chỉ đọc các trường cần thiết) và trả về từng lô bản ghi thô,
+        nên bộ nhớ không phụ thuộc vào kích thước collection.
+        """
+        if since is not None:
+            # since bao gồm: created_at được gán khi tạo Document, trước khi ghi, nên bản ghi ghi xong sau
+            # lần xuất trước có thể mang created_at sớm hơn dòng cuối đã xuất. since đã được lùi lại một khoảng
+            # chồng lấn (parse_since), các dòng đã xuất lặp lại và client bỏ trùng theo id.
+            query = {**query, 'created_at': {'$gte': since}}
+        if projection is None:
+            projection = {specs[name].db_field: 1 for name in fields}
+
+        cursor = collection.find(query, projection or {'_id': 1}, sort=EXPORT_ORDER, batch_size=batch_size)
+        try:
+            batch = []
+            for row in cursor:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            # Client ngắt kết nối giữa chừng: đóng cursor trên máy chủ ngay thay vì chờ hết hạn
+            cursor.close()
@@ -0,0 +1,169 @@
+# services/feed_cache.py
+from collections import OrderedDict
+from database.setup import get_database
+from pymongo import ReturnDocument
+import hashlib
+import threading
+import time
+
+GENERATION_ID = 'feed_generation'
+
+
+class RedisFeedBackend:
+    """Bộ nhớ đệm dùng chung giữa các tiến trình/máy chủ bằng Redis (cần gói redis)"""
+
+    def __init__(self, url, prefix='airc:feed:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('FEED_CACHE_REDIS_URL cần gói redis (pip install redis)')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b'\n')
+        return body, etag.decode('ascii')
+
+    def set(self, key, body, etag, ttl):
+        self.client.set(self.prefix + key, etag.encode('ascii') + b'\n' + body, ex=max(int(ttl), 1))
+
+
+class FeedCache:
+    """
+    Bộ nhớ đệm phản hồi của feed công khai (các trang đầu), giống nhau với mọi người xem.
+
+    Mỗi lần ghi làm thay đổi feed sẽ tăng bộ đếm thế hệ (lưu trong MongoDB để mọi tiến trình thấy);
+    khóa cache gồm thế hệ nên phản hồi cũ tự hết hiệu lực. Mỗi tiến trình chỉ đọc lại thế hệ
+    sau mỗi `generation_ttl` giây, nên tiến trình khác có thể trả phản hồi cũ tối đa chừng đó thời gian.
+    Khi nhiều request cùng trượt một khóa, chỉ một request tạo phản hồi, các request khác chờ dùng chung.
+    """
+
+    def __init__(self, max_pages=3, max_size=256, ttl=60, generation_ttl=1.0, backend=None, page_sizes=(20,)):
+        self.max_pages = max_pages
+        self.page_sizes = frozenset(page_sizes)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation_ttl = generation_ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_pages=None, max_size=None, ttl=None, generation_ttl=None, backend=None, page_sizes=None):
+        """Cập nhật cấu hình từ app.config"""
+        with self._lock:
+            if max_pages is not None:
+                self.max_pages = max_pages
+            if page_sizes is not None:
+                self.page_sizes = frozenset(page_sizes)
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            if generation_ttl is not None:
+                self.generation_ttl = generation_ttl
+            if backend is not None:
+                self.backend = backend
+            self._entries.clear()
+
+    def is_cacheable(self, page, cursor, per_page):
+        """
+        Chỉ cache trang đầu theo cursor và `max_pages` trang đầu theo page/per_page,
+        với per_page thuộc `page_sizes` (số khóa cache không phụ thuộc vào giá trị client gửi lên).
+        """
+        if self.max_pages <= 0 or per_page not in self.page_sizes:
+            return False
+        if cursor is not None:
+            return cursor == ''
+        return 1 <= page <= self.max_pages
+
+    def get_or_build(self, key, build):
+        """
+        Trả về (body, etag) cho khóa; khi trượt cache thì gọi build() để tạo body (bytes).
+        """
+        key = f'{self._current_generation()}:{key}'
+
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[2] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0], entry[1]
+
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    # Request này chịu trách nhiệm tạo phản hồi
+                    self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+
+            # Một request khác đang tạo phản hồi cho cùng khóa: chờ rồi đọc lại
+            waiter.wait(timeout=10)
+
+        try:
+            cached = self.backend.get(key) if self.backend else None
+            if cached is None:
+                body = build()
+                etag = make_etag(body)
+                if self.backend:
+                    self.backend.set(key, body, etag, self.ttl)
+            else:
+                body, etag = cached
+
+            with self._lock:
+                self._entries[key] = (body, etag, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return body, etag
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    def invalidate(self):
+        """Tăng thế hệ sau mỗi thay đổi ảnh hưởng tới feed công khai"""
+        document = _generation_collection().find_one_and_update(
+            {'_id': GENERATION_ID},
+            {'$inc': {'value': 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        with self._lock:
+            self._generation = document['value']
+            self._generation_checked = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'generation': self._generation}
+
+    def _current_generation(self):
+        now = time.monotonic()
+        if self._generation is not None and now - self._generation_checked < self.generation_ttl:
+            return self._generation
+
+        document = _generation_collection().find_one({'_id': GENERATION_ID})
+        with self._lock:
+            self._generation = document['value'] if document else 0
+            self._generation_checked = now
+            return self._generation
+
+
+def make_etag(body):
+    """ETag mạnh: băm nội dung phản hồi"""
+    return hashlib.sha1(body).hexdigest()
+
+
+def _generation_collection():
+    return get_database()['feed_cache']
+
+
+feed_cache = FeedCache()
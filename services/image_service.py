@@ -2,51 +2,171 @@
 from models.image import Image
 from models.report import Report
 from models.user import User
-import os
-import uuid
+from services.pagination import keyset_paginate, offset_paginate
+from services.projection import project
+from services.serializers import IMAGE_FIELDS, image_url
+from services.stats_service import StatsService
+from services.auth_cache import auth_cache
+from services.storage_service import StorageService, UnsupportedFileType, FileTooLarge, StorageBusy
+from services.job_queue import JobQueue
+from services.feed_cache import feed_cache
+from services.search_service import search_terms, search_text_expression, append_search_text_expression
 from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import BulkWriteError
+from mongoengine.errors import ValidationError
+from bson import ObjectId
 from datetime import datetime
 
 class ImageService:
-    UPLOAD_FOLDER = 'uploads/images'
-    
     @staticmethod
-    def upload_image(file, title, description, user_id, is_public=True):
+    def upload_image(file, title, description, user_id, is_public=True, max_size=10 * 1024 * 1024):
         """Tải lên hình ảnh mới"""
-        # Đảm bảo thư mục tải lên tồn tại
-        os.makedirs(ImageService.UPLOAD_FOLDER, exist_ok=True)
-        
-        # Tạo tên tệp duy nhất
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        file_path = os.path.join(ImageService.UPLOAD_FOLDER, unique_filename)
-        
-        # Lưu tệp
-        file.save(file_path)
+        # Lưu tệp theo nội dung (kiểm tra định dạng và kích thước trong lúc ghi)
+        file_name = StorageService.store(file.stream, max_size)
         
         # Tạo bản ghi hình ảnh
         user = User.objects(id=user_id).first()
         image = Image(
             title=title,
             description=description,
-            file_path=unique_filename,
+            file_path=file_name,
+            original_filename=secure_filename(file.filename),
             uploaded_by=user,
-            is_public=is_public
+            is_public=is_public,
+            search_text=search_terms(title, description, [])
         )
-        image.save()
+        try:
+            image.save()
+        except Exception:
+            ImageService._release_file(file_name)
+            raise
+        StatsService.increment(images=1, public_images=1 if image.is_public else 0)
+        if image.is_public:
+            feed_cache.invalidate()
+        
+        # Tạo ảnh thu nhỏ và đọc metadata ở nền, không chặn request tải lên (một insert_many cho cả hai)
+        JobQueue.enqueue_many([
+            ('generate_derivatives', {'file_name': file_name}),
+            ('extract_metadata', {'image_id': str(image.id), 'file_name': file_name})
+        ])
         
         return image
     
     @staticmethod
-    def get_public_images(page=1, per_page=20):
-        """Lấy tất cả hình ảnh công khai với phân trang"""
-        return Image.objects(is_public=True).order_by('-created_at').paginate(page=page, per_page=per_page)
+    def upload_images(files, user_id, titles=(), descriptions=(), is_public=True,
+                      max_size=10 * 1024 * 1024, concurrency=4):
+        """
+        Tải lên nhiều hình ảnh trong một request: lưu các tệp song song, tạo tất cả bản ghi
+        bằng một insert_many. Trả về kết quả theo thứ tự tệp, mỗi tệp thành công hoặc thất bại riêng.
+        """
+        if not auth_cache.get_role(user_id):
+            raise LookupError('Không tìm thấy người dùng')
+        
+        results = [{'filename': file.filename} for file in files]
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(files)))) as executor:
+            futures = [executor.submit(StorageService.store, file.stream, max_size) for file in files]
+        
+        documents = []
+        for index, future in enumerate(futures):
+            try:
+                file_name = future.result()
+            except UnsupportedFileType:
+                results[index].update(status=400, error='Loại tệp không được phép')
+                continue
+            except FileTooLarge:
+                results[index].update(status=413, error='Tệp quá lớn')
+                continue
+            except StorageBusy as e:
+                results[index].update(status=503, error=str(e))
+                continue
+            except Exception as e:
+                results[index].update(status=500, error=str(e))
+                continue
+            
+            # Tệp đã được lưu (và tăng số tham chiếu): bản ghi không hợp lệ thì bỏ tham chiếu tệp của riêng nó
+            try:
+                image = Image(
+                    title=titles[index] if index < len(titles) and titles[index] else 'Không có tiêu đề',
+                    description=descriptions[index] if index < len(descriptions) else '',
+                    file_path=file_name,
+                    original_filename=secure_filename(files[index].filename),
+                    uploaded_by=ObjectId(user_id),
+                    is_public=is_public
+                )
+                image.search_text = search_terms(image.title, image.description, [])
+                image.validate()
+            except ValidationError as e:
+                ImageService._release_file(file_name)
+                results[index].update(status=400, error=str(e))
+                continue
+            except Exception as e:
+                ImageService._release_file(file_name)
+                results[index].update(status=500, error=str(e))
+                continue
+            
+            documents.append((index, image.to_mongo().to_dict()))
+        
+        failed_writes = {}
+        if documents:
+            try:
+                Image._get_collection().insert_many([document for _, document in documents], ordered=False)
+            except BulkWriteError as e:
+                failed_writes = {error['index']: error['errmsg'] for error in e.details['writeErrors']}
+        
+        jobs = []
+        for position, (index, document) in enumerate(documents):
+            if position in failed_writes:
+                ImageService._release_file(document['file_path'])
+                results[index].update(status=500, error=failed_writes[position])
+                continue
+            
+            results[index].update(
+                status=201,
+                id=str(document['_id']),
+                url=image_url(document['file_path'])
+            )
+            jobs.append(('generate_derivatives', {'file_name': document['file_path']}))
+            jobs.append(('extract_metadata', {'image_id': str(document['_id']), 'file_name': document['file_path']}))
+        
+        uploaded = len(documents) - len(failed_writes)
+        StatsService.increment(images=uploaded, public_images=uploaded if is_public else 0)
+        if uploaded and is_public:
+            feed_cache.invalidate()
+        JobQueue.enqueue_many(jobs)
+        
+        return results
     
     @staticmethod
-    def get_user_images(user_id, page=1, per_page=20):
+    def _release_file(file_name):
+        """Bỏ một tham chiếu tới tệp; việc xóa tệp trên đĩa (nếu cần) được giao cho worker"""
+        if StorageService.release(file_name):
+            JobQueue.enqueue('remove_files', {'file_name': file_name})
+    
+    @staticmethod
+    def get_public_images(page=1, per_page=20, cursor=None, fields=None):
+        """Lấy tất cả hình ảnh công khai với phân trang (theo trang hoặc theo cursor)"""
+        images = Image.objects(is_public=True)
+        return ImageService._list_images(images, page, per_page, cursor, fields)
+    
+    @staticmethod
+    def get_user_images(user_id, page=1, per_page=20, cursor=None, fields=None):
         """Lấy tất cả hình ảnh được tải lên bởi một người dùng cụ thể"""
         user = User.objects(id=user_id).first()
-        return Image.objects(uploaded_by=user).order_by('-created_at').paginate(page=page, per_page=per_page)
+        images = Image.objects(uploaded_by=user)
+        return ImageService._list_images(images, page, per_page, cursor, fields)
+    
+    @staticmethod
+    def _list_images(images, page, per_page, cursor, fields):
+        """
+        Đọc một trang hình ảnh dưới dạng bản ghi thô, chỉ lấy các trường cần trả về.
+        created_at luôn được lấy vì cần cho cursor.
+        """
+        images = project(images, fields or IMAGE_FIELDS, IMAGE_FIELDS, extra=('created_at',))
+        if cursor is not None:
+            return keyset_paginate(images, cursor, per_page)
+        return offset_paginate(images.order_by('-created_at'), page, per_page)
     
     @staticmethod
     def get_image_by_id(image_id):
@@ -54,88 +174,103 @@ class ImageService:
         return Image.objects(id=image_id).first()
     
     @staticmethod
-    def update_image(image_id, user_id, data):
-        """Cập nhật chi tiết hình ảnh"""
-        image = Image.objects(id=image_id).first()
-        user = User.objects(id=user_id).first()
-        
-        if not image or not user:
-            return False
+    def _owned_image_query(image_id, user_id):
+        """
+        Điều kiện lọc chỉ khớp hình ảnh mà người dùng được phép sửa/xóa
+        (chủ sở hữu, hoặc bất kỳ hình ảnh nào nếu là admin). None nếu người dùng không tồn tại.
+        """
+        role = auth_cache.get_role(user_id)
+        if not role:
+            return None
         
-        # Kiểm tra xem người dùng có phải là chủ sở hữu của hình ảnh không
-        if str(image.uploaded_by.id) != user_id and user.role != 'admin':
+        query = {'id': image_id}
+        if role != 'admin':
+            query['uploaded_by'] = user_id
+        return query
+    
+    @staticmethod
+    def update_image(image_id, user_id, data):
+        """Cập nhật chi tiết hình ảnh bằng một lệnh cập nhật có điều kiện"""
+        query = ImageService._owned_image_query(image_id, user_id)
+        if query is None:
             return False
         
-        # Cập nhật các trường
+        # Chỉ cập nhật các trường của Image, trừ các trường được bảo vệ
+        updates = {}
         for key, value in data.items():
-            if hasattr(image, key) and key not in ['id', 'file_path', 'uploaded_by', 'created_at']:
-                setattr(image, key, value)
+            if key in Image._fields and key not in ['id', 'file_path', 'uploaded_by', 'created_at', 'search_text']:
+                field = Image._fields[key]
+                if value is not None:
+                    field.validate(value)
+                    value = field.to_mongo(value)
+                updates[field.db_field] = {'$literal': value}
+        if not updates:
+            return Image.objects(**query).only('id').first() is not None
+        
+        # Một lệnh pipeline duy nhất: các trường mới và search_text tính lại cùng lúc (nguyên tử)
+        if updates.keys() & {'title', 'description', 'captions'}:
+            updates['search_text'] = search_text_expression(
+                title=(data.get('title') or '') if 'title' in updates else None,
+                description=(data.get('description') or '') if 'description' in updates else None,
+                captions=(data.get('captions') or []) if 'captions' in updates else None
+            )
+        
+        # Trả về bản ghi trước khi cập nhật để biết trạng thái công khai có thay đổi không
+        previous = Image._get_collection().find_one_and_update(
+            Image.objects(**query)._query, [{'$set': updates}], projection={'is_public': 1}
+        )
+        if not previous:
+            return False
         
-        image.save()
+        if 'is_public' in data and bool(data['is_public']) != bool(previous.get('is_public', True)):
+            StatsService.increment(public_images=1 if data['is_public'] else -1)
+        feed_cache.invalidate()
         return True
     
     @staticmethod
     def add_caption(image_id, user_id, caption):
-        """Thêm chú thích cho hình ảnh"""
-        image = Image.objects(id=image_id).first()
-        user = User.objects(id=user_id).first()
-        
-        if not image or not user:
+        """Thêm chú thích cho hình ảnh (một lệnh cập nhật nguyên tử, không mất chú thích khi gửi đồng thời)"""
+        query = ImageService._owned_image_query(image_id, user_id)
+        if query is None:
             return False
         
-        # Kiểm tra xem người dùng có phải là chủ sở hữu của hình ảnh không
-        if str(image.uploaded_by.id) != user_id and user.role != 'admin':
+        result = Image._get_collection().update_one(Image.objects(**query)._query, [{'$set': {
+            'captions': {'$concatArrays': [{'$ifNull': ['$captions', []]}, {'$literal': [caption]}]},
+            'search_text': append_search_text_expression(caption)
+        }}])
+        if result.matched_count != 1:
             return False
         
-        # Thêm chú thích
-        if not image.captions:
-            image.captions = []
-        
-        image.captions.append(caption)
-        image.save()
-        
+        feed_cache.invalidate()
         return True
     
     @staticmethod
     def delete_image(image_id, user_id):
         """Xóa hình ảnh (người dùng chỉ có thể xóa hình ảnh của họ)"""
-        image = Image.objects(id=image_id).first()
-        user = User.objects(id=user_id).first()
-        
-        if not image or not user:
+        query = ImageService._owned_image_query(image_id, user_id)
+        if query is None:
             return False
         
-        # Kiểm tra xem người dùng có phải là chủ sở hữu của hình ảnh không
-        if str(image.uploaded_by.id) != user_id and user.role != 'admin':
-            return False
-        
-        # Xóa tệp vật lý
-        try:
-            os.remove(os.path.join(ImageService.UPLOAD_FOLDER, image.file_path))
-        except:
-            pass  # Tệp có thể không tồn tại
-        
-        # Xóa bản ghi hình ảnh
-        image.delete()
-        
-        return True
+        return ImageService._delete_image(query)
     
     @staticmethod
     def admin_delete_image(image_id):
         """Chức năng admin để xóa bất kỳ hình ảnh nào"""
-        image = Image.objects(id=image_id).first()
-        
+        return ImageService._delete_image({'id': image_id})
+    
+    @staticmethod
+    def _delete_image(query):
+        """Xóa hình ảnh khớp điều kiện bằng find_one_and_delete rồi dọn tệp vật lý"""
+        image = Image.objects(**query).only('file_path', 'is_public').modify(remove=True)
         if not image:
             return False
         
-        # Xóa tệp vật lý
-        try:
-            os.remove(os.path.join(ImageService.UPLOAD_FOLDER, image.file_path))
-        except:
-            pass  # Tệp có thể không tồn tại
+        # Xóa tệp vật lý nếu không còn hình ảnh nào dùng chung
+        ImageService._release_file(image.file_path)
         
-        # Xóa bản ghi hình ảnh
-        image.delete()
+        StatsService.increment(images=-1, public_images=-1 if image.is_public else 0)
+        if image.is_public:
+            feed_cache.invalidate()
         
         return True
     
@@ -155,32 +290,69 @@ class ImageService:
             reason=reason
         )
         report.save()
+        StatsService.increment(pending_reports=1)
         
         return True
     
     @staticmethod
-    def get_reports(page=1, per_page=20, status=None):
+    def get_reports(page=1, per_page=20, status=None, cursor=None):
         """Lấy tất cả báo cáo (chỉ admin)"""
         query = {}
         if status:
             query['status'] = status
         
-        return Report.objects(**query).order_by('-created_at').paginate(page=page, per_page=per_page)
+        # Đọc bản ghi thô để không dereference từng image/reported_by
+        reports = Report.objects(**query).as_pymongo()
+        if cursor is not None:
+            return keyset_paginate(reports, cursor, per_page)
+        return offset_paginate(reports.order_by('-created_at'), page, per_page)
+    
+    @staticmethod
+    def load_report_references(reports):
+        """
+        Nạp theo lô hình ảnh và người báo cáo cho một trang báo cáo thô.
+        Mỗi collection chỉ tốn một truy vấn $in có projection, bất kể số báo cáo.
+        Trả về (images_by_id, users_by_id); tham chiếu không còn tồn tại sẽ không có trong dict.
+        """
+        image_ids = list({report['image'] for report in reports if report.get('image')})
+        user_ids = list({report['reported_by'] for report in reports if report.get('reported_by')})
+        
+        images_by_id = {}
+        if image_ids:
+            images_by_id = {
+                image['_id']: image for image in Image._get_collection().find(
+                    {'_id': {'$in': image_ids}}, {'title': 1, 'file_path': 1}
+                )
+            }
+        
+        users_by_id = {}
+        if user_ids:
+            users_by_id = {
+                user['_id']: user for user in User._get_collection().find(
+                    {'_id': {'$in': user_ids}}, {'username': 1}
+                )
+            }
+        
+        return images_by_id, users_by_id
     
     @staticmethod
     def update_report_status(report_id, status):
         """Cập nhật trạng thái báo cáo (chỉ admin)"""
-        report = Report.objects(id=report_id).first()
+        if status not in Report.status.choices:
+            raise ValidationError(f'Trạng thái không hợp lệ: {status}')
         
-        if not report:
+        # findAndModify trả về bản ghi trước khi cập nhật: hai thay đổi đồng thời không cùng thấy 'pending'
+        previous = Report.objects(id=report_id).only('status').modify(set__status=status)
+        if not previous:
             return False
         
-        report.status = status
-        report.save()
+        previous_status = previous.status or 'pending'
+        if previous_status != status and 'pending' in (previous_status, status):
+            StatsService.increment(pending_reports=1 if status == 'pending' else -1)
         
         return True
     
     @staticmethod
-    def get_all_images(page=1, per_page=20):
+    def get_all_images(page=1, per_page=20, cursor=None, fields=None):
         """Lấy tất cả hình ảnh (chỉ admin)"""
-        return Image.objects.order_by('-created_at').paginate(page=page, per_page=per_page)
+        return ImageService._list_images(Image.objects, page, per_page, cursor, fields)
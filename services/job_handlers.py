@@ -0,0 +1,44 @@
+# services/job_handlers.py
+from models.image import Image
+from services.job_queue import JobQueue, job_handler
+from services.moderation_service import ModerationService
+from services.storage_service import StorageService
+from services.stats_service import StatsService
+from services.thumbnail_service import ThumbnailService
+from PIL import Image as PILImage
+import os
+
+@job_handler('remove_files')
+def remove_files(file_name):
+    """Xóa tệp ảnh và ảnh phái sinh khi không còn hình ảnh nào tham chiếu"""
+    StorageService.remove_files(file_name)
+
+@job_handler('purge_user')
+def purge_user(user_id):
+    """Xóa dần hình ảnh, tệp và báo cáo của người dùng đã bị xóa"""
+    # Mỗi lần chỉ xóa vài lô để không giữ worker quá lâu; phần còn lại được xếp lịch tiếp
+    if not ModerationService.purge_user(user_id):
+        JobQueue.enqueue('purge_user', {'user_id': user_id})
+
+@job_handler('reconcile_stats')
+def reconcile_stats():
+    """Tính lại bộ đếm thống kê từ dữ liệu thực tế (xếp lịch khi thống kê đã cũ)"""
+    StatsService.reconcile()
+
+@job_handler('generate_derivatives')
+def generate_derivatives(file_name):
+    """Tạo ảnh thu nhỏ cho tệp vừa tải lên"""
+    ThumbnailService.generate(file_name)
+
+@job_handler('extract_metadata')
+def extract_metadata(image_id, file_name):
+    """Đọc kích thước ảnh và lưu vào bản ghi hình ảnh"""
+    source = StorageService.resolve(file_name)
+    if not source:
+        return
+    
+    with PILImage.open(os.path.join(StorageService.UPLOAD_FOLDER, source)) as image:
+        width, height = image.size
+    
+    # Hình ảnh có thể đã bị xóa, khi đó lệnh cập nhật không khớp bản ghi nào
+    Image.objects(id=image_id).update_one(set__width=width, set__height=height)
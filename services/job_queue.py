@@ -0,0 +1,188 @@
+# services/job_queue.py
+from models.job import Job
+from pymongo import ReturnDocument
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import datetime
+import logging
+import threading
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Tên loại công việc -> hàm xử lý, đăng ký bằng @job_handler
+HANDLERS = {}
+
+def job_handler(job_type):
+    """
+    Đăng ký hàm xử lý cho một loại công việc.
+    Hàm xử lý phải idempotent vì công việc có thể chạy lại khi thử lại hoặc khi worker chết giữa chừng.
+    """
+    def decorator(fn):
+        HANDLERS[job_type] = fn
+        return fn
+    return decorator
+
+class JobQueue:
+    RETRY_BASE_DELAY = 5
+    RETRY_MAX_DELAY = 3600
+    
+    @staticmethod
+    def enqueue(job_type, payload=None, delay=0, max_attempts=5):
+        """Thêm công việc vào hàng đợi, trả về id của công việc"""
+        now = datetime.datetime.now()
+        result = Job._get_collection().insert_one({
+            'type': job_type,
+            'payload': payload or {},
+            'status': 'pending',
+            'attempts': 0,
+            'max_attempts': max_attempts,
+            'run_at': now + datetime.timedelta(seconds=delay),
+            'created_at': now
+        })
+        return result.inserted_id
+    
+    @staticmethod
+    def enqueue_many(jobs, max_attempts=5):
+        """Thêm nhiều công việc [(loại, payload), ...] bằng một lệnh insert_many"""
+        if not jobs:
+            return []
+        now = datetime.datetime.now()
+        result = Job._get_collection().insert_many([
+            {
+                'type': job_type,
+                'payload': payload or {},
+                'status': 'pending',
+                'attempts': 0,
+                'max_attempts': max_attempts,
+                'run_at': now,
+                'created_at': now
+            } for job_type, payload in jobs
+        ], ordered=False)
+        return result.inserted_ids
+    
+    @staticmethod
+    def claim(lease_seconds=300):
+        """
+        Nhận nguyên tử một công việc đến hạn (hoặc công việc có worker đã hết hạn giữ chỗ).
+        Trả về bản ghi thô của công việc, None nếu hàng đợi trống.
+        """
+        now = datetime.datetime.now()
+        return Job._get_collection().find_one_and_update(
+            {'$or': [
+                {'status': 'pending', 'run_at': {'$lte': now}},
+                {'status': 'running', 'locked_until': {'$lt': now}}
+            ]},
+            {
+                '$set': {'status': 'running', 'locked_until': now + datetime.timedelta(seconds=lease_seconds)},
+                '$inc': {'attempts': 1}
+            },
+            sort=[('run_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def run(job):
+        """Chạy một công việc đã nhận; lỗi thì lên lịch thử lại với backoff lũy thừa"""
+        try:
+            handler = HANDLERS.get(job['type'])
+            if handler is None:
+                raise LookupError(f"Không có handler cho công việc '{job['type']}'")
+            handler(**job['payload'])
+        except Exception:
+            error = traceback.format_exc()
+            logger.error('Công việc %s (%s) thất bại: %s', job['_id'], job['type'], error)
+            
+            if job['attempts'] >= job['max_attempts']:
+                update = {'status': 'failed', 'finished_at': datetime.datetime.now()}
+            else:
+                delay = min(JobQueue.RETRY_BASE_DELAY * 2 ** (job['attempts'] - 1), JobQueue.RETRY_MAX_DELAY)
+                update = {'status': 'pending', 'run_at': datetime.datetime.now() + datetime.timedelta(seconds=delay)}
+            JobQueue._finish(job, dict(update, last_error=error))
+            return False
+        
+        JobQueue._finish(job, {'status': 'done', 'finished_at': datetime.datetime.now()})
+        return True
+    
+    @staticmethod
+    def _finish(job, update):
+        """
+        Ghi kết quả chỉ khi worker này còn giữ công việc (attempts và locked_until từ lúc nhận là dấu sở hữu;
+        attempts tăng ở mỗi lần nhận nên hai lần nhận trong cùng một mili giây vẫn khác nhau):
+        worker đã hết hạn giữ chỗ không được ghi đè trạng thái của lần nhận mới bởi worker khác.
+        """
+        result = Job._get_collection().update_one(
+            {
+                '_id': job['_id'],
+                'status': 'running',
+                'attempts': job['attempts'],
+                'locked_until': job['locked_until']
+            },
+            {'$set': update}
+        )
+        if not result.matched_count:
+            logger.warning('Công việc %s (%s) đã hết hạn giữ chỗ, bỏ qua kết quả', job['_id'], job['type'])
+    
+    @staticmethod
+    def run_pending(limit=None):
+        """Chạy tuần tự các công việc đến hạn trong tiến trình hiện tại (dùng cho kiểm thử và lệnh CLI)"""
+        processed = 0
+        while limit is None or processed < limit:
+            job = JobQueue.claim()
+            if job is None:
+                break
+            JobQueue.run(job)
+            processed += 1
+        return processed
+
+def _init_worker_process(mongodb_settings):
+    """Mỗi tiến trình con cần kết nối MongoDB riêng (MongoClient không an toàn qua fork)"""
+    from mongoengine import connect, disconnect
+    import services.job_handlers  # noqa: F401 - đăng ký các handler
+    disconnect()
+    connect(**mongodb_settings)
+
+class Worker:
+    """
+    Worker lấy công việc từ hàng đợi và chạy trên một pool luồng hoặc tiến trình.
+    Tiến trình chính nhận công việc; pool chỉ chạy handler.
+    """
+    
+    def __init__(self, concurrency=4, mode='thread', poll_interval=1.0, lease_seconds=300, mongodb_settings=None):
+        if mode not in ('thread', 'process'):
+            raise ValueError("mode phải là 'thread' hoặc 'process'")
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.mongodb_settings = mongodb_settings
+        self._stopping = threading.Event()
+    
+    def _make_executor(self):
+        if self.mode == 'process':
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                initializer=_init_worker_process,
+                initargs=(self.mongodb_settings,)
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job-worker')
+    
+    def stop(self):
+        self._stopping.set()
+    
+    def run_forever(self):
+        executor = self._make_executor()
+        in_flight = set()
+        try:
+            while not self._stopping.is_set():
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    continue
+                
+                job = JobQueue.claim(self.lease_seconds)
+                if job is None:
+                    self._stopping.wait(self.poll_interval)
+                    continue
+                
+                in_flight.add(executor.submit(JobQueue.run, job))
+        finally:
+            executor.shutdown(wait=True)
@@ -0,0 +1,51 @@
+# services/json_encoder.py
+from flask.json import JSONEncoder
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:  # orjson không bắt buộc, không có thì dùng json chuẩn
+    orjson = None
+
+ENCODERS = ('auto', 'orjson', 'stdlib')
+
+
+class StdlibJSONEncoder(JSONEncoder):
+    """Bộ mã hóa json chuẩn của Flask (ngày giờ theo định dạng HTTP), thêm hỗ trợ ObjectId"""
+
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        return super().default(o)
+
+
+class OrjsonEncoder(StdlibJSONEncoder):
+    """
+    Mã hóa bằng orjson (nhanh hơn nhiều lần với danh sách lớn). Các danh sách định dạng sẵn ngày giờ
+    (services/serializers.py) nên orjson mã hóa toàn bộ mà không gọi lại Python; ngày giờ còn sót
+    và các kiểu khác vẫn được chuyển qua default() như json chuẩn nên phản hồi giống hệt.
+    ensure_ascii bị bỏ qua (orjson luôn ghi UTF-8).
+    Các giá trị orjson không hỗ trợ (ví dụ số nguyên quá 64 bit, khóa không phải chuỗi) dùng lại json chuẩn.
+    """
+
+    def encode(self, o):
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            return super().encode(o)
+
+
+def select_encoder(name='auto'):
+    """Chọn lớp bộ mã hóa JSON cho app.json_encoder theo cấu hình JSON_ENCODER"""
+    if name not in ENCODERS:
+        raise ValueError(f"JSON_ENCODER phải là một trong: {', '.join(ENCODERS)}")
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_ENCODER=orjson cần gói orjson (pip install orjson)')
+    if name == 'stdlib' or orjson is None:
+        return StdlibJSONEncoder
+    return OrjsonEncoder
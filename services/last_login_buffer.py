@@ -0,0 +1,97 @@
+# services/last_login_buffer.py
+from models.user import User
+from pymongo import UpdateOne
+from bson import ObjectId
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LastLoginBuffer:
+    """
+    Gom các cập nhật last_login trong bộ nhớ và ghi định kỳ bằng một bulk_write ($max).
+    Nếu tiến trình chết đột ngột, tối đa `flush_interval` giây cập nhật last_login bị mất.
+    """
+    
+    def __init__(self, flush_interval=5.0, max_pending=1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+    
+    def configure(self, flush_interval=None, max_pending=None):
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if max_pending is not None:
+            self.max_pending = max_pending
+    
+    def record(self, user_id, logged_in_at):
+        """Ghi nhận một lần đăng nhập; chỉ giữ thời điểm mới nhất của mỗi người dùng"""
+        self._ensure_started()
+        with self._lock:
+            user_id = str(user_id)
+            previous = self._pending.get(user_id)
+            if previous is None or logged_in_at > previous:
+                self._pending[user_id] = logged_in_at
+            full = len(self._pending) >= self.max_pending
+        
+        if full:
+            self.flush()
+    
+    def flush(self):
+        """Ghi tất cả cập nhật đang chờ bằng một lệnh bulk_write, trả về số người dùng được ghi"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        
+        # $max giữ đúng thời điểm mới nhất kể cả khi nhiều tiến trình ghi xen kẽ
+        operations = [
+            UpdateOne({'_id': ObjectId(user_id)}, {'$max': {'last_login': logged_in_at}})
+            for user_id, logged_in_at in pending.items()
+        ]
+        try:
+            User._get_collection().bulk_write(operations, ordered=False)
+        except Exception:
+            logger.exception('Không thể ghi last_login cho %d người dùng', len(pending))
+            # Trả lại để thử ở lần ghi sau, không vượt quá giới hạn bộ đệm
+            with self._lock:
+                for user_id, logged_in_at in pending.items():
+                    if len(self._pending) >= self.max_pending:
+                        break
+                    if logged_in_at > self._pending.get(user_id, logged_in_at.min):
+                        self._pending[user_id] = logged_in_at
+            return 0
+        return len(pending)
+    
+    def _ensure_started(self):
+        # Khởi động luồng ghi khi cần, để mỗi tiến trình (kể cả sau fork) có luồng riêng
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='last-login-flusher', daemon=True)
+            self._thread.start()
+            # Luồng có thể được khởi động lại (sau fork hoặc stop): chỉ đăng ký atexit một lần
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+    
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+    
+    def stop(self):
+        """Dừng luồng ghi và ghi nốt các cập nhật còn lại (gọi khi tắt ứng dụng)"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+last_login_buffer = LastLoginBuffer()
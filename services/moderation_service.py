@@ -0,0 +1,242 @@
+# services/moderation_service.py
+from models.image import Image
+from models.report import Report
+from models.user import User
+from services.stats_service import StatsService
+from services.storage_service import StorageService
+from services.auth_cache import auth_cache
+from services.job_queue import JobQueue
+from services.feed_cache import feed_cache
+from bson import ObjectId
+from bson.errors import InvalidId
+import datetime
+
+REPORT_STATUSES = ('pending', 'reviewed', 'rejected', 'approved')
+
+
+class InvalidBulkRequest(ValueError):
+    """Yêu cầu thao tác hàng loạt không hợp lệ (thiếu bộ lọc, ID sai, ...)"""
+    pass
+
+
+def object_ids(values, limit):
+    """Chuyển danh sách ID dạng chuỗi thành ObjectId (bỏ trùng, giữ thứ tự)"""
+    if not isinstance(values, list) or not values:
+        raise InvalidBulkRequest('Danh sách ids phải là mảng không rỗng')
+    if len(values) > limit:
+        raise InvalidBulkRequest(f'Tối đa {limit} ids mỗi yêu cầu')
+
+    try:
+        return list(dict.fromkeys(ObjectId(value) for value in values))
+    except (InvalidId, TypeError):
+        raise InvalidBulkRequest('Danh sách ids chứa ID không hợp lệ')
+
+
+class ModerationService:
+    """
+    Các thao tác kiểm duyệt hàng loạt cho admin.
+    Mỗi lần gọi xử lý tối đa `limit` bản ghi, theo từng lô `batch_size` bằng update_many/delete_many
+    (mỗi lô hình ảnh được đánh dấu trước khi xóa để bỏ tham chiếu tệp chính xác),
+    và trả về has_more để client gọi lại cho phần còn lại.
+    """
+
+    # Dấu xóa (purge) cũ hơn số giây này được coi là bỏ dở (tiến trình chết giữa chừng) và được nhận lại
+    PURGE_CLAIM_TIMEOUT = 600
+
+    @staticmethod
+    def delete_images(ids=None, uploaded_by=None, dry_run=False, limit=1000, batch_size=200):
+        """Xóa hàng loạt hình ảnh theo danh sách ID hoặc theo người tải lên"""
+        query = {}
+        if ids is not None:
+            query['_id'] = {'$in': object_ids(ids, limit)}
+        if uploaded_by is not None:
+            query['uploaded_by'] = object_ids([uploaded_by], 1)[0]
+        if not query:
+            raise InvalidBulkRequest('Cần ids hoặc uploaded_by')
+
+        collection = Image._get_collection()
+        if dry_run:
+            return {'matched': collection.count_documents(query), 'deleted': 0, 'dry_run': True}
+
+        deleted = 0
+        while deleted < limit:
+            batch = list(
+                collection.find({'$and': [query, ModerationService._unclaimed()]}, {'_id': 1})
+                .limit(min(batch_size, limit - deleted))
+            )
+            if not batch:
+                break
+
+            # Báo cáo về ảnh đã xóa cũng bị xóa, nếu không chúng còn 'pending' mãi trong hàng đợi kiểm duyệt
+            deleted += ModerationService._delete_image_batch(collection, batch, with_reports=True)
+
+        return {
+            'deleted': deleted,
+            'has_more': collection.find_one(query, {'_id': 1}) is not None,
+            'dry_run': False
+        }
+
+    @staticmethod
+    def update_reports(status, ids=None, image_id=None, current_status=None,
+                       dry_run=False, limit=1000, batch_size=200):
+        """
+        Cập nhật trạng thái hàng loạt báo cáo theo danh sách ID hoặc theo bộ lọc
+        (ví dụ: mọi báo cáo 'pending' của một hình ảnh)
+        """
+        if status not in REPORT_STATUSES:
+            raise InvalidBulkRequest('Trạng thái không hợp lệ')
+        if current_status is not None and current_status not in REPORT_STATUSES:
+            raise InvalidBulkRequest('Trạng thái lọc không hợp lệ')
+
+        query = {}
+        if ids is not None:
+            query['_id'] = {'$in': object_ids(ids, limit)}
+        if image_id is not None:
+            query['image'] = object_ids([image_id], 1)[0]
+        if not query and current_status is None:
+            raise InvalidBulkRequest('Cần ids, image_id hoặc current_status')
+
+        # Bỏ qua các báo cáo đã ở trạng thái đích, nên mỗi lô luôn tiến về phía trước
+        query['status'] = {'$ne': status} if current_status is None else current_status
+        if current_status == status:
+            return {'matched': 0, 'updated': 0, 'has_more': False, 'dry_run': dry_run}
+
+        collection = Report._get_collection()
+        if dry_run:
+            return {'matched': collection.count_documents(query), 'updated': 0, 'dry_run': True}
+
+        updated = 0
+        while updated < limit:
+            batch = list(
+                collection.find(query, {'_id': 1}).limit(min(batch_size, limit - updated))
+            )
+            if not batch:
+                break
+
+            # Lọc lại theo query khi ghi: báo cáo đã đổi trạng thái kể từ lúc đọc lô thì bỏ qua
+            batch_query = {**query, '_id': {'$in': [report['_id'] for report in batch]}}
+            if status == 'pending':
+                changed = collection.update_many(batch_query, {'$set': {'status': status}}).modified_count
+                StatsService.increment(pending_reports=changed)
+            else:
+                # Cập nhật riêng các báo cáo đang 'pending' để trừ bộ đếm đúng bằng số đã thực sự đổi
+                from_pending = collection.update_many(
+                    {'$and': [batch_query, {'status': 'pending'}]}, {'$set': {'status': status}}
+                ).modified_count
+                StatsService.increment(pending_reports=-from_pending)
+                changed = from_pending + collection.update_many(
+                    batch_query, {'$set': {'status': status}}
+                ).modified_count
+            updated += changed
+
+        return {
+            'updated': updated,
+            'has_more': collection.find_one(query, {'_id': 1}) is not None,
+            'dry_run': False
+        }
+
+    @staticmethod
+    def delete_users(ids, exclude=None, dry_run=False, limit=1000, batch_size=200):
+        """Xóa hàng loạt người dùng theo danh sách ID (không bao giờ xóa chính admin đang thao tác)"""
+        user_ids = object_ids(ids, limit)
+        if exclude is not None:
+            user_ids = [user_id for user_id in user_ids if str(user_id) != str(exclude)]
+
+        collection = User._get_collection()
+        if dry_run:
+            matched = collection.count_documents({'_id': {'$in': user_ids}})
+            return {'matched': matched, 'deleted': 0, 'dry_run': True}
+
+        deleted = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            result = collection.delete_many({'_id': {'$in': batch}})
+            deleted += result.deleted_count
+
+            for user_id in batch:
+                auth_cache.invalidate(user_id)
+            StatsService.increment(users=-result.deleted_count)
+
+            # Hình ảnh, tệp và báo cáo của những người dùng này được xóa dần bởi worker
+            JobQueue.enqueue_many([('purge_user', {'user_id': str(user_id)}) for user_id in batch])
+
+        return {'deleted': deleted, 'has_more': False, 'dry_run': False}
+
+    @staticmethod
+    def purge_user(user_id, batch_size=200, max_batches=10):
+        """
+        Xóa dữ liệu còn lại của một người dùng đã bị xóa: báo cáo do họ gửi,
+        hình ảnh của họ cùng tệp và các báo cáo về những hình ảnh đó.
+        Mỗi lần gọi chỉ chạy tối đa max_batches lô; trả về True khi không còn gì để xóa.
+        Có thể gọi lại bao nhiêu lần cũng được vì mỗi lô được chọn từ dữ liệu còn lại.
+        """
+        user_id = ObjectId(user_id)
+        reports = Report._get_collection()
+        images = Image._get_collection()
+
+        for _ in range(max_batches):
+            # Dùng chỉ mục reported_by và uploaded_by để chọn từng lô
+            batch = list(reports.find({'reported_by': user_id}, {'_id': 1}).limit(batch_size))
+            if batch:
+                ModerationService._delete_reports({'_id': {'$in': [report['_id'] for report in batch]}})
+                continue
+
+            batch = list(
+                images.find({'uploaded_by': user_id, **ModerationService._unclaimed()}, {'_id': 1}).limit(batch_size)
+            )
+            if not batch:
+                return True
+            ModerationService._delete_image_batch(images, batch, with_reports=True)
+
+        return False
+
+    @staticmethod
+    def _delete_reports(query):
+        """Xóa các báo cáo khớp query; tách riêng báo cáo 'pending' để trừ bộ đếm chính xác"""
+        collection = Report._get_collection()
+        pending = collection.delete_many({**query, 'status': 'pending'}).deleted_count
+        collection.delete_many(query)
+        if pending:
+            StatsService.increment(pending_reports=-pending)
+
+    @staticmethod
+    def _unclaimed():
+        """Hình ảnh chưa được lệnh xóa nào khác đánh dấu (hoặc dấu đã quá PURGE_CLAIM_TIMEOUT)"""
+        stale = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            seconds=ModerationService.PURGE_CLAIM_TIMEOUT
+        )
+        return {'$or': [{'purge': {'$exists': False}}, {'purge': {'$lt': ObjectId.from_datetime(stale)}}]}
+
+    @staticmethod
+    def _delete_image_batch(collection, batch, with_reports=False):
+        """
+        Xóa một lô hình ảnh đã đọc (cần _id), bỏ tham chiếu tới tệp
+        và giao việc xóa tệp trên đĩa cho worker. Trả về số hình ảnh đã xóa.
+
+        Lô được đánh dấu bằng một token trước (update_many), rồi đọc và xóa theo token (find, delete_many):
+        một phần lô có thể vừa bị yêu cầu khác xóa song song, nên chỉ các ảnh lệnh này đã đánh dấu
+        mới được bỏ tham chiếu tệp và trừ bộ đếm.
+        """
+        token = ObjectId()
+        collection.update_many(
+            {'$and': [{'_id': {'$in': [image['_id'] for image in batch]}}, ModerationService._unclaimed()]},
+            {'$set': {'purge': token}}
+        )
+        claimed = list(collection.find({'purge': token}, {'file_path': 1, 'is_public': 1}))
+        if not claimed:
+            return 0
+
+        if with_reports:
+            ModerationService._delete_reports({'image': {'$in': [image['_id'] for image in claimed]}})
+        collection.delete_many({'purge': token})
+
+        deleted = len(claimed)
+        public = sum(1 for image in claimed if image.get('is_public', True) is not False)
+        StatsService.increment(images=-deleted, public_images=-public)
+        if public:
+            feed_cache.invalidate()
+
+        unused = StorageService.release_many([image['file_path'] for image in claimed])
+        JobQueue.enqueue_many([('remove_files', {'file_name': file_name}) for file_name in unused])
+
+        return deleted
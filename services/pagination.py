@@ -0,0 +1,130 @@
+# services/pagination.py
+from flask import abort
+from mongoengine.queryset.visitor import Q
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+import base64
+import math
+import json
+
+# Số phần tử tối đa mỗi trang (per_page) của các danh sách
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    """Cursor phân trang không hợp lệ"""
+    pass
+
+
+class OffsetPage(object):
+    """
+    Một trang kết quả phân trang theo page/per_page.
+    Giống Pagination của flask_mongoengine nhưng không tự động dereference các ReferenceField,
+    để tầng service có thể nạp các tham chiếu theo lô.
+    """
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def pages(self):
+        return int(math.ceil(self.total / float(self.per_page)))
+
+
+class CursorPage(object):
+    """Một trang kết quả phân trang theo cursor (keyset)"""
+
+    def __init__(self, items, next_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(created_at, object_id):
+    """Mã hóa vị trí (created_at, _id) thành chuỗi cursor an toàn cho URL"""
+    raw = json.dumps([created_at.isoformat(), str(object_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Giải mã cursor thành (created_at, ObjectId)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, object_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), ObjectId(object_id)
+    except (ValueError, TypeError, InvalidId, UnicodeError):
+        raise InvalidCursor('Cursor không hợp lệ')
+
+
+def clamp_per_page(per_page, default=20):
+    """Giới hạn per_page từ query string trong khoảng 1..MAX_PER_PAGE (không truyền hoặc không hợp lệ thì dùng mặc định)"""
+    if per_page is None:
+        return default
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def keyset_paginate(queryset, cursor, per_page):
+    """
+    Phân trang theo keyset trên (created_at, _id) giảm dần.
+    Không dùng skip() và count(), nên chi phí mỗi trang không phụ thuộc vào độ sâu trang.
+    Cursor rỗng nghĩa là trang đầu tiên.
+    """
+    # limit(0) nghĩa là không giới hạn: per_page < 1 không bao giờ được tới MongoDB
+    if per_page < 1:
+        abort(400)
+    if cursor:
+        created_at, object_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=object_id)
+        )
+
+    # Lấy dư một phần tử để biết còn trang tiếp theo hay không
+    rows = list(queryset.order_by('-created_at', '-id').limit(per_page + 1))
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor(*_cursor_key(items[-1]))
+
+    return CursorPage(items, next_cursor, per_page)
+
+
+def offset_paginate(queryset, page, per_page):
+    """Phân trang theo page/per_page bằng skip() và count(), không dereference"""
+    if per_page < 1:
+        abort(400)
+    if page < 1:
+        abort(404)
+
+    total = queryset.count()
+    items = list(queryset.skip((page - 1) * per_page).limit(per_page))
+    if not items and page != 1:
+        abort(404)
+
+    return OffsetPage(items, page, per_page, total)
+
+
+def _cursor_key(row):
+    """Lấy (created_at, _id) từ Document hoặc từ bản ghi thô (as_pymongo)"""
+    if isinstance(row, dict):
+        return row['created_at'], row['_id']
+    return row.created_at, row.id
+
+
+def page_meta(page):
+    """Thông tin phân trang trả về cho client, tùy theo kiểu phân trang"""
+    if isinstance(page, CursorPage):
+        return {'next_cursor': page.next_cursor}
+    return {
+        'total': page.total,
+        'pages': page.pages,
+        'page': page.page
+    }
@@ -0,0 +1,81 @@
+# services/password_hasher.py
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+class HasherOverloaded(Exception):
+    """Hàng đợi băm mật khẩu đã đầy, request nên được từ chối ngay (503)"""
+    pass
+
+def normalize_method(method):
+    """Dạng đầy đủ của phương thức băm như werkzeug ghi vào chuỗi hash (pbkdf2:sha256 -> pbkdf2:sha256:150000)"""
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        return f'{method}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+class PasswordHasher:
+    """
+    Chạy các phép băm/kiểm tra mật khẩu (tốn CPU) trên một pool luồng riêng có giới hạn.
+    hashlib.pbkdf2_hmac nhả GIL nên các request khác vẫn được phục vụ trong lúc băm.
+    Khi số việc đang chạy và đang chờ vượt quá workers + max_queue, ném HasherOverloaded.
+    """
+    
+    def __init__(self, workers=2, max_queue=16, method='pbkdf2:sha256'):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._outstanding = 0
+        self.rejected = 0
+        self.completed = 0
+        self.configure(workers, max_queue, method)
+    
+    def configure(self, workers=None, max_queue=None, method=None):
+        with self._lock:
+            if workers is not None:
+                self.workers = workers
+            if max_queue is not None:
+                self.max_queue = max_queue
+            if method is not None:
+                self.method = normalize_method(method)
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+    
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._outstanding >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HasherOverloaded('Hệ thống đang quá tải, vui lòng thử lại sau')
+            self._outstanding += 1
+            executor = self._executor
+        
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+                self.completed += 1
+    
+    def hash(self, password):
+        """Băm mật khẩu bằng phương thức đang cấu hình"""
+        return self._run(generate_password_hash, password, self.method)
+    
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+    
+    def needs_rehash(self, pwhash):
+        """Hash được tạo bằng phương thức/số vòng khác với cấu hình hiện tại"""
+        return pwhash.split('$', 1)[0] != self.method
+    
+    def stats(self):
+        """Số liệu hàng đợi băm mật khẩu"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'in_flight': min(self._outstanding, self.workers),
+                'queued': max(self._outstanding - self.workers, 0),
+                'max_queue': self.max_queue,
+                'rejected': self.rejected,
+                'completed': self.completed
+            }
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,56 @@
+# services/projection.py
+class InvalidFields(ValueError):
+    """Danh sách trường yêu cầu (?fields=) không hợp lệ"""
+    pass
+
+
+class FieldSpec(object):
+    """
+    Mô tả một trường trong phản hồi API: tên trường trong MongoDB,
+    hàm chuyển đổi giá trị thô và giá trị mặc định khi trường không có trong bản ghi.
+    """
+
+    def __init__(self, db_field, convert=None, default=None):
+        self.db_field = db_field
+        self.convert = convert
+        self.default = default
+
+    def value(self, row):
+        value = row.get(self.db_field)
+        if value is None:
+            return self.default() if callable(self.default) else self.default
+        return self.convert(value) if self.convert else value
+
+
+def select_fields(raw, allowed):
+    """
+    Phân tích tham số ?fields=id,title,url thành danh sách trường.
+    Không truyền fields thì trả về toàn bộ các trường được phép của endpoint.
+    """
+    if not raw:
+        return list(allowed)
+
+    fields = []
+    for name in raw.split(','):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in allowed:
+            raise InvalidFields(f'Trường không hợp lệ: {name}')
+        fields.append(name)
+
+    return fields or list(allowed)
+
+
+def project(queryset, fields, specs, extra=()):
+    """Giới hạn truy vấn ở các trường cần thiết và trả về bản ghi thô (không tạo Document)"""
+    db_fields = {specs[name].db_field for name in fields}
+    db_fields.update(extra)
+    db_fields.discard('_id')
+    # _id luôn được MongoDB trả về, .only() cần ít nhất một trường khác
+    return queryset.only(*(db_fields or {'id'})).as_pymongo()
+
+
+def serialize_rows(rows, fields, specs):
+    """Chuyển các bản ghi thô thành dict theo đúng danh sách trường được yêu cầu"""
+    return [{name: specs[name].value(row) for name in fields} for row in rows]
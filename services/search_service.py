@@ -0,0 +1,123 @@
+# services/search_service.py
+from flask import abort
+from models.image import Image
+from services.pagination import CursorPage, InvalidCursor
+from bson import ObjectId
+from bson.errors import InvalidId
+import base64
+import json
+import unicodedata
+
+# Vị trí trong Image.search_text: [tiêu đề, mô tả, chú thích 1, chú thích 2, ...]
+TITLE_INDEX = 0
+DESCRIPTION_INDEX = 1
+CAPTIONS_START = 2
+
+
+def normalize_text(text):
+    """Chuẩn hóa để tìm kiếm không dấu: chữ thường, bỏ dấu tiếng Việt, đ -> d"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFD', text.lower().replace('đ', 'd'))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def search_terms(title, description, captions):
+    """Giá trị trường search_text cho một hình ảnh"""
+    return [normalize_text(title), normalize_text(description)] + [normalize_text(caption) for caption in captions or []]
+
+
+# search_text đã đúng dạng [tiêu đề, mô tả, ...] (biểu thức pipeline cập nhật)
+_SEARCH_TEXT_VALID = {'$gte': [{'$size': {'$cond': [{'$isArray': '$search_text'}, '$search_text', []]}}, CAPTIONS_START]}
+
+
+def search_text_expression(title=None, description=None, captions=None):
+    """
+    Biểu thức pipeline cập nhật tính lại search_text khi đổi tiêu đề, mô tả và/hoặc chú thích,
+    giữ nguyên các phần không đổi. Tài liệu cũ chưa có search_text đúng dạng thì bỏ trường này
+    (không ghi theo vị trí vào mảng thiếu), migration m0003 sẽ tính lại từ các trường đã lưu.
+    """
+    parts = [
+        {'$literal': [normalize_text(title)]} if title is not None
+        else {'$slice': ['$search_text', TITLE_INDEX, 1]},
+        {'$literal': [normalize_text(description)]} if description is not None
+        else {'$slice': ['$search_text', DESCRIPTION_INDEX, 1]},
+        {'$literal': [normalize_text(caption) for caption in captions]} if captions is not None
+        # Số phần tử lấy là hằng số lớn nhất cho phép (tới hết mảng)
+        else {'$slice': ['$search_text', CAPTIONS_START, 2 ** 31 - 1]}
+    ]
+    return {'$cond': [_SEARCH_TEXT_VALID, {'$concatArrays': parts}, '$$REMOVE']}
+
+
+def append_search_text_expression(caption):
+    """Biểu thức pipeline thêm chú thích mới vào cuối search_text (xem search_text_expression)"""
+    return {'$cond': [
+        _SEARCH_TEXT_VALID,
+        {'$concatArrays': ['$search_text', {'$literal': [normalize_text(caption)]}]},
+        '$$REMOVE'
+    ]}
+
+
+def encode_score_cursor(score, object_id):
+    """Mã hóa vị trí (điểm liên quan, _id) thành cursor cho kết quả tìm kiếm"""
+    raw = json.dumps([score, str(object_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_score_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, object_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return float(score), ObjectId(object_id)
+    except (ValueError, TypeError, InvalidId, UnicodeError):
+        raise InvalidCursor('Cursor không hợp lệ')
+
+
+class SearchService:
+    @staticmethod
+    def search_images(query, user_id=None, per_page=20, cursor=None, fields=(), specs=None, normalize=True):
+        """
+        Tìm hình ảnh theo tiêu đề, mô tả và chú thích bằng chỉ mục text, xếp theo độ liên quan.
+        Chỉ trả về ảnh công khai và ảnh của chính người dùng (lọc ngay trong truy vấn).
+        Phân trang bằng cursor (điểm liên quan, _id).
+        """
+        # $limit phải dương: per_page < 1 không bao giờ được tới MongoDB
+        if per_page < 1:
+            abort(400)
+        terms = query.strip()
+        if normalize:
+            # Thêm dạng không dấu để khớp cả trường search_text (ví dụ "đà lạt" cũng tìm "da lat")
+            terms = f'{terms} {normalize_text(terms)}'
+
+        visibility = {'is_public': True}
+        if user_id:
+            visibility = {'$or': [{'is_public': True}, {'uploaded_by': ObjectId(user_id)}]}
+
+        pipeline = [
+            {'$match': {'$text': {'$search': terms}, **visibility}},
+            {'$addFields': {'_score': {'$meta': 'textScore'}}}
+        ]
+        if cursor:
+            score, object_id = decode_score_cursor(cursor)
+            pipeline.append({'$match': {'$or': [
+                {'_score': {'$lt': score}},
+                {'_score': score, '_id': {'$lt': object_id}}
+            ]}})
+
+        projection = {'_score': 1}
+        for name in fields:
+            projection[specs[name].db_field] = 1
+        projection.pop('_id', None)
+
+        pipeline += [
+            {'$sort': {'_score': -1, '_id': -1}},
+            {'$limit': per_page + 1},
+            {'$project': projection}
+        ]
+        rows = list(Image._get_collection().aggregate(pipeline))
+        items = rows[:per_page]
+
+        next_cursor = None
+        if len(rows) > per_page:
+            next_cursor = encode_score_cursor(items[-1]['_score'], items[-1]['_id'])
+        return CursorPage(items, next_cursor, per_page)
@@ -0,0 +1,89 @@
+# services/serializers.py
+from services.projection import FieldSpec
+from services.thumbnail_service import ThumbnailService
+from werkzeug.http import http_date
+
+
+def image_url(file_path):
+    """Đường dẫn API tới tệp ảnh gốc"""
+    return f"/api/images/file/{file_path}"
+
+
+def response_date(value):
+    """
+    Ngày giờ theo định dạng HTTP, giống hệt JSONEncoder của Flask, nhưng được định dạng sẵn
+    để bộ mã hóa JSON (orjson) không phải gọi lại Python cho từng giá trị.
+    """
+    return http_date(value.utctimetuple())
+
+
+# Các trường người dùng có thể trả về trong phản hồi (không bao giờ gồm mật khẩu)
+USER_FIELDS = {
+    'id': FieldSpec('_id', str),
+    'username': FieldSpec('username'),
+    'email': FieldSpec('email'),
+    'role': FieldSpec('role', default='user'),
+    'created_at': FieldSpec('created_at', response_date),
+    'last_login': FieldSpec('last_login', response_date)
+}
+
+# Các trường hình ảnh có thể trả về trong phản hồi (tên trường API -> trường MongoDB)
+IMAGE_FIELDS = {
+    'id': FieldSpec('_id', str),
+    'title': FieldSpec('title'),
+    'description': FieldSpec('description'),
+    'url': FieldSpec('file_path', image_url),
+    'thumbnail_url': FieldSpec('file_path', ThumbnailService.thumbnail_url),
+    'srcset': FieldSpec('file_path', ThumbnailService.srcset),
+    'created_at': FieldSpec('created_at', response_date),
+    'uploaded_by': FieldSpec('uploaded_by', str),
+    'is_public': FieldSpec('is_public', default=True),
+    'captions': FieldSpec('captions', default=list)
+}
+
+# Xuất dữ liệu giữ ngày giờ gốc (ghi dạng ISO 8601 để dùng lại làm since=)
+EXPORT_USER_FIELDS = {**USER_FIELDS, 'created_at': FieldSpec('created_at'), 'last_login': FieldSpec('last_login')}
+EXPORT_IMAGE_FIELDS = {**IMAGE_FIELDS, 'created_at': FieldSpec('created_at')}
+
+# Người dùng trong phản hồi đăng nhập và hồ sơ cá nhân
+LOGIN_USER_FIELDS = ('id', 'username', 'email', 'role')
+PROFILE_FIELDS = ('username', 'email', 'role', 'created_at', 'last_login')
+# Hình ảnh vừa tải lên
+UPLOADED_IMAGE_FIELDS = ('id', 'title', 'url')
+# Các trường của một báo cáo (serialize_report)
+REPORT_FIELDS = (
+    'id', 'image_id', 'image_title', 'image_url', 'reported_by', 'reporter_username', 'reason', 'status', 'created_at'
+)
+
+
+def serialize_document(document, fields, specs):
+    """Chuyển một Document thành dict theo cùng bảng trường với các danh sách (serialize_rows)"""
+    row = document.to_mongo()
+    return {name: specs[name].value(row) for name in fields}
+
+
+def serialize_user(user, fields=LOGIN_USER_FIELDS):
+    return serialize_document(user, fields, USER_FIELDS)
+
+
+def serialize_image(image, fields=UPLOADED_IMAGE_FIELDS):
+    return serialize_document(image, fields, IMAGE_FIELDS)
+
+
+def serialize_report(report, image, reporter, format_date=response_date):
+    """
+    Báo cáo (bản ghi thô) kèm tiêu đề ảnh và tên người báo cáo; ảnh hoặc người báo cáo có thể đã bị xóa.
+    format_date=None giữ created_at dạng datetime (xuất dữ liệu).
+    """
+    created_at = report.get('created_at')
+    return {
+        'id': str(report['_id']),
+        'image_id': str(report['image']),
+        'image_title': image['title'] if image else None,
+        'image_url': image_url(image['file_path']) if image else None,
+        'reported_by': str(report['reported_by']),
+        'reporter_username': reporter['username'] if reporter else None,
+        'reason': report['reason'],
+        'status': report.get('status', 'pending'),
+        'created_at': format_date(created_at) if format_date and created_at else created_at
+    }
@@ -0,0 +1,116 @@
+# services/stats_service.py
+from models.stats import Stats
+from models.image import Image
+from models.user import User
+from models.report import Report
+from services.job_queue import JobQueue
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import datetime
+
+COUNTERS = ('users', 'images', 'public_images', 'pending_reports')
+
+class StatsService:
+    KEY = 'global'
+    
+    @staticmethod
+    def increment(**deltas):
+        """Cộng dồn các bộ đếm (ví dụ: images=1, public_images=-1)"""
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        
+        Stats._get_collection().update_one(
+            {'_id': StatsService.KEY},
+            {'$inc': deltas, '$set': {'updated_at': datetime.datetime.now()}},
+            upsert=True
+        )
+    
+    @staticmethod
+    def reconcile():
+        """
+        Tính lại toàn bộ bộ đếm bằng một aggregation $facet duy nhất
+        (gộp users và reports vào pipeline của images bằng $unionWith).
+        Quét toàn bộ dữ liệu nên chỉ chạy từ CLI hoặc worker, không chạy trong request.
+        
+        Bộ đếm được sửa bằng $inc (kết quả quét trừ giá trị đọc trước khi quét) thay vì ghi đè,
+        nên các lần increment() xảy ra trong lúc quét không bị mất.
+        """
+        collection = Stats._get_collection()
+        before = collection.find_one({'_id': StatsService.KEY}) or {}
+        
+        pipeline = [
+            {'$project': {'_id': 0, 'kind': {'$literal': 'image'}, 'is_public': 1}},
+            {'$unionWith': {
+                'coll': User._get_collection_name(),
+                'pipeline': [{'$project': {'_id': 0, 'kind': {'$literal': 'user'}}}]
+            }},
+            {'$unionWith': {
+                'coll': Report._get_collection_name(),
+                'pipeline': [
+                    {'$match': {'status': 'pending'}},
+                    {'$project': {'_id': 0, 'kind': {'$literal': 'pending_report'}}}
+                ]
+            }},
+            {'$facet': {
+                'users': [{'$match': {'kind': 'user'}}, {'$count': 'n'}],
+                'images': [{'$match': {'kind': 'image'}}, {'$count': 'n'}],
+                'public_images': [{'$match': {'kind': 'image', 'is_public': True}}, {'$count': 'n'}],
+                'pending_reports': [{'$match': {'kind': 'pending_report'}}, {'$count': 'n'}]
+            }}
+        ]
+        facets = next(Image._get_collection().aggregate(pipeline, allowDiskUse=True))
+        
+        now = datetime.datetime.now()
+        counters = {name: facets[name][0]['n'] if facets[name] else 0 for name in COUNTERS}
+        stats = collection.find_one_and_update(
+            {'_id': StatsService.KEY},
+            {
+                '$inc': {name: counters[name] - before.get(name, 0) for name in COUNTERS},
+                '$set': {'reconciled_at': now, 'updated_at': now}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return dict({name: stats.get(name, 0) for name in COUNTERS}, reconciled_at=now)
+    
+    @staticmethod
+    def request_reconcile(max_staleness):
+        """
+        Xếp lịch công việc nền reconcile_stats, tối đa một lần mỗi max_staleness giây
+        cho mọi tiến trình (đánh dấu reconcile_requested_at bằng một lệnh cập nhật có điều kiện).
+        Trả về True nếu đã xếp lịch.
+        """
+        now = datetime.datetime.now()
+        try:
+            Stats._get_collection().update_one(
+                {
+                    '_id': StatsService.KEY,
+                    'reconcile_requested_at': {'$not': {'$gt': now - datetime.timedelta(seconds=max_staleness)}}
+                },
+                {'$set': {'reconcile_requested_at': now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Bản ghi đã có và vừa được yêu cầu đối soát gần đây
+            return False
+        
+        JobQueue.enqueue('reconcile_stats')
+        return True
+    
+    @staticmethod
+    def get_stats(max_staleness):
+        """
+        Đọc thống kê bằng một truy vấn theo khóa và trả về ngay.
+        Nếu chưa từng đối soát hoặc lần đối soát cuối cũ hơn max_staleness giây thì
+        xếp lịch đối soát cho worker (không quét dữ liệu trong request).
+        """
+        stats = Stats._get_collection().find_one({'_id': StatsService.KEY}) or {}
+        
+        reconciled_at = stats.get('reconciled_at')
+        if not reconciled_at or datetime.datetime.now() - reconciled_at > datetime.timedelta(seconds=max_staleness):
+            StatsService.request_reconcile(max_staleness)
+        
+        result = {name: stats.get(name, 0) for name in COUNTERS}
+        result['reconciled_at'] = reconciled_at
+        return result
@@ -0,0 +1,307 @@
+# services/storage_service.py
+from models.blob import Blob
+from services.job_queue import JobQueue
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from collections import Counter
+import datetime
+import glob
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+class UploadError(Exception):
+    """Lỗi khi lưu tệp tải lên"""
+    pass
+
+class UnsupportedFileType(UploadError):
+    pass
+
+class FileTooLarge(UploadError):
+    pass
+
+class StorageBusy(UploadError):
+    """Tệp cùng nội dung đang được xóa và chưa xong trong thời gian chờ"""
+    pass
+
+# Chữ ký đầu tệp (magic bytes) của các định dạng ảnh được phép
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'GIF87a', 'gif', 'image/gif'),
+    (b'GIF89a', 'gif', 'image/gif')
+)
+
+BLOB_NAME = re.compile(r'^([0-9a-f]{64})\.(png|jpg|gif)$')
+DERIVATIVE_SUFFIX = re.compile(r'@w\d+(?=\.\w+$)')
+
+def derivative_name(file_name, width):
+    """Tên tệp phái sinh, ví dụ abc.jpg -> abc@w320.jpg ('@' không bao giờ có trong tên tệp gốc)"""
+    stem, extension = os.path.splitext(file_name)
+    return f'{stem}@w{width}{extension}'
+
+def original_name(file_name):
+    """Tên tệp gốc của một tệp phái sinh (abc@w320.jpg -> abc.jpg)"""
+    return DERIVATIVE_SUFFIX.sub('', file_name)
+
+class StorageService:
+    UPLOAD_FOLDER = 'uploads/images'
+    CHUNK_SIZE = 64 * 1024
+    # Thời gian tối đa (giây) một lần xóa tệp được giữ dấu `removing` trên blob;
+    # quá thời gian này dấu được coi là bỏ dở (worker chết giữa chừng)
+    REMOVAL_TIMEOUT = 30
+    
+    @staticmethod
+    def sniff(head):
+        """Xác định định dạng ảnh từ các byte đầu tệp, None nếu không được phép"""
+        for signature, extension, content_type in IMAGE_SIGNATURES:
+            if head.startswith(signature):
+                return extension, content_type
+        return None
+    
+    @staticmethod
+    def shard_path(file_name):
+        """
+        Đường dẫn tương đối theo shard hai cấp: ab/cd/<tên tệp>, lấy từ hash của tên tệp gốc
+        để ảnh phái sinh nằm cùng thư mục với ảnh gốc.
+        """
+        digest = hashlib.sha256(original_name(file_name).encode('utf-8')).hexdigest()
+        return os.path.join(digest[:2], digest[2:4], file_name)
+    
+    @staticmethod
+    def path_for(file_name):
+        """Đường dẫn trên đĩa để ghi một tệp mới (luôn theo shard)"""
+        return os.path.join(StorageService.UPLOAD_FOLDER, StorageService.shard_path(file_name))
+    
+    @staticmethod
+    def resolve(file_name):
+        """
+        Đường dẫn tương đối (so với UPLOAD_FOLDER) nơi tệp đang nằm: thư mục shard,
+        hoặc thư mục phẳng cũ nếu tệp chưa được chuyển. None nếu không tìm thấy.
+        """
+        for relative_path in (StorageService.shard_path(file_name), file_name):
+            if os.path.isfile(os.path.join(StorageService.UPLOAD_FOLDER, relative_path)):
+                return relative_path
+        return None
+    
+    @staticmethod
+    def store(stream, max_size):
+        """
+        Ghi luồng tải lên xuống đĩa theo từng khối, đồng thời tính SHA-256.
+        Tệp được đặt tên theo nội dung nên các lần tải lên giống hệt nhau dùng chung một tệp;
+        mỗi lần lưu tăng số tham chiếu của blob. Trả về tên tệp đã lưu.
+        """
+        incoming = os.path.join(StorageService.UPLOAD_FOLDER, '.incoming')
+        os.makedirs(incoming, exist_ok=True)
+        
+        hasher = hashlib.sha256()
+        size = 0
+        referenced = None
+        fd, tmp_path = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                chunk = stream.read(StorageService.CHUNK_SIZE)
+                detected = StorageService.sniff(chunk)
+                if not detected:
+                    raise UnsupportedFileType('Loại tệp không được phép')
+                
+                while chunk:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLarge('Tệp vượt quá kích thước cho phép')
+                    hasher.update(chunk)
+                    out.write(chunk)
+                    chunk = stream.read(StorageService.CHUNK_SIZE)
+            
+            extension, content_type = detected
+            digest = hasher.hexdigest()
+            file_name = f'{digest}.{extension}'
+            
+            # Tăng tham chiếu trước khi đặt tệp vào chỗ để lệnh xóa đồng thời không gỡ mất tệp
+            previous = Blob._get_collection().find_one_and_update(
+                {'_id': digest},
+                {
+                    '$inc': {'ref_count': 1},
+                    '$setOnInsert': {
+                        'file_name': file_name,
+                        'content_type': content_type,
+                        'size': size,
+                        'created_at': datetime.datetime.now()
+                    }
+                },
+                upsert=True,
+                projection={'removing': 1}
+            )
+            referenced = file_name
+            if previous and previous.get('removing'):
+                # remove_files đang xóa tệp cũ cùng nội dung: chờ xong rồi mới đặt tệp mới vào chỗ
+                StorageService._wait_for_removal(digest)
+            
+            if StorageService.resolve(file_name):
+                os.remove(tmp_path)
+            else:
+                final_path = StorageService.path_for(file_name)
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+            
+            return file_name
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if referenced:
+                # Tệp không được đặt vào chỗ: trả lại tham chiếu đã tăng, nếu không blob không bao giờ được thu hồi
+                StorageService._unreference(referenced)
+            raise
+    
+    @staticmethod
+    def release(file_name):
+        """
+        Giảm số tham chiếu của tệp. Trả về True nếu không còn Image nào dùng tệp
+        và tệp trên đĩa cần được xóa (tệp cũ đặt tên theo uuid, không có blob, luôn được xóa).
+        """
+        match = BLOB_NAME.match(file_name)
+        if not match:
+            return True
+        
+        collection = Blob._get_collection()
+        blob = collection.find_one_and_update(
+            {'_id': match.group(1)},
+            {'$inc': {'ref_count': -1}},
+            projection={'ref_count': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        # Bản ghi blob được giữ lại; remove_files xóa nó cùng với tệp
+        return blob is None or blob['ref_count'] <= 0
+    
+    @staticmethod
+    def release_many(file_names):
+        """
+        Giảm số tham chiếu cho nhiều tệp cùng lúc (một bulk_write cho cả lô).
+        Trả về danh sách tệp không còn được tham chiếu và cần xóa trên đĩa.
+        """
+        counts = Counter()
+        to_remove = []
+        names = {}
+        for file_name in file_names:
+            match = BLOB_NAME.match(file_name)
+            if match:
+                counts[match.group(1)] += 1
+                names[match.group(1)] = file_name
+            else:
+                to_remove.append(file_name)
+        
+        if counts:
+            collection = Blob._get_collection()
+            collection.bulk_write(
+                [UpdateOne({'_id': digest}, {'$inc': {'ref_count': -count}}) for digest, count in counts.items()],
+                ordered=False
+            )
+            blobs = {
+                blob['_id']: blob['ref_count']
+                for blob in collection.find({'_id': {'$in': list(counts)}}, {'ref_count': 1})
+            }
+            to_remove.extend(names[digest] for digest in counts if blobs.get(digest, 0) <= 0)
+        
+        return to_remove
+    
+    @staticmethod
+    def remove_files(file_name):
+        """
+        Xóa tệp gốc cùng các ảnh phái sinh (<tên>@w<chiều rộng>.<đuôi>) ở cả thư mục shard
+        lẫn thư mục phẳng cũ. Idempotent: tệp đã không còn thì bỏ qua, các lỗi khác được ném ra để thử lại.
+        Bản ghi blob được giữ dấu `removing` trong lúc xóa và chỉ bị xóa khi xong.
+        """
+        match = BLOB_NAME.match(file_name)
+        if match and not StorageService._claim_removal(match.group(1), file_name):
+            # Cùng nội dung vừa được tải lên lại, tệp đang được dùng
+            return
+        
+        try:
+            stem = os.path.splitext(file_name)[0]
+            for folder in (os.path.dirname(StorageService.path_for(file_name)), StorageService.UPLOAD_FOLDER):
+                derivatives = glob.glob(os.path.join(folder, glob.escape(stem) + '@w*'))
+                for path in [os.path.join(folder, file_name)] + derivatives:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        finally:
+            if match:
+                StorageService._finish_removal(match.group(1))
+    
+    @staticmethod
+    def _claim_removal(digest, file_name):
+        """
+        Đánh dấu `removing` trên blob nếu không còn tham chiếu (tạo bản ghi nếu chưa có).
+        store() tăng ref_count trên cùng bản ghi, nên hoặc lần đánh dấu thất bại (tệp đang được dùng lại),
+        hoặc store() thấy dấu và chờ xóa xong rồi mới đặt tệp vào chỗ. Trả về True nếu được phép xóa tệp.
+        """
+        try:
+            Blob._get_collection().update_one(
+                {'_id': digest, 'ref_count': {'$lte': 0}},
+                {'$set': {'removing': datetime.datetime.now()}, '$setOnInsert': {'ref_count': 0, 'file_name': file_name}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Bản ghi tồn tại với ref_count > 0
+            return False
+        return True
+    
+    @staticmethod
+    def _finish_removal(digest):
+        collection = Blob._get_collection()
+        # Xóa bản ghi nếu vẫn không còn tham chiếu; nếu store() vừa tăng tham chiếu thì chỉ bỏ dấu
+        if not collection.delete_one({'_id': digest, 'ref_count': {'$lte': 0}}).deleted_count:
+            collection.update_one({'_id': digest}, {'$unset': {'removing': ''}})
+    
+    @staticmethod
+    def _unreference(file_name):
+        """Bỏ tham chiếu store() vừa tăng; tệp không còn ai dùng thì giao cho worker xóa như release()"""
+        if StorageService.release(file_name):
+            JobQueue.enqueue('remove_files', {'file_name': file_name})
+    
+    @staticmethod
+    def _wait_for_removal(digest):
+        """
+        Chờ remove_files bỏ dấu `removing` trên blob (bỏ qua dấu cũ hơn REMOVAL_TIMEOUT giây).
+        Hết thời gian chờ thì ném StorageBusy: đặt tệp vào chỗ lúc này có thể bị lệnh xóa gỡ mất.
+        """
+        deadline = time.monotonic() + StorageService.REMOVAL_TIMEOUT
+        while time.monotonic() < deadline:
+            blob = Blob._get_collection().find_one({'_id': digest}, {'removing': 1})
+            removing = blob.get('removing') if blob else None
+            if not removing or datetime.datetime.now() - removing > datetime.timedelta(seconds=StorageService.REMOVAL_TIMEOUT):
+                return
+            time.sleep(0.05)
+        logger.warning('Hết thời gian chờ xóa tệp của blob %s', digest)
+        raise StorageBusy('Tệp đang được xóa, vui lòng thử lại')
+    
+    @staticmethod
+    def migrate_to_shards(batch_size=500):
+        """
+        Chuyển tối đa `batch_size` tệp từ thư mục phẳng cũ sang thư mục shard bằng os.replace (nguyên tử).
+        Có thể chạy lại bất cứ lúc nào trong khi dịch vụ vẫn hoạt động; trả về số tệp đã chuyển, 0 khi xong.
+        """
+        moved = 0
+        with os.scandir(StorageService.UPLOAD_FOLDER) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                
+                target_path = StorageService.path_for(entry.name)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                if os.path.exists(target_path):
+                    # Lần chạy trước đã chuyển xong tệp này
+                    os.remove(entry.path)
+                else:
+                    os.replace(entry.path, target_path)
+                
+                moved += 1
+                if moved >= batch_size:
+                    break
+        return moved
@@ -0,0 +1,77 @@
+# services/thumbnail_service.py
+from services.storage_service import StorageService, derivative_name
+from PIL import Image as PILImage
+import os
+import tempfile
+
+# Các chiều rộng ảnh phái sinh được tạo sẵn và được phép yêu cầu qua ?w=
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+
+PIL_FORMATS = {'.jpg': 'JPEG', '.png': 'PNG', '.gif': 'GIF'}
+
+def render_derivative(source_path, target_path, width):
+    """Thu nhỏ ảnh gốc về chiều rộng `width` (giữ tỉ lệ) và ghi nguyên tử ra target_path"""
+    extension = os.path.splitext(target_path)[1]
+    with PILImage.open(source_path) as image:
+        image.seek(0)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), PILImage.LANCZOS)
+        if extension == '.jpg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), suffix=extension)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                image.save(out, PIL_FORMATS[extension], quality=85, optimize=True)
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+def render_all(source_path, widths):
+    """Tạo tất cả ảnh phái sinh còn thiếu cạnh ảnh gốc (chạy trong tiến trình worker)"""
+    folder, file_name = os.path.split(source_path)
+    created = []
+    for width in widths:
+        target_path = os.path.join(folder, derivative_name(file_name, width))
+        if not os.path.exists(target_path):
+            render_derivative(source_path, target_path, width)
+            created.append(width)
+    return created
+
+class ThumbnailService:
+    @staticmethod
+    def generate(file_name):
+        """Tạo tất cả ảnh phái sinh còn thiếu cho một tệp đã lưu (chạy trong worker công việc nền)"""
+        source = StorageService.resolve(file_name)
+        if not source:
+            # Hình ảnh đã bị xóa trước khi worker kịp xử lý
+            return []
+        return render_all(os.path.join(StorageService.UPLOAD_FOLDER, source), THUMBNAIL_WIDTHS)
+    
+    @staticmethod
+    def get_or_create(file_name, width):
+        """
+        Trả về tên tệp phái sinh có chiều rộng `width`, tạo ngay (cạnh ảnh gốc) nếu chưa có trên đĩa.
+        Ném ValueError nếu chiều rộng không được hỗ trợ, FileNotFoundError nếu không có ảnh gốc.
+        """
+        if width not in THUMBNAIL_WIDTHS:
+            raise ValueError('Chiều rộng không được hỗ trợ')
+        
+        name = derivative_name(file_name, width)
+        if not StorageService.resolve(name):
+            source = StorageService.resolve(file_name)
+            if not source:
+                raise FileNotFoundError(file_name)
+            source_path = os.path.join(StorageService.UPLOAD_FOLDER, source)
+            render_derivative(source_path, os.path.join(os.path.dirname(source_path), name), width)
+        return name
+    
+    @staticmethod
+    def thumbnail_url(file_name):
+        return f"/api/images/file/{file_name}?w={THUMBNAIL_WIDTHS[0]}"
+    
+    @staticmethod
+    def srcset(file_name):
+        return ', '.join(f"/api/images/file/{file_name}?w={width} {width}w" for width in THUMBNAIL_WIDTHS)
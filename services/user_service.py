@@ -1,37 +1,61 @@
 # services/user_service.py
-from werkzeug.security import generate_password_hash, check_password_hash
 from models.user import User
+from services.pagination import offset_paginate
+from services.projection import project
+from services.serializers import USER_FIELDS
+from services.stats_service import StatsService
+from services.auth_cache import auth_cache
+from services.last_login_buffer import last_login_buffer
+from services.password_hasher import password_hasher, HasherOverloaded
+from services.job_queue import JobQueue
 import datetime
 
 class UserService:
     @staticmethod
     def create_user(username, password, email):
         """Tạo người dùng mới với mật khẩu đã được mã hóa"""
-        hashed_password = generate_password_hash(password)
+        hashed_password = password_hasher.hash(password)
         user = User(
             username=username,
             password=hashed_password,
             email=email
         )
         user.save()
+        StatsService.increment(users=1)
         return user
     
     @staticmethod
     def authenticate(username, password):
         """Xác thực người dùng"""
         user = User.objects(username=username).first()
-        if user and check_password_hash(user.password, password):
+        if user and password_hasher.verify(user.password, password):
+            if password_hasher.needs_rehash(user.password):
+                UserService._upgrade_password_hash(user, password)
+            
+            # last_login được ghi gộp ở nền thay vì lưu lại toàn bộ tài liệu
             user.last_login = datetime.datetime.now()
-            user.save()
+            last_login_buffer.record(user.id, user.last_login)
             return user
         return None
     
+    @staticmethod
+    def _upgrade_password_hash(user, password):
+        """Băm lại mật khẩu theo cấu hình hiện tại sau khi đăng nhập thành công"""
+        try:
+            new_hash = password_hasher.hash(password)
+        except HasherOverloaded:
+            return  # Để lần đăng nhập sau
+        
+        # Chỉ ghi nếu mật khẩu chưa bị đổi trong lúc băm
+        User.objects(id=user.id, password=user.password).update_one(set__password=new_hash)
+        user.password = new_hash
+    
     @staticmethod
     def change_password(user_id, current_password, new_password):
         """Thay đổi mật khẩu người dùng"""
         user = User.objects(id=user_id).first()
-        if user and check_password_hash(user.password, current_password):
-            user.password = generate_password_hash(new_password)
+        if user and password_hasher.verify(user.password, current_password):
+            user.password = password_hasher.hash(new_password)
             user.save()
             return True
         return False
@@ -60,9 +84,10 @@ class UserService:
         return User.objects(id=user_id).first()
     
     @staticmethod
-    def get_all_users(page=1, per_page=20):
+    def get_all_users(page=1, per_page=20, fields=None):
         """Lấy tất cả người dùng với phân trang (chỉ admin)"""
-        return User.objects.paginate(page=page, per_page=per_page)
+        users = project(User.objects, fields or USER_FIELDS, USER_FIELDS)
+        return offset_paginate(users, page, per_page)
     
     @staticmethod
     def delete_user(user_id):
@@ -70,5 +95,9 @@ class UserService:
         user = User.objects(id=user_id).first()
         if user:
             user.delete()
+            auth_cache.invalidate(user_id)
+            StatsService.increment(users=-1)
+            # Hình ảnh, tệp và báo cáo liên quan được xóa dần theo lô bởi worker
+            JobQueue.enqueue('purge_user', {'user_id': str(user.id)})
             return True
         return False
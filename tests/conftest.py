@@ -0,0 +1,142 @@
+# tests/conftest.py
+"""
+Các test chạy trên mongomock (trong bộ nhớ). Đặt TEST_MONGODB_URI (ví dụ mongodb://localhost:27017/airc_test)
+để chạy trên mongod thật; cơ sở dữ liệu đó sẽ bị xóa trước mỗi test.
+"""
+import functools
+import os
+import threading
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_db
+from pymongo import monitoring
+
+from models.user import User
+
+TEST_MONGODB_URI = os.getenv('TEST_MONGODB_URI')
+
+# Các phương thức Collection tương ứng một lệnh gửi tới máy chủ (khi đếm lệnh trên mongomock)
+COLLECTION_COMMANDS = {
+    'find': 'find', 'find_one': 'find', 'aggregate': 'aggregate', 'count_documents': 'aggregate',
+    'insert_one': 'insert', 'insert_many': 'insert', 'update_one': 'update', 'update_many': 'update',
+    'delete_one': 'delete', 'delete_many': 'delete', 'bulk_write': 'bulk_write',
+    'find_one_and_update': 'findAndModify', 'find_one_and_delete': 'findAndModify'
+}
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Ghi lại các lệnh (tên lệnh, collection) gửi tới MongoDB trong một test"""
+
+    def __init__(self):
+        self.commands = []
+        self.enabled = False
+
+    def started(self, event):
+        if self.enabled:
+            self.record(event.command_name, event.command.get(event.command_name))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def record(self, command_name, collection):
+        self.commands.append((command_name, collection))
+
+    def count(self, collection=None):
+        return sum(1 for _, name in self.commands if collection is None or name == collection)
+
+    def reset(self):
+        self.commands = []
+
+
+command_counter = CommandCounter()
+monitoring.register(command_counter)
+
+_spy_state = threading.local()
+
+
+def _counting(command_name, method):
+    # mongomock gọi lại các phương thức khác bên trong (find_one gọi find): chỉ đếm lời gọi ngoài cùng
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_spy_state, 'active', False):
+            return method(self, *args, **kwargs)
+        _spy_state.active = True
+        try:
+            if command_counter.enabled:
+                command_counter.record(command_name, self.name)
+            return method(self, *args, **kwargs)
+        finally:
+            _spy_state.active = False
+    return wrapper
+
+
+@pytest.fixture
+def database():
+    """Cơ sở dữ liệu rỗng cho mỗi test"""
+    disconnect()
+    if TEST_MONGODB_URI:
+        connect(host=TEST_MONGODB_URI)
+    else:
+        connect('airc_test', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+    get_db().client.drop_database(get_db().name)
+    yield
+    disconnect()
+
+
+@pytest.fixture
+def commands(database, monkeypatch):
+    """Bộ đếm lệnh MongoDB; bật bằng commands.enabled = True quanh đoạn cần đo"""
+    if not TEST_MONGODB_URI:
+        for method_name, command_name in COLLECTION_COMMANDS.items():
+            method = getattr(mongomock.collection.Collection, method_name)
+            monkeypatch.setattr(mongomock.collection.Collection, method_name, _counting(command_name, method))
+    command_counter.reset()
+    yield command_counter
+    command_counter.enabled = False
+
+
+@pytest.fixture
+def user(database):
+    return User(username='tester', password='x', email='tester@example.com').save()
+
+
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    """Thư mục tải lên tạm cho test"""
+    from services.storage_service import StorageService
+    monkeypatch.setattr(StorageService, 'UPLOAD_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def app(database):
+    """Ứng dụng Flask tối thiểu với các blueprint API (không cấu hình lại kết nối MongoDB)"""
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from routes.admin_controller import admin_routes
+    from routes.image_controller import image_routes
+    from services.feed_cache import feed_cache
+    from services.json_encoder import StdlibJSONEncoder
+
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'test'
+    app.config['SEARCH_NORMALIZE'] = True
+    app.json_encoder = StdlibJSONEncoder
+    JWTManager(app)
+    app.register_blueprint(image_routes, url_prefix='/api/images')
+    app.register_blueprint(admin_routes, url_prefix='/api/admin')
+
+    feed_cache.configure(max_pages=3, max_size=256, ttl=60, generation_ttl=1.0, page_sizes=(20,))
+    feed_cache._generation = None
+    yield app
+    feed_cache.configure()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,82 @@
+# tests/test_export_service.py
+import csv
+import datetime
+import io
+import json
+
+import pytest
+
+from models.image import Image
+from services.export_service import ExportService, InvalidExport, parse_since, to_csv, to_ndjson
+
+CREATED_FROM = datetime.datetime(2024, 5, 1, 8, 0, 0)
+
+
+def create_images(user, titles):
+    return [
+        Image(title=title, file_path=f'{i:064x}.jpg', uploaded_by=user, captions=['=cmd|x', 'ok'],
+              created_at=CREATED_FROM + datetime.timedelta(seconds=i)).save()
+        for i, title in enumerate(titles)
+    ]
+
+
+def test_parse_since():
+    assert parse_since(None) is None
+    assert parse_since('') is None
+    assert parse_since('2024-05-01T08:00:00') == CREATED_FROM
+    assert parse_since('2024-05-01T08:00:00', overlap=60) == CREATED_FROM - datetime.timedelta(seconds=60)
+    # Múi giờ được đổi về giờ địa phương không kèm múi giờ như created_at
+    utc = CREATED_FROM.replace(tzinfo=datetime.timezone.utc)
+    assert parse_since('2024-05-01T08:00:00Z') == utc.astimezone().replace(tzinfo=None)
+    with pytest.raises(InvalidExport):
+        parse_since('hôm qua')
+
+
+def test_ndjson_rows(user):
+    images = create_images(user, ['Đà Lạt', 'Huế'])
+
+    batches = ExportService.export_images(['id', 'title', 'created_at', 'captions'], batch_size=1)
+    body = ''.join(to_ndjson(batches, json.dumps))
+    rows = [json.loads(line) for line in body.splitlines()]
+
+    assert rows == [
+        {'id': str(image.id), 'title': image.title, 'created_at': image.created_at.isoformat(),
+         'captions': ['=cmd|x', 'ok']}
+        for image in images
+    ]
+
+
+def test_csv_rows_escape_formulas(user):
+    create_images(user, ['=HYPERLINK("http://evil")', '+1', '-2', '@SUM(A1)', 'Đà Lạt'])
+
+    fields = ['title', 'created_at', 'captions']
+    body = ''.join(to_csv(ExportService.export_images(fields, batch_size=2), fields))
+    rows = list(csv.reader(io.StringIO(body)))
+
+    assert rows[0] == ['title', 'created_at', 'captions']
+    assert [row[0] for row in rows[1:]] == ["'=HYPERLINK(\"http://evil\")", "'+1", "'-2", "'@SUM(A1)", 'Đà Lạt']
+    assert rows[1][1] == CREATED_FROM.isoformat()
+    # Danh sách được ghi dạng JSON, không bắt đầu bằng ký tự công thức
+    assert json.loads(rows[1][2]) == ['=cmd|x', 'ok']
+
+
+def test_csv_without_rows_has_header(database):
+    body = ''.join(to_csv(ExportService.export_images(['id', 'title']), ['id', 'title']))
+
+    assert body == 'id,title\r\n'
+
+
+def test_since_is_inclusive_with_overlap(user):
+    images = create_images(user, ['a', 'b', 'c'])
+    last_exported = images[1].created_at
+
+    # Bản ghi tạo trước dòng cuối đã xuất nhưng ghi xong sau lần xuất đó
+    late = Image(title='late', file_path='f' * 64 + '.jpg', uploaded_by=user,
+                 created_at=last_exported - datetime.timedelta(seconds=1)).save()
+
+    since = parse_since(last_exported.isoformat(), overlap=60)
+    exported = [row['id'] for batch in ExportService.export_images(['id'], since=since) for row in batch]
+
+    assert str(late.id) in exported
+    assert str(images[1].id) in exported
+    assert str(images[2].id) in exported
@@ -0,0 +1,90 @@
+# tests/test_feed_cache.py
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import threading
+
+from models.image import Image
+from services.feed_cache import FeedCache, feed_cache
+
+
+def build_counter(body=b'{}'):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return body
+    return build, calls
+
+
+def test_only_allowed_page_sizes_are_cacheable():
+    cache = FeedCache(max_pages=3, page_sizes=(20,))
+
+    assert cache.is_cacheable(1, None, 20)
+    assert cache.is_cacheable(1, '', 20)
+    assert not cache.is_cacheable(1, None, 100)
+    assert not cache.is_cacheable(4, None, 20)
+    assert not FeedCache(max_pages=0).is_cacheable(1, None, 20)
+
+
+def test_invalidate_starts_new_generation(database):
+    cache = FeedCache(generation_ttl=60)
+    build, calls = build_counter()
+
+    cache.get_or_build('feed', build)
+    cache.get_or_build('feed', build)
+    assert len(calls) == 1
+
+    cache.invalidate()
+    cache.get_or_build('feed', build)
+    assert len(calls) == 2
+
+
+def test_other_process_sees_new_generation_after_generation_ttl(database):
+    cache, other = FeedCache(generation_ttl=0), FeedCache(generation_ttl=0)
+    build, calls = build_counter()
+
+    cache.get_or_build('feed', build)
+    other.invalidate()
+    cache.get_or_build('feed', build)
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_build_once(database):
+    cache = FeedCache()
+    release = threading.Event()
+    calls = []
+
+    def build():
+        calls.append(1)
+        release.wait(timeout=5)
+        return b'{"images": []}'
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = [pool.submit(cache.get_or_build, 'feed', build) for _ in range(8)]
+        # Các request chờ trên cùng một lần tạo phản hồi
+        release.set()
+        bodies = {future.result() for future in results}
+
+    assert len(calls) == 1
+    assert len(bodies) == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_public_feed_etag_and_not_modified(client, user):
+    Image(title='Đà Lạt', file_path='a' * 64 + '.jpg', uploaded_by=user, created_at=datetime.datetime(2024, 1, 1)).save()
+
+    first = client.get('/api/images/?cursor=&per_page=20')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+
+    cached = client.get('/api/images/?cursor=&per_page=20', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert feed_cache.stats()['hits'] >= 1
+
+    # Thay đổi feed làm phản hồi (và ETag) cũ hết hiệu lực
+    feed_cache.invalidate()
+    Image(title='Huế', file_path='b' * 64 + '.jpg', uploaded_by=user, created_at=datetime.datetime(2024, 1, 2)).save()
+    changed = client.get('/api/images/?cursor=&per_page=20', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert len(changed.get_json()['images']) == 2
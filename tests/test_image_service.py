@@ -0,0 +1,88 @@
+# tests/test_image_service.py
+from concurrent.futures import ThreadPoolExecutor
+import io
+
+from mongoengine.errors import ValidationError
+from PIL import Image as PILImage
+
+from models.blob import Blob
+from models.image import Image
+from models.job import Job
+from services.image_service import ImageService
+from services.search_service import search_terms
+
+
+def create_image(user, title='Đà Lạt', description='Hồ Xuân Hương'):
+    return Image(
+        title=title,
+        description=description,
+        file_path='a' * 64 + '.jpg',
+        uploaded_by=user,
+        search_text=search_terms(title, description, [])
+    ).save()
+
+
+def test_concurrent_captions_are_not_lost(user):
+    image = create_image(user)
+    captions = [f'Chú thích {i}' for i in range(50)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda caption: ImageService.add_caption(str(image.id), str(user.id), caption), captions))
+
+    assert all(results)
+    stored = Image._get_collection().find_one({'_id': image.id})
+    assert len(stored['captions']) == len(captions)
+    assert sorted(stored['captions']) == sorted(captions)
+    assert stored['search_text'] == search_terms(stored['title'], stored['description'], stored['captions'])
+
+
+def test_update_keeps_search_text_in_sync(user):
+    image = create_image(user)
+    ImageService.add_caption(str(image.id), str(user.id), 'Buổi sáng')
+
+    assert ImageService.update_image(str(image.id), str(user.id), {'title': 'Phố cổ Hội An'})
+
+    stored = Image._get_collection().find_one({'_id': image.id})
+    assert stored['search_text'] == search_terms('Phố cổ Hội An', 'Hồ Xuân Hương', ['Buổi sáng'])
+
+
+class Upload:
+    def __init__(self, filename, color):
+        buffer = io.BytesIO()
+        PILImage.new('RGB', (8, 8), color).save(buffer, 'PNG')
+        buffer.seek(0)
+        self.filename = filename
+        self.stream = buffer
+
+
+def test_invalid_image_in_batch_releases_its_file(user, upload_folder, monkeypatch):
+    validate = Image.validate
+
+    def reject_bad_title(self, *args, **kwargs):
+        if self.title == 'bad':
+            raise ValidationError('Tiêu đề không hợp lệ')
+        return validate(self, *args, **kwargs)
+
+    monkeypatch.setattr(Image, 'validate', reject_bad_title)
+    results = ImageService.upload_images(
+        [Upload('a.png', (255, 0, 0)), Upload('b.png', (0, 255, 0))], str(user.id), titles=['good', 'bad']
+    )
+
+    assert [result['status'] for result in results] == [201, 400]
+    assert Image.objects.count() == 1
+    # Chỉ còn tham chiếu tới tệp của ảnh đã tạo
+    blobs = list(Blob._get_collection().find({'ref_count': {'$gt': 0}}))
+    assert len(blobs) == 1
+
+
+def test_upload_enqueues_background_jobs_in_one_insert(user, upload_folder, commands):
+    commands.enabled = True
+    image = ImageService.upload_image(Upload('a.png', (0, 0, 255)), 'Ảnh', '', str(user.id))
+    commands.enabled = False
+
+    assert [name for name, collection in commands.commands if collection == 'jobs'] == ['insert']
+    jobs = {job['type']: job['payload'] for job in Job._get_collection().find()}
+    assert jobs == {
+        'generate_derivatives': {'file_name': image.file_path},
+        'extract_metadata': {'image_id': str(image.id), 'file_name': image.file_path}
+    }
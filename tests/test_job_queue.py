@@ -0,0 +1,24 @@
+# tests/test_job_queue.py
+import datetime
+
+from models.job import Job
+from services.job_queue import JobQueue, HANDLERS
+
+
+def test_worker_with_expired_lease_does_not_overwrite_new_claim(database, monkeypatch):
+    monkeypatch.setitem(HANDLERS, 'noop', lambda: None)
+    job_id = JobQueue.enqueue('noop')
+    first = JobQueue.claim(lease_seconds=300)
+
+    # Hết hạn giữ chỗ của worker đầu tiên, một worker khác nhận lại công việc
+    Job._get_collection().update_one({'_id': job_id}, {'$set': {'locked_until': datetime.datetime(2000, 1, 1)}})
+    second = JobQueue.claim(lease_seconds=300)
+    assert second['_id'] == job_id
+
+    JobQueue.run(first)
+    assert Job._get_collection().find_one({'_id': job_id})['status'] == 'running'
+
+    JobQueue.run(second)
+    job = Job._get_collection().find_one({'_id': job_id})
+    assert job['status'] == 'done'
+    assert job['attempts'] == 2
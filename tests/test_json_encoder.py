@@ -0,0 +1,47 @@
+# tests/test_json_encoder.py
+import datetime
+import json
+
+import pytest
+from bson import ObjectId
+
+from services.json_encoder import OrjsonEncoder, StdlibJSONEncoder, orjson
+from services.projection import serialize_rows
+from services.serializers import IMAGE_FIELDS, USER_FIELDS, serialize_report
+
+pytestmark = pytest.mark.skipif(orjson is None, reason='Chưa cài orjson')
+
+
+def payload():
+    created_at = datetime.datetime(2024, 5, 1, 8, 30, 15)
+    image = {
+        '_id': ObjectId(), 'title': 'Hoàng hôn "Đà Nẵng"', 'description': '', 'file_path': 'a' * 64 + '.jpg',
+        'is_public': False, 'created_at': created_at, 'captions': ['Chú thích', '<b>&</b>'], 'uploaded_by': ObjectId()
+    }
+    user = {'_id': ObjectId(), 'username': 'tester', 'email': 't@example.com', 'created_at': created_at}
+    report = {'_id': ObjectId(), 'image': image['_id'], 'reported_by': user['_id'], 'reason': 'Spam',
+              'created_at': created_at}
+    return {
+        'images': serialize_rows([image], list(IMAGE_FIELDS), IMAGE_FIELDS),
+        'users': serialize_rows([user], list(USER_FIELDS), USER_FIELDS),
+        'reports': [serialize_report(report, image, user), serialize_report(report, None, None)],
+        # Giá trị chưa định dạng sẵn vẫn đi qua default() như json chuẩn
+        'raw': {'id': ObjectId(), 'at': created_at, 'large': 2 ** 70, 'pi': 3.14159, 'none': None}
+    }
+
+
+@pytest.mark.parametrize('options', [{}, {'sort_keys': True}, {'sort_keys': True, 'indent': 2}])
+def test_orjson_output_matches_stdlib(options):
+    data = payload()
+
+    expected = StdlibJSONEncoder(**options).encode(data)
+    actual = OrjsonEncoder(**options).encode(data)
+
+    assert json.loads(actual) == json.loads(expected)
+
+
+def test_serialized_dates_use_http_format():
+    row = serialize_rows([{'created_at': datetime.datetime(2024, 5, 1, 8, 30, 15)}], ['created_at'], IMAGE_FIELDS)[0]
+
+    assert row['created_at'] == 'Wed, 01 May 2024 08:30:15 GMT'
+    assert row['created_at'] == json.loads(StdlibJSONEncoder().encode(datetime.datetime(2024, 5, 1, 8, 30, 15)))
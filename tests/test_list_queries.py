@@ -0,0 +1,77 @@
+# tests/test_list_queries.py
+"""Số lệnh MongoDB của các danh sách không được tăng theo per_page (không có truy vấn N+1)"""
+import datetime
+
+import pytest
+
+from models.image import Image
+from models.report import Report
+from models.user import User
+from services.image_service import ImageService
+from services.user_service import UserService
+
+ROWS = 60
+
+
+@pytest.fixture
+def dataset(database):
+    created_from = datetime.datetime(2024, 1, 1)
+    users = User._get_collection().insert_many([
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x', 'role': 'user',
+         'created_at': created_from + datetime.timedelta(minutes=i)}
+        for i in range(ROWS)
+    ]).inserted_ids
+    images = Image._get_collection().insert_many([
+        {'title': f'Ảnh {i}', 'file_path': f'{i:064x}.jpg', 'uploaded_by': users[i], 'is_public': True,
+         'captions': [], 'created_at': created_from + datetime.timedelta(minutes=i)}
+        for i in range(ROWS)
+    ]).inserted_ids
+    # Mỗi báo cáo trỏ tới một hình ảnh và một người báo cáo khác nhau
+    Report._get_collection().insert_many([
+        {'image': images[i], 'reported_by': users[(i + 1) % ROWS], 'reason': 'Spam', 'status': 'pending',
+         'created_at': created_from + datetime.timedelta(minutes=i)}
+        for i in range(ROWS)
+    ])
+
+
+def count_commands(commands, fn):
+    commands.reset()
+    commands.enabled = True
+    try:
+        fn()
+    finally:
+        commands.enabled = False
+    return list(commands.commands)
+
+
+def report_page(per_page, cursor):
+    reports = ImageService.get_reports(per_page=per_page, cursor=cursor)
+    assert len(reports.items) == per_page
+    images_by_id, users_by_id = ImageService.load_report_references(reports.items)
+    assert len(images_by_id) == len(users_by_id) == per_page
+
+
+@pytest.mark.parametrize('cursor', [None, ''])
+def test_report_references_are_batch_loaded(commands, dataset, cursor):
+    small = count_commands(commands, lambda: report_page(5, cursor))
+    large = count_commands(commands, lambda: report_page(50, cursor))
+
+    assert len(large) == len(small)
+    # Một truy vấn $in cho mỗi collection được tham chiếu
+    assert sum(1 for _, collection in large if collection == 'images') == 1
+    assert sum(1 for _, collection in large if collection == 'users') == 1
+
+
+@pytest.mark.parametrize('cursor', [None, ''])
+def test_image_list_commands_do_not_grow_with_per_page(commands, dataset, cursor):
+    small = count_commands(commands, lambda: list(ImageService.get_public_images(per_page=5, cursor=cursor).items))
+    large = count_commands(commands, lambda: list(ImageService.get_public_images(per_page=50, cursor=cursor).items))
+
+    assert len(large) == len(small)
+
+
+def test_user_list_commands_do_not_grow_with_per_page(commands, dataset):
+    small = count_commands(commands, lambda: list(UserService.get_all_users(per_page=5).items))
+    large = count_commands(commands, lambda: list(UserService.get_all_users(per_page=50).items))
+
+    assert len(large) == len(small)
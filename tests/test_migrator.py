@@ -0,0 +1,87 @@
+# tests/test_migrator.py
+import datetime
+import types
+
+import pytest
+from mongoengine.connection import get_db
+
+from database.migrator import LOCK_ID, Migration, MigrationContext, MigrationLocked, Migrator, load_migrations
+
+
+@pytest.fixture
+def migrator(database):
+    return Migrator(get_db(), lock_ttl=60)
+
+
+def test_second_process_cannot_take_held_lock(migrator):
+    other = Migrator(get_db(), lock_ttl=60)
+
+    assert migrator.acquire_lock()
+    assert not other.acquire_lock()
+    with pytest.raises(MigrationLocked):
+        other.run(wait=0)
+
+    migrator.release_lock()
+    assert other.acquire_lock()
+
+
+def test_expired_lock_is_taken_over(migrator):
+    other = Migrator(get_db(), lock_ttl=60)
+    assert migrator.acquire_lock()
+    get_db().migration_locks.update_one({'_id': LOCK_ID}, {'$set': {'expires_at': datetime.datetime(2000, 1, 1)}})
+
+    assert other.acquire_lock()
+    # Tiến trình cũ mất khóa thì không được chạy tiếp
+    with pytest.raises(MigrationLocked):
+        migrator.refresh_lock()
+
+
+def test_pending_respects_target(migrator):
+    versions = [migration.version for migration in load_migrations()]
+
+    assert [migration.version for migration in migrator.pending()] == versions
+    assert [migration.version for migration in migrator.pending(target=versions[1])] == versions[:2]
+
+    get_db().migrations.insert_one({'version': versions[0], 'name': 'x', 'applied_at': datetime.datetime.now()})
+    assert [migration.version for migration in migrator.pending(target=versions[1])] == versions[1:2]
+
+
+def test_backfill_resumes_from_checkpoint(migrator):
+    get_db().items.insert_many([{'_id': i, 'value': None} for i in range(10)])
+    context = MigrationContext(migrator, Migration(99, 'test', types.ModuleType('m0099_test')))
+    migrator.acquire_lock()
+    seen = []
+
+    def interrupted(document):
+        if len(seen) == 5:
+            raise KeyboardInterrupt
+        seen.append(document['_id'])
+        return {'$set': {'value': document['_id']}}
+
+    with pytest.raises(KeyboardInterrupt):
+        context.backfill('items', {}, interrupted, batch_size=2)
+
+    # Lô đang dở (id 4) được chạy lại, các lô đã lưu vị trí thì không
+    def update(document):
+        seen.append(document['_id'])
+        return {'$set': {'value': document['_id']}}
+
+    total = context.backfill('items', {}, update, batch_size=2)
+
+    assert seen == [0, 1, 2, 3, 4, 4, 5, 6, 7, 8, 9]
+    assert total == 10
+    assert get_db().items.count_documents({'value': None}) == 0
+
+
+def test_model_indexes_migration_drops_redundant_prefixes(migrator):
+    get_db().images.create_index('uploaded_by', name='uploaded_by_1')
+    get_db().reports.create_index('status', name='status_1')
+    migration = next(migration for migration in load_migrations() if migration.name == 'model_indexes')
+    migrator.acquire_lock()
+
+    migration.up(MigrationContext(migrator, migration))
+    migration.up(MigrationContext(migrator, migration))
+
+    assert 'uploaded_by_1' not in get_db().images.index_information()
+    assert {'image_1', 'reported_by_1'} <= set(get_db().reports.index_information())
+    assert 'status_1' not in get_db().reports.index_information()
@@ -0,0 +1,134 @@
+# tests/test_moderation_service.py
+from models.blob import Blob
+from models.image import Image
+from models.job import Job
+from models.report import Report
+from services.moderation_service import ModerationService
+from services.stats_service import StatsService
+
+
+def create_reports(user, statuses):
+    image = Image(title='Ảnh', file_path='a' * 64 + '.jpg', uploaded_by=user).save()
+    reports = [Report(image=image, reported_by=user, reason='Spam', status=status).save() for status in statuses]
+    StatsService.increment(pending_reports=statuses.count('pending'))
+    return image, reports
+
+
+def pending_counter():
+    return StatsService.get_stats(max_staleness=300)['pending_reports']
+
+
+def test_bulk_update_adjusts_pending_counter(user):
+    image, _ = create_reports(user, ['pending', 'pending', 'reviewed', 'rejected'])
+
+    result = ModerationService.update_reports('approved', image_id=str(image.id), batch_size=2)
+
+    assert result['updated'] == 4
+    assert pending_counter() == 0
+
+    result = ModerationService.update_reports('pending', image_id=str(image.id))
+
+    assert result['updated'] == 4
+    assert pending_counter() == 4
+
+
+def test_bulk_update_ignores_reports_changed_after_read(user, monkeypatch):
+    image, reports = create_reports(user, ['pending', 'pending', 'pending'])
+    collection = Report._get_collection()
+    update_many = type(collection).update_many
+    changed = []
+
+    def change_then_update(self, *args, **kwargs):
+        # Một admin khác duyệt một báo cáo sau khi lô được đọc, trước lệnh ghi đầu tiên
+        if not changed:
+            changed.append(True)
+            update_many(self, {'_id': reports[0].id}, {'$set': {'status': 'reviewed'}})
+            StatsService.increment(pending_reports=-1)
+        return update_many(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(collection), 'update_many', change_then_update)
+    result = ModerationService.update_reports('rejected', image_id=str(image.id), current_status='pending')
+    monkeypatch.undo()
+
+    assert result['updated'] == 2
+    assert pending_counter() == 0
+
+
+def create_images(user, count, reports_per_image=0):
+    images = [
+        Image(title=f'Ảnh {i}', file_path=f'{i:064x}.jpg', uploaded_by=user, is_public=i % 2 == 0).save()
+        for i in range(count)
+    ]
+    for image in images:
+        for _ in range(reports_per_image):
+            Report(image=image, reported_by=user, reason='Spam').save()
+    StatsService.increment(
+        images=count, public_images=sum(1 for image in images if image.is_public),
+        pending_reports=count * reports_per_image
+    )
+    return images
+
+
+def test_purge_user_removes_images_reports_and_files(user):
+    images = create_images(user, 5, reports_per_image=1)
+    for image in images:
+        Blob._get_collection().insert_one({'_id': image.file_path.split('.')[0], 'file_name': image.file_path, 'ref_count': 1})
+
+    assert ModerationService.purge_user(str(user.id), batch_size=2) is True
+
+    assert Image.objects.count() == 0
+    assert Report.objects.count() == 0
+    stats = StatsService.get_stats(max_staleness=300)
+    assert (stats['images'], stats['public_images'], stats['pending_reports']) == (0, 0, 0)
+    assert sorted(job['payload']['file_name'] for job in Job._get_collection().find({'type': 'remove_files'})) \
+        == sorted(image.file_path for image in images)
+
+
+def test_partly_deleted_batch_counts_only_own_deletions(user, monkeypatch):
+    images = create_images(user, 4)
+    collection = Image._get_collection()
+    update_many = type(collection).update_many
+    raced = []
+
+    def delete_then_claim(self, *args, **kwargs):
+        # Một yêu cầu khác xóa một ảnh của lô giữa lúc đọc lô và lúc đánh dấu
+        if self.name == 'images' and not raced:
+            raced.append(True)
+            self.delete_one({'_id': images[0].id})
+        return update_many(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(collection), 'update_many', delete_then_claim)
+    result = ModerationService.delete_images(uploaded_by=str(user.id))
+    monkeypatch.undo()
+
+    assert result['deleted'] == 3
+    assert collection.count_documents({}) == 0
+    # Chỉ ảnh do lệnh này xóa mới bỏ tham chiếu tệp
+    assert Job._get_collection().count_documents({'type': 'remove_files'}) == 3
+    assert StatsService.get_stats(max_staleness=300)['images'] == 1
+
+
+def test_image_batch_is_deleted_with_constant_round_trips(user, commands):
+    create_images(user, 30)
+
+    commands.enabled = True
+    ModerationService.delete_images(uploaded_by=str(user.id), batch_size=200)
+    commands.enabled = False
+
+    image_commands = [name for name, collection in commands.commands if collection == 'images']
+    # Đọc lô, đánh dấu, đọc theo token, xóa theo token, kiểm tra has_more: không phụ thuộc số ảnh
+    assert image_commands.count('delete') == 1
+    assert 'findAndModify' not in image_commands
+    assert len(image_commands) <= 6
+
+
+def test_bulk_delete_images_removes_their_reports(user):
+    images = create_images(user, 3, reports_per_image=2)
+    kept = images[2]
+
+    result = ModerationService.delete_images(ids=[str(image.id) for image in images[:2]], batch_size=1)
+
+    assert result == {'deleted': 2, 'has_more': False, 'dry_run': False}
+    assert [image.id for image in Image.objects] == [kept.id]
+    assert {report.image.id for report in Report.objects} == {kept.id}
+    assert pending_counter() == 2
@@ -0,0 +1,43 @@
+# tests/test_pagination.py
+import datetime
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from models.image import Image
+from services.pagination import MAX_PER_PAGE, clamp_per_page, keyset_paginate
+
+ROWS = 5
+
+
+@pytest.fixture
+def images(user):
+    created_from = datetime.datetime(2024, 1, 1)
+    Image._get_collection().insert_many([
+        {'title': f'Ảnh {i}', 'file_path': f'{i:064x}.jpg', 'uploaded_by': user.id, 'is_public': True,
+         'captions': [], 'created_at': created_from + datetime.timedelta(minutes=i)}
+        for i in range(ROWS)
+    ])
+
+
+def test_clamp_per_page():
+    assert clamp_per_page(None) == 20
+    assert clamp_per_page(0) == 1
+    assert clamp_per_page(-1) == 1
+    assert clamp_per_page(MAX_PER_PAGE + 1) == MAX_PER_PAGE
+
+
+@pytest.mark.parametrize('per_page', [0, -1])
+def test_keyset_paginate_rejects_per_page_below_one(images, per_page):
+    with pytest.raises(BadRequest):
+        keyset_paginate(Image.objects, '', per_page)
+
+
+@pytest.mark.parametrize('per_page', [0, -1])
+def test_public_feed_clamps_per_page(client, images, per_page):
+    response = client.get(f'/api/images/?cursor=&per_page={per_page}')
+
+    assert response.status_code == 200
+    # Không bao giờ trả về cả collection
+    assert len(response.get_json()['images']) == 1
+    assert response.get_json()['next_cursor']
@@ -0,0 +1,27 @@
+# tests/test_search_service.py
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from services.pagination import CursorPage
+from services.search_service import SearchService
+
+
+@pytest.mark.parametrize('per_page', [0, -1])
+def test_search_rejects_per_page_below_one(database, per_page):
+    with pytest.raises(BadRequest):
+        SearchService.search_images('Đà Lạt', per_page=per_page)
+
+
+@pytest.mark.parametrize('raw, expected', [('0', 1), ('-1', 1), ('500', 100), ('abc', 20)])
+def test_search_endpoint_clamps_per_page(client, monkeypatch, raw, expected):
+    calls = []
+
+    def search_images(query, per_page, **kwargs):
+        calls.append(per_page)
+        return CursorPage([], None, per_page)
+
+    monkeypatch.setattr(SearchService, 'search_images', staticmethod(search_images))
+    response = client.get(f'/api/images/search?q=hoang+hon&per_page={raw}')
+
+    assert response.status_code == 200
+    assert calls == [expected]
@@ -0,0 +1,30 @@
+# tests/test_stats_service.py
+from concurrent.futures import ThreadPoolExecutor
+
+from models.image import Image
+from models.job import Job
+from models.report import Report
+from services.image_service import ImageService
+from services.stats_service import StatsService
+
+
+def test_stale_stats_schedule_one_reconcile(database):
+    StatsService.increment(users=3)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: StatsService.get_stats(max_staleness=300), range(20)))
+
+    assert all(stats['users'] == 3 for stats in results)
+    assert Job._get_collection().count_documents({'type': 'reconcile_stats'}) == 1
+
+
+def test_concurrent_report_status_changes_decrement_pending_once(user):
+    image = Image(title='Ảnh', file_path='a' * 64 + '.jpg', uploaded_by=user).save()
+    report = Report(image=image, reported_by=user, reason='Spam').save()
+    StatsService.increment(pending_reports=1)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda status: ImageService.update_report_status(str(report.id), status),
+                      ['reviewed', 'rejected', 'approved', 'reviewed']))
+
+    assert StatsService.get_stats(max_staleness=300)['pending_reports'] == 0
@@ -0,0 +1,103 @@
+# tests/test_storage_service.py
+import datetime
+import io
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image as PILImage
+
+from models.blob import Blob
+from models.job import Job
+from services.storage_service import StorageBusy, StorageService
+
+MAX_SIZE = 1024 * 1024
+
+
+def png(color=(255, 0, 0)):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def stored_path(file_name):
+    relative_path = StorageService.resolve(file_name)
+    return relative_path and os.path.join(StorageService.UPLOAD_FOLDER, relative_path)
+
+
+def test_remove_files_skips_blob_still_referenced(database, upload_folder):
+    file_name = StorageService.store(io.BytesIO(png()), MAX_SIZE)
+    StorageService.store(io.BytesIO(png()), MAX_SIZE)
+
+    assert StorageService.release(file_name) is False
+    StorageService.remove_files(file_name)
+
+    assert stored_path(file_name)
+    assert Blob._get_collection().find_one({'_id': file_name.split('.')[0]})['ref_count'] == 1
+
+
+def test_upload_during_removal_keeps_file(database, upload_folder, monkeypatch):
+    file_name = StorageService.store(io.BytesIO(png()), MAX_SIZE)
+    assert StorageService.release(file_name) is True
+
+    # Cùng nội dung được tải lên lại đúng lúc remove_files đang gỡ tệp
+    uploads = []
+    uploader = threading.Thread(target=lambda: uploads.append(StorageService.store(io.BytesIO(png()), MAX_SIZE)))
+    remove = os.remove
+
+    def remove_while_uploading(path):
+        if not uploader.is_alive() and not uploads:
+            uploader.start()
+            time.sleep(0.2)
+        remove(path)
+
+    monkeypatch.setattr(os, 'remove', remove_while_uploading)
+    StorageService.remove_files(file_name)
+    uploader.join()
+    monkeypatch.setattr(os, 'remove', remove)
+
+    assert uploads == [file_name]
+    assert stored_path(file_name)
+    blob = Blob._get_collection().find_one({'_id': file_name.split('.')[0]})
+    assert blob['ref_count'] == 1
+    assert 'removing' not in blob
+
+
+def test_remove_files_deletes_unreferenced_blob(database, upload_folder):
+    file_name = StorageService.store(io.BytesIO(png()), MAX_SIZE)
+    assert StorageService.release(file_name) is True
+
+    StorageService.remove_files(file_name)
+
+    assert not stored_path(file_name)
+    assert Blob._get_collection().count_documents({}) == 0
+
+
+def test_failed_placement_releases_reference(database, upload_folder, monkeypatch):
+    def fail(*args):
+        raise OSError('Hết dung lượng đĩa')
+
+    monkeypatch.setattr(os, 'replace', fail)
+    with pytest.raises(OSError):
+        StorageService.store(io.BytesIO(png()), MAX_SIZE)
+    monkeypatch.undo()
+
+    assert Blob._get_collection().count_documents({'ref_count': {'$gt': 0}}) == 0
+    assert Job._get_collection().count_documents({'type': 'remove_files'}) == 1
+    assert os.listdir(os.path.join(StorageService.UPLOAD_FOLDER, '.incoming')) == []
+
+
+def test_store_gives_up_when_removal_does_not_finish(database, upload_folder, monkeypatch):
+    file_name = StorageService.store(io.BytesIO(png()), MAX_SIZE)
+    StorageService.release(file_name)
+    digest = file_name.split('.')[0]
+    # remove_files đang xóa và không xong trong thời gian chờ (dấu còn mới suốt lúc chờ)
+    removing = datetime.datetime.now() + datetime.timedelta(seconds=5)
+    Blob._get_collection().update_one({'_id': digest}, {'$set': {'removing': removing}})
+    monkeypatch.setattr(StorageService, 'REMOVAL_TIMEOUT', 0.2)
+
+    with pytest.raises(StorageBusy):
+        StorageService.store(io.BytesIO(png()), MAX_SIZE)
+
+    assert Blob._get_collection().find_one({'_id': digest})['ref_count'] == 0